@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Compact binary alignment format (reference implementation).
+
+AlignmentCache stores every (paragraph, speed) alignment as pretty-printed
+AlignmentResult JSON, which repeats every key for every word. This format
+stores the same data as a packed struct-of-arrays, little-endian:
+
+    header (32 bytes)
+        magic           4s   b"L2WA"
+        version         u16  FORMAT_VERSION
+        flags           u16  reserved, 0
+        paragraphIndex  u32
+        wordCount       u32  n
+        totalDuration   f64  seconds
+        textBytes       u32  size of the UTF-8 text blob
+        reserved        u32  0
+    wordIndex       u32[n]
+    startTime       f32[n]  seconds
+    endTime         f32[n]  seconds (duration = end - start)
+    rangeLocation   u32[n]
+    rangeLength     u32[n]
+    textEnd         u32[n]  end offset of each word in the text blob
+    text            u8[textBytes]  word texts, UTF-8, concatenated
+
+Every array starts on a 4-byte boundary, so a reader can map the file and
+view the columns in place. float32 keeps times within ~0.25 ms for audio up
+to an hour, well below the 20 ms frame resolution of the aligner.
+
+Usage:
+    python scripts/alignment_format.py to-binary 0_1.0.json [...]      # writes 0_1.0.l2wa
+    python scripts/alignment_format.py to-json 0_1.0.l2wa [...]        # writes 0_1.0.json
+    python scripts/alignment_format.py benchmark [--paragraphs 2000]
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from precompute_alignments import encode_alignment
+
+MAGIC = b"L2WA"
+FORMAT_VERSION = 1
+EXTENSION = ".l2wa"
+
+HEADER = struct.Struct("<4sHHIIdII")
+COLUMNS = (
+    ("wordIndex", "<u4"),
+    ("startTime", "<f4"),
+    ("endTime", "<f4"),
+    ("rangeLocation", "<u4"),
+    ("rangeLength", "<u4"),
+    ("textEnd", "<u4"),
+)
+
+
+class AlignmentColumns:
+    """Decoded alignment as numpy columns; word texts are decoded on demand."""
+
+    def __init__(self, paragraph_index, total_duration, columns, text):
+        self.paragraph_index = paragraph_index
+        self.total_duration = total_duration
+        self.columns = columns
+        self.text = text
+
+    def __len__(self):
+        return len(self.columns["wordIndex"])
+
+    def word_text(self, i):
+        ends = self.columns["textEnd"]
+        start = int(ends[i - 1]) if i else 0
+        return bytes(self.text[start:int(ends[i])]).decode("utf-8")
+
+    def to_result(self):
+        """AlignmentResult dict (the JSON schema)."""
+        c = self.columns
+        starts = c["startTime"].astype(np.float64)
+        durations = c["endTime"].astype(np.float64) - starts
+        return {
+            "paragraphIndex": self.paragraph_index,
+            "totalDuration": self.total_duration,
+            "wordTimings": [
+                {
+                    "wordIndex": int(c["wordIndex"][i]),
+                    "startTime": float(starts[i]),
+                    "duration": float(durations[i]),
+                    "text": self.word_text(i),
+                    "rangeLocation": int(c["rangeLocation"][i]),
+                    "rangeLength": int(c["rangeLength"][i]),
+                }
+                for i in range(len(self))
+            ],
+        }
+
+
+def encode(result):
+    """AlignmentResult dict -> bytes."""
+    words = result["wordTimings"]
+    texts = [w["text"].encode("utf-8") for w in words]
+    text = b"".join(texts)
+
+    starts = np.array([w["startTime"] for w in words], dtype=np.float64)
+    columns = {
+        "wordIndex": [w["wordIndex"] for w in words],
+        "startTime": starts,
+        "endTime": starts + np.array([w["duration"] for w in words], dtype=np.float64),
+        "rangeLocation": [w["rangeLocation"] for w in words],
+        "rangeLength": [w["rangeLength"] for w in words],
+        "textEnd": np.cumsum([len(t) for t in texts], dtype=np.int64),
+    }
+
+    parts = [HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, result["paragraphIndex"], len(words), result["totalDuration"], len(text), 0
+    )]
+    for name, dtype in COLUMNS:
+        parts.append(np.asarray(columns[name]).astype(dtype).tobytes())
+    parts.append(text)
+    return b"".join(parts)
+
+
+def decode(data):
+    """bytes (or mmap) -> AlignmentColumns, viewing the columns without copying."""
+    if len(data) < HEADER.size:
+        raise ValueError("Alignment data is truncated")
+    magic, version, _, paragraph, count, total_duration, text_bytes, _ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Not an alignment file (magic {magic!r})")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported alignment format version {version}")
+
+    expected = HEADER.size + 4 * count * len(COLUMNS) + text_bytes
+    if len(data) < expected:
+        raise ValueError(f"Alignment data is truncated ({len(data)} < {expected} bytes)")
+
+    columns = {}
+    offset = HEADER.size
+    for name, dtype in COLUMNS:
+        columns[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += 4 * count
+    text = memoryview(data)[offset:offset + text_bytes]
+    return AlignmentColumns(paragraph, total_duration, columns, text)
+
+
+def json_to_binary(json_path, output_path=None):
+    output_path = output_path or os.path.splitext(json_path)[0] + EXTENSION
+    with open(json_path, encoding="utf-8") as f:
+        result = json.load(f)
+    with open(output_path, "wb") as f:
+        f.write(encode(result))
+    return output_path
+
+
+def binary_to_json(binary_path, output_path=None):
+    output_path = output_path or os.path.splitext(binary_path)[0] + ".json"
+    with open(binary_path, "rb") as f:
+        result = decode(f.read()).to_result()
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(encode_alignment(result))
+    return output_path
+
+
+def max_round_trip_error(result, decoded):
+    """Largest time difference (s) after a round trip; raises if any other field differs."""
+    if decoded["paragraphIndex"] != result["paragraphIndex"] or decoded["totalDuration"] != result["totalDuration"]:
+        raise ValueError("Header fields differ after round trip")
+    worst = 0.0
+    for ours, theirs in zip(result["wordTimings"], decoded["wordTimings"], strict=True):
+        for key in ("wordIndex", "text", "rangeLocation", "rangeLength"):
+            if ours[key] != theirs[key]:
+                raise ValueError(f"{key} differs after round trip: {ours[key]!r} != {theirs[key]!r}")
+        worst = max(
+            worst,
+            abs(ours["startTime"] - theirs["startTime"]),
+            abs(ours["startTime"] + ours["duration"] - theirs["startTime"] - theirs["duration"]),
+        )
+    return worst
+
+
+def generated_alignment(rng, paragraph_index, num_words):
+    """Random but realistic AlignmentResult (English-like words, ~3 words/s)."""
+    vocabulary = ["the", "a", "reader", "listens", "to", "every", "chapter", "while", "walking",
+                  "quietly", "through", "narrow", "streets", "of", "old", "town", "café", "naïve"]
+    words = []
+    time_s = float(rng.uniform(0.0, 0.3))
+    offset = 0
+    for i in range(num_words):
+        text = str(rng.choice(vocabulary))
+        duration = float(rng.uniform(0.08, 0.6))
+        words.append({
+            "wordIndex": i,
+            "startTime": time_s,
+            "duration": duration,
+            "text": text,
+            "rangeLocation": offset,
+            "rangeLength": len(text),
+        })
+        time_s += duration
+        offset += len(text) + 1
+    return {"paragraphIndex": paragraph_index, "totalDuration": time_s + 0.2, "wordTimings": words}
+
+
+def benchmark(paragraphs, words_per_paragraph, seed=0):
+    rng = np.random.default_rng(seed)
+    results = [
+        generated_alignment(rng, i, max(1, int(rng.poisson(words_per_paragraph))))
+        for i in range(paragraphs)
+    ]
+    total_words = sum(len(r["wordTimings"]) for r in results)
+    print(f"   Corpus: {paragraphs} paragraphs, {total_words} words")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_paths, binary_paths = [], []
+        for r in results:
+            json_path = os.path.join(tmp, f"{r['paragraphIndex']}_1.0.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                f.write(encode_alignment(r))
+            json_paths.append(json_path)
+            binary_paths.append(json_to_binary(json_path))
+
+        json_bytes = sum(os.path.getsize(p) for p in json_paths)
+        binary_bytes = sum(os.path.getsize(p) for p in binary_paths)
+
+        worst = 0.0
+        for r, path in zip(results, binary_paths):
+            with open(path, "rb") as f:
+                worst = max(worst, max_round_trip_error(r, decode(f.read()).to_result()))
+
+        def timed(fn, paths):
+            start = time.perf_counter()
+            for path in paths:
+                fn(path)
+            return time.perf_counter() - start
+
+        def parse_json(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+        def parse_binary(path):
+            with open(path, "rb") as f:
+                return decode(f.read())
+
+        def parse_binary_full(path):
+            return parse_binary(path).to_result()
+
+        # Warm the page cache before timing
+        timed(parse_json, json_paths)
+        timed(parse_binary, binary_paths)
+        timings = {
+            "JSON (json.load)": timed(parse_json, json_paths),
+            "binary (columns)": timed(parse_binary, binary_paths),
+            "binary (-> dicts)": timed(parse_binary_full, binary_paths),
+        }
+
+    print(f"\n   {'format':<20}{'bytes':>12}{'bytes/word':>12}")
+    print(f"   {'JSON (pretty)':<20}{json_bytes:>12,}{json_bytes / total_words:>12.1f}")
+    print(f"   {'binary':<20}{binary_bytes:>12,}{binary_bytes / total_words:>12.1f}")
+    print(f"   Size ratio: {json_bytes / binary_bytes:.1f}x smaller")
+
+    print(f"\n   {'parse':<20}{'total ms':>12}{'us/word':>12}")
+    baseline = timings["JSON (json.load)"]
+    for name, seconds in timings.items():
+        print(f"   {name:<20}{seconds * 1000:>12.1f}{seconds * 1e6 / total_words:>12.3f}  ({baseline / seconds:.1f}x)")
+
+    print(f"\n   Max round-trip time error: {worst * 1000:.4f} ms")
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and benchmark the binary alignment format")
+    sub = parser.add_subparsers(dest="command", required=True)
+    to_binary = sub.add_parser("to-binary", help="AlignmentResult JSON -> .l2wa")
+    to_binary.add_argument("paths", nargs="+")
+    to_json = sub.add_parser("to-json", help=".l2wa -> AlignmentResult JSON")
+    to_json.add_argument("paths", nargs="+")
+    bench = sub.add_parser("benchmark", help="bytes on disk and parse time vs JSON")
+    bench.add_argument("--paragraphs", type=int, default=2000, help="generated paragraphs")
+    bench.add_argument("--words", type=int, default=80, help="mean words per paragraph")
+    bench.add_argument("--max-error-ms", type=float, default=0.5, help="fail above this round-trip time error")
+    args = parser.parse_args()
+
+    if args.command == "to-binary":
+        for path in args.paths:
+            print(f"   {path} -> {json_to_binary(path)}")
+        return 0
+    if args.command == "to-json":
+        for path in args.paths:
+            print(f"   {path} -> {binary_to_json(path)}")
+        return 0
+
+    print("=" * 60)
+    print("Binary Alignment Format Benchmark")
+    print("=" * 60)
+    worst = benchmark(args.paragraphs, args.words)
+    if worst * 1000 > args.max_error_ms:
+        print(f"   [FAIL] Round-trip error above {args.max_error_ms} ms")
+        return 1
+    print("   [PASS] Round trip preserved every field")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Load generator for alignment_server.py.
+
+For each concurrency level, that many closed-loop clients each send
+(audio, transcript) requests from the corpus back to back over their own
+socket connection for --duration seconds. Reported per level:
+  - throughput in requests/s and audio-seconds per wall-second
+  - client-side p50 / p95 / p99 latency
+  - the server's mean batch size and max queue depth over the level
+
+With --start-server a server is launched on a temporary socket with the
+given batching settings and stopped afterwards.
+
+Usage:
+    python scripts/alignment_load_test.py --start-server [--concurrency 1,2,4,8,16] [--duration 10]
+    python scripts/alignment_load_test.py --socket /tmp/listen2-align.sock --output load.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from alignment_server import STREAM_LIMIT, default_model, encode_audio
+from audio_corpus import load_corpus, synthetic_corpus
+from mms_fa_inference import SAMPLE_RATE
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def request(reader, writer, payload):
+    writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def metrics(socket_path, reset=False):
+    """Server metrics; reset=True restarts the server's max queue depth for the next interval."""
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=STREAM_LIMIT)
+    try:
+        return (await request(reader, writer, {"op": "metrics", "reset": reset}))["metrics"]
+    finally:
+        writer.close()
+
+
+async def client(socket_path, payloads, deadline, latencies, audio_seconds, errors):
+    """Closed loop: send the next request as soon as the previous answer arrives."""
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=STREAM_LIMIT)
+    try:
+        for payload, seconds in payloads:
+            if time.perf_counter() >= deadline:
+                break
+            start = time.perf_counter()
+            response = await request(reader, writer, payload)
+            if "error" in response:
+                errors.append(response["error"])
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            audio_seconds.append(seconds)
+    finally:
+        writer.close()
+
+
+async def run_level(socket_path, utterances, concurrency, duration):
+    payloads = [
+        ({"transcript": u.transcript, "audio": encode_audio(u.audio)}, len(u.audio) / SAMPLE_RATE)
+        for u in utterances
+    ]
+    before = await metrics(socket_path, reset=True)
+    latencies, audio_seconds, errors = [], [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        # Each client starts at a different utterance so the lengths mix
+        client(socket_path, itertools.islice(itertools.cycle(payloads), i, None), deadline,
+               latencies, audio_seconds, errors)
+        for i in range(concurrency)
+    ])
+    wall = time.perf_counter() - start
+    after = await metrics(socket_path)
+
+    batches = after["batches"] - before["batches"]
+    served = after["requests"] - before["requests"]
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": len(audio_seconds),
+        "errors": len(errors),
+        "requests_per_s": round(len(audio_seconds) / wall, 2),
+        "audio_s_per_s": round(sum(audio_seconds) / wall, 2),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)), 1),
+        "mean_batch_size": round(served / batches, 2) if batches else 0.0,
+        "max_queue_depth": after["max_queue_depth"],
+    }
+
+
+def start_server(socket_path, args):
+    """Launch alignment_server.py and wait for its socket to appear."""
+    command = [
+        sys.executable, os.path.join(SCRIPT_DIR, "alignment_server.py"),
+        "--socket", socket_path, "--model", args.model,
+        "--max-batch-size", str(args.max_batch_size), "--max-wait-ms", str(args.max_wait_ms),
+        "--threads", str(args.threads),
+    ]
+    process = subprocess.Popen(command)
+    for _ in range(600):
+        if os.path.exists(socket_path):
+            return process
+        if process.poll() is not None:
+            raise RuntimeError(f"alignment_server.py exited with code {process.returncode}")
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("alignment_server.py did not open its socket within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the alignment server")
+    parser.add_argument("--socket", help="server socket (default with --start-server: a temporary path)")
+    parser.add_argument("--start-server", action="store_true", help="launch alignment_server.py for the test")
+    parser.add_argument("--model", default=default_model(),
+                        help="MMS_FA ONNX model (with --start-server; default: mms-fa-batch.onnx, else mms-fa.onnx)")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="server batch size (with --start-server)")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="server batch deadline (with --start-server)")
+    parser.add_argument("--threads", type=int, default=0, help="server intra-op threads (with --start-server)")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if not args.socket and not args.start_server:
+        parser.error("need --socket or --start-server")
+
+    utterances = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    print("=" * 60)
+    print("Alignment Server Load Test")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = args.socket or os.path.join(tmp, "align.sock")
+        server = start_server(socket_path, args) if args.start_server else None
+        try:
+            print(f"\n   Socket: {socket_path}")
+            print(f"   Corpus: {args.corpus or 'synthetic'} ({len(utterances)} utterances), "
+                  f"{args.duration:g}s per level")
+            print(f"\n   {'clients':>7}{'req/s':>8}{'audio-s/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                  f"{'batch':>7}{'queue':>7}{'errors':>8}")
+            records = []
+            for concurrency in levels:
+                record = asyncio.run(run_level(socket_path, utterances, concurrency, args.duration))
+                records.append(record)
+                print(f"   {concurrency:>7}{record['requests_per_s']:>8.1f}{record['audio_s_per_s']:>11.1f}"
+                      f"{record['latency_p50_ms']:>9.1f}{record['latency_p95_ms']:>9.1f}"
+                      f"{record['latency_p99_ms']:>9.1f}{record['mean_batch_size']:>7.2f}"
+                      f"{record['max_queue_depth']:>7}{record['errors']:>8}")
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"corpus": args.corpus or "synthetic", "duration_s": args.duration, "results": records},
+                      f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+    failed = sum(r["errors"] for r in records)
+    if failed:
+        print(f"\n[FAIL] {failed} request(s) failed")
+        return 1
+    print("\n[PASS] All requests aligned")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Long-lived MMS_FA alignment service with dynamic micro-batching.
+
+One warm onnxruntime session serves many clients over a Unix socket (or
+stdin/stdout). Requests are queued; a batcher takes the first waiting request,
+keeps collecting until --max-batch-size requests are waiting or
+--max-wait-ms has passed since the first one arrived, splits the group into
+length buckets (mms_fa_inference.bucket_by_length) and runs each bucket
+through mms_fa_inference.run_batch. Inference and forced alignment run on a
+worker thread so the event loop keeps accepting requests.
+
+Protocol: newline-delimited JSON, one object per line.
+    request   {"id": 1, "transcript": "...", "audio": "<base64 float32 LE>",
+               "sample_rate": 16000, "paragraph": 0}
+    response  {"id": 1, "result": <AlignmentResult>, "batch_size": 4,
+               "queue_ms": 3.1, "inference_ms": 41.0, "latency_ms": 52.7}
+    metrics   {"op": "metrics"} -> {"queue_depth": ..., "latency_p95_ms": ...}
+              {"op": "metrics", "reset": true} also restarts max_queue_depth
+              from the current depth (for per-interval peaks)
+Errors come back as {"id": 1, "error": "..."}. Responses on one connection
+may arrive out of order; match them by id. A line longer than STREAM_LIMIT
+gets an error response and the connection is closed.
+
+Only the length-aware batch export (mms-fa-batch.onnx, the default when it
+exists) runs a bucket as one padded [B, T] session.run; with the plain
+export run_batch runs one clip per session.run, so a result never depends on
+which requests shared its batch (see mms_fa_inference.py).
+
+Usage:
+    python scripts/alignment_server.py --socket /tmp/listen2-align.sock [--max-batch-size 8] [--max-wait-ms 10]
+    python scripts/alignment_server.py --stdio
+    python scripts/alignment_load_test.py --socket /tmp/listen2-align.sock    # load generator
+"""
+
+import argparse
+import asyncio
+import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import resample
+from mms_fa_inference import (
+    BATCH_MODEL,
+    FP32_MODEL,
+    SAMPLE_RATE,
+    bucket_by_length,
+    create_session,
+    has_length_input,
+    load_labels,
+    num_frames,
+    run_batch,
+)
+from precompute_alignments import alignment_result
+
+# Large enough for a few minutes of base64 float32 audio on one line
+STREAM_LIMIT = 64 * 1024 * 1024
+
+# Shortest clip that yields one emission frame (the first conv layer's 400-sample receptive field)
+MIN_SAMPLES = 400
+
+# Latency samples kept for the metrics percentiles
+METRICS_WINDOW = 2000
+
+
+def encode_audio(audio):
+    """float32 audio -> base64 text for a request."""
+    return base64.b64encode(np.asarray(audio, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_audio(text):
+    return np.frombuffer(base64.b64decode(text), dtype="<f4").astype(np.float32)
+
+
+def default_model():
+    """The length-aware batch export when it exists, else the plain export (batch=1)."""
+    return BATCH_MODEL if os.path.exists(BATCH_MODEL) else FP32_MODEL
+
+
+class AlignmentServer:
+    """Queue, micro-batcher and metrics around one onnxruntime session."""
+
+    def __init__(self, model_path=None, max_batch_size=8, max_wait_ms=10.0, max_padding=0.25,
+                 intra_op_threads=0):
+        self.model_path = model_path or default_model()
+        self.session = create_session(self.model_path, intra_op_threads)
+        self.labels = load_labels()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_padding = max_padding
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)  # one session.run at a time
+
+        self.started = time.time()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.latencies_ms = deque(maxlen=METRICS_WINDOW)
+        self.batch_sizes = deque(maxlen=METRICS_WINDOW)
+
+    async def align(self, audio, transcript, paragraph=0):
+        """Queue one clip and wait for its (AlignmentResult, batch info) pair."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((audio, transcript, paragraph, time.perf_counter(), future))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def _next_batch(self):
+        """Wait for one request, then collect more until the batch is full or the deadline passes."""
+        batch = [await self.queue.get()]
+        deadline = batch[0][3] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    def _run(self, batch):
+        """Worker thread: padded inference per length bucket, then forced alignment."""
+        results = [None] * len(batch)
+        lengths = [len(item[0]) for item in batch]
+        for bucket in bucket_by_length(lengths, self.max_batch_size, self.max_padding):
+            start = time.perf_counter()
+            try:
+                emissions = run_batch(self.session, [batch[i][0] for i in bucket])
+            except Exception as e:  # only this bucket's requests fail
+                for i in bucket:
+                    results[i] = e
+                continue
+            inference_ms = (time.perf_counter() - start) * 1000
+            for i, clip_emissions in zip(bucket, emissions):
+                audio, transcript, paragraph = batch[i][:3]
+                try:
+                    result = alignment_result(paragraph, transcript, clip_emissions, len(audio), self.labels)
+                    results[i] = (result, {"batch_size": len(bucket), "inference_ms": round(inference_ms, 2)})
+                except Exception as e:  # report per request, keep serving the rest
+                    results[i] = e
+        return results
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            dispatched = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self._run, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+            for (_, _, _, enqueued, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                    continue
+                result[1]["queue_ms"] = round((dispatched - enqueued) * 1000, 2)
+                future.set_result(result)
+
+    def metrics(self):
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_size": round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "latency_p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        }
+
+    async def handle(self, line):
+        """One request line -> one response dict."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            return {"error": f"invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            self.errors += 1
+            return {"error": f"request must be a JSON object, got {type(request).__name__}"}
+        if request.get("op") == "metrics":
+            metrics = self.metrics()
+            if request.get("reset"):
+                self.max_queue_depth = self.queue.qsize()
+            return {"id": request.get("id"), "metrics": metrics}
+
+        start = time.perf_counter()
+        try:
+            audio = decode_audio(request["audio"])
+            rate = int(request.get("sample_rate", SAMPLE_RATE))
+            if rate != SAMPLE_RATE:
+                audio = resample(audio, rate)
+            if num_frames(len(audio)) == 0:
+                raise ValueError(f"audio too short: {len(audio)} samples at {SAMPLE_RATE} Hz, "
+                                 f"need at least {MIN_SAMPLES} for one frame")
+            result, info = await self.align(audio, request["transcript"], int(request.get("paragraph", 0)))
+        except Exception as e:
+            self.errors += 1
+            return {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.requests += 1
+        self.latencies_ms.append(latency_ms)
+        return {"id": request.get("id"), "result": result, **info, "latency_ms": round(latency_ms, 2)}
+
+    async def serve_connection(self, reader, writer):
+        """Handle every line of one connection concurrently; writes are serialized."""
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(response):
+            async with lock:
+                writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+
+        async def respond(line):
+            await send(await self.handle(line))
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    # The rest of an over-limit line can't be told apart from the next request
+                    self.errors += 1
+                    await asyncio.gather(*tasks)
+                    await send({"error": f"request line exceeds {STREAM_LIMIT} bytes: {e}"})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve_socket(server, path):
+    if os.path.exists(path):
+        os.unlink(path)
+    batcher = asyncio.create_task(server.run_batches())
+    unix_server = await asyncio.start_unix_server(server.serve_connection, path=path, limit=STREAM_LIMIT)
+    print(f"   Listening on {path}", file=sys.stderr)
+    async with unix_server:
+        try:
+            await unix_server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+async def serve_stdio(server):
+    """Requests on stdin, responses on stdout (for running as a subprocess)."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    batcher = asyncio.create_task(server.run_batches())
+    try:
+        await server.serve_connection(reader, writer)
+    finally:
+        batcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMS_FA alignment server with micro-batching")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--socket", help="Unix socket path to listen on")
+    mode.add_argument("--stdio", action="store_true", help="serve newline-delimited JSON on stdin/stdout")
+    parser.add_argument("--model", help="MMS_FA ONNX model (default: mms-fa-batch.onnx, else mms-fa.onnx)")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="most clips per session.run")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="how long the first request waits for company")
+    parser.add_argument("--max-padding", type=float, default=0.25, help="max padding fraction per batch")
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = onnxruntime default)")
+    args = parser.parse_args()
+
+    async def run():
+        server = AlignmentServer(args.model, args.max_batch_size, args.max_wait_ms, args.max_padding, args.threads)
+        print(f"   Model: {server.model_path} (batch <= {args.max_batch_size}, wait <= {args.max_wait_ms:g} ms)",
+              file=sys.stderr)
+        if not has_length_input(server.session):
+            print("   No length input: each clip runs alone (export with --batch to batch inference)",
+                  file=sys.stderr)
+        if args.stdio:
+            await serve_stdio(server)
+        else:
+            await serve_socket(server, args.socket)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
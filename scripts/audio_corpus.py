@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Audio + transcript corpora for the MMS_FA alignment tooling.
+
+A corpus directory holds pairs of `<name>.wav` (mono or stereo PCM at any
+rate, e.g. Piper output at 22.05 kHz) and `<name>.txt` (the transcript).
+Audio is converted to 16 kHz float32 with the same linear interpolation as
+CTCForcedAligner.resample, so offline numbers match what the app feeds MMS_FA.
+
+When no recordings are at hand, synthetic_corpus() builds a fixed, seeded set
+of tone "speech" clips (one voiced segment per letter, pauses between words)
+so benchmark runs stay reproducible across machines and exports.
+
+Usage:
+    python scripts/audio_corpus.py [CORPUS_DIR]    # list utterances and durations
+"""
+
+from collections import namedtuple
+import glob
+import os
+import sys
+import wave
+import zlib
+
+import numpy as np
+
+from mms_fa_inference import SAMPLE_RATE
+
+Utterance = namedtuple("Utterance", ["name", "audio", "transcript"])
+
+# Fixed sentences for the synthetic corpus (short, medium and paragraph length)
+SYNTHETIC_SENTENCES = [
+    "Hello world.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Alice was beginning to get very tired of sitting by her sister on the bank.",
+    "It's a truth universally acknowledged that a reader wants the right word highlighted.",
+    "Once upon a time, in a quiet village, a storyteller read aloud every evening.",
+    "She said: don't stop now, we're almost at the end of the chapter!",
+    "Forced alignment maps every character of the transcript onto frames of audio, "
+    "and word boundaries come from the first and last frame of each word.",
+    "Numbers like 42 and symbols like & are skipped by the tokenizer.",
+]
+
+
+def read_wav(path):
+    """Read a PCM WAV file as (float32 mono samples in [-1, 1], sample_rate)."""
+    with wave.open(path, "rb") as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (bytes3[:, 0].astype(np.int32) | (bytes3[:, 1].astype(np.int32) << 8)
+                | (bytes3[:, 2].astype(np.int32) << 16))
+        samples = (np.where(ints >= 1 << 23, ints - (1 << 24), ints)).astype(np.float32) / (1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f"Unsupported sample width {width} in {path}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples.astype(np.float32), rate
+
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    """Write float samples in [-1, 1] as 16-bit mono PCM."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def resample(samples, source_rate, target_rate=SAMPLE_RATE):
+    """Linear-interpolation resampling, equivalent to CTCForcedAligner.resample."""
+    if source_rate == target_rate or len(samples) == 0:
+        return np.asarray(samples, dtype=np.float32)
+    ratio = source_rate / target_rate
+    positions = np.arange(int(len(samples) / ratio)) * ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """Read a WAV file and resample it to `sample_rate`."""
+    samples, rate = read_wav(path)
+    return resample(samples, rate, sample_rate)
+
+
+def load_corpus(directory, sample_rate=SAMPLE_RATE):
+    """Load every <name>.wav that has a <name>.txt transcript, sorted by name."""
+    utterances = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(txt_path):
+            continue
+        with open(txt_path, encoding="utf-8") as f:
+            transcript = " ".join(f.read().split())
+        name = os.path.splitext(os.path.basename(wav_path))[0]
+        utterances.append(Utterance(name, load_audio(wav_path, sample_rate), transcript))
+    return utterances
+
+
+def synthetic_utterance(transcript, seed=0, sample_rate=SAMPLE_RATE):
+    """
+    Deterministic tone "speech" for a transcript.
+
+    Each letter becomes a ~70 ms harmonic segment whose pitch depends on the
+    letter, each space a ~120 ms pause, with a little noise throughout.
+    """
+    rng = np.random.default_rng(zlib.crc32(transcript.encode("utf-8")) + seed)
+    pieces = [np.zeros(int(0.25 * sample_rate), dtype=np.float32)]
+
+    for char in transcript.lower():
+        if char == " ":
+            pieces.append(np.zeros(int(rng.uniform(0.08, 0.16) * sample_rate), dtype=np.float32))
+        elif char.isalpha():
+            length = int(rng.uniform(0.05, 0.09) * sample_rate)
+            t = np.arange(length) / sample_rate
+            pitch = 110 + 6 * (ord(char) - ord("a")) + rng.uniform(-5, 5)
+            tone = sum(np.sin(2 * np.pi * pitch * h * t) / h for h in (1, 2, 3, 4))
+            envelope = np.hanning(length)
+            pieces.append((0.3 * tone * envelope).astype(np.float32))
+
+    pieces.append(np.zeros(int(0.25 * sample_rate), dtype=np.float32))
+    audio = np.concatenate(pieces)
+    audio += (rng.standard_normal(len(audio)) * 0.003).astype(np.float32)
+    return audio
+
+
+def synthetic_corpus(seed=0, sample_rate=SAMPLE_RATE):
+    """The fixed synthetic corpus built from SYNTHETIC_SENTENCES."""
+    return [
+        Utterance(f"synthetic-{i:02d}", synthetic_utterance(text, seed, sample_rate), text)
+        for i, text in enumerate(SYNTHETIC_SENTENCES)
+    ]
+
+
+def corpus_seconds(utterances, sample_rate=SAMPLE_RATE):
+    """Total audio duration of a corpus in seconds."""
+    return sum(len(u.audio) for u in utterances) / sample_rate
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    utterances = load_corpus(directory) if directory else synthetic_corpus()
+
+    print("=" * 60)
+    print(f"Corpus: {directory or 'synthetic'}")
+    print("=" * 60)
+    for u in utterances:
+        print(f"   {u.name}: {len(u.audio) / SAMPLE_RATE:6.2f}s  '{u.transcript[:50]}'")
+    print(f"\n   {len(utterances)} utterances, {corpus_seconds(utterances):.1f}s of audio")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
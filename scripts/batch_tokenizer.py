@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Vectorized MMS_FA tokenizer with character offsets and word indices.
+
+ctc_align.tokenize_words (and CTCTokenizer.swift) walk the text one character
+at a time and drop characters that are not in labels.txt, which loses the
+link back to the source text. BatchTokenizer instead:
+  - builds a code-point -> label index lookup table once
+  - encodes a whole text (or a batch of paragraphs in one pass) with NumPy
+  - returns, parallel to the tokens, the character offset of every token
+    and the word it belongs to, plus each word's first token (word_starts)
+
+Words are split on spaces exactly like split_words(), so token counts and
+word indices match tokenize_words(). word_spans() turns merge_tokens()
+output into WordSpans with array indexing instead of a Python loop.
+
+Usage:
+    python scripts/batch_tokenizer.py [--text BOOK.txt] [--chars 2000000] [--repeats 3]
+"""
+
+import argparse
+from collections import namedtuple
+import sys
+import time
+
+import numpy as np
+
+from ctc_align import TokenSpan, WordSpan, merge_words, tokenize_words
+from mms_fa_inference import load_labels
+
+SPACE = ord(" ")
+
+# tokens, offsets and token_words (-1 for "*" space tokens) are parallel, one
+# entry per token; word_offsets has one entry per word and word_starts one
+# more (index of each word's first token, then the token count). A word's
+# letters are tokens word_starts[i]:word_starts[i] + count.
+Tokenized = namedtuple("Tokenized", ["tokens", "offsets", "token_words", "word_offsets", "word_starts"])
+
+
+class BatchTokenizer:
+    """Code-point lookup table over labels.txt (blank and "*" are never produced from text)."""
+
+    def __init__(self, labels, blank=0, space_label="*"):
+        self.labels = labels
+        self.blank = blank
+        self.space_index = labels.index(space_label) if space_label in labels else None
+        codes = [ord(label) for i, label in enumerate(labels)
+                 if len(label) == 1 and i != blank and label != space_label]
+        # Last slot is the "unknown" sentinel every out-of-range code point maps to
+        self.lookup = np.full(max(codes) + 2, -1, dtype=np.int16)
+        for i, label in enumerate(labels):
+            if len(label) == 1 and i != blank and label != space_label:
+                self.lookup[ord(label)] = i
+
+    def _codes(self, text):
+        """Lowercased code points, one per character of `text`."""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to two code points (e.g. "İ"); keep offsets 1:1
+            lowered = "".join(c.lower()[0] for c in text)
+        return np.frombuffer(lowered.encode("utf-32-le"), dtype=np.uint32)
+
+    def _label_ids(self, codes):
+        return self.lookup[np.minimum(codes, len(self.lookup) - 1)]
+
+    def encode(self, text, include_spaces=False):
+        """Tokenized for one text (include_spaces adds "*" for every space, like CTCTokenizer)."""
+        codes = self._codes(text)
+        ids = self._label_ids(codes)
+        spaces = codes == SPACE
+
+        # A word starts at every non-space character that follows a space (or the text start)
+        starts = ~spaces & np.concatenate([[True], spaces[:-1]])
+        word_of_char = np.cumsum(starts) - 1
+        word_offsets = np.flatnonzero(starts)
+
+        keep = ids >= 0
+        if include_spaces and self.space_index is not None:
+            keep |= spaces
+            ids = np.where(spaces, self.space_index, ids)
+        offsets = np.flatnonzero(keep)
+        tokens = ids[offsets].astype(np.int64)
+        token_spaces = spaces[offsets]
+        token_words = np.where(token_spaces, -1, word_of_char[offsets])
+
+        # Space tokens sort after the word before them, so word i starts at its first letter
+        key = np.where(token_spaces, word_of_char[offsets] + 0.5, word_of_char[offsets])
+        word_starts = np.searchsorted(key, np.arange(len(word_offsets) + 1))
+        return Tokenized(tokens, offsets, token_words, word_offsets, word_starts)
+
+    def encode_batch(self, texts):
+        """Tokenized per text, encoding all of them in one vectorized pass."""
+        if not texts:
+            return []
+        lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        text_starts = np.concatenate([[0], np.cumsum(lengths + 1)[:-1]])
+        joined = self.encode(" ".join(texts))
+
+        # Split the joined arrays at text boundaries (the joining spaces start no word)
+        word_cuts = np.searchsorted(joined.word_offsets, text_starts)
+        token_cuts = joined.word_starts[word_cuts]
+        word_cuts = np.append(word_cuts, len(joined.word_offsets))
+        token_cuts = np.append(token_cuts, len(joined.tokens))
+
+        results = []
+        for i, start in enumerate(text_starts):
+            w0, w1 = word_cuts[i], word_cuts[i + 1]
+            t0, t1 = token_cuts[i], token_cuts[i + 1]
+            results.append(Tokenized(
+                joined.tokens[t0:t1],
+                joined.offsets[t0:t1] - start,
+                joined.token_words[t0:t1] - w0,
+                joined.word_offsets[w0:w1] - start,
+                joined.word_starts[w0:w1 + 1] - t0,
+            ))
+        return results
+
+    def token_counts(self, tokenized):
+        """Letter tokens per word (0 for words with no known characters)."""
+        letters = tokenized.token_words[tokenized.token_words >= 0]
+        return np.bincount(letters, minlength=len(tokenized.word_offsets))
+
+
+def word_spans(token_spans, tokenized, text):
+    """
+    WordSpans from merge_tokens() output, like merge_words().
+
+    `token_spans` must be the spans of tokenized.tokens in order; words with no
+    tokens are skipped.
+    """
+    starts = np.array([span.start for span in token_spans], dtype=np.int64)
+    ends = np.array([span.end for span in token_spans], dtype=np.int64)
+    letters = tokenized.token_words[tokenized.token_words >= 0]
+    counts = np.bincount(letters, minlength=len(tokenized.word_offsets))
+    first = tokenized.word_starts[:-1]
+    last = first + counts - 1
+    present = np.flatnonzero(counts > 0)
+
+    spans = []
+    word_ends = np.append(tokenized.word_offsets[1:], len(text))
+    for i, frame_start, frame_end in zip(present, starts[first[present]], ends[last[present]]):
+        offset = int(tokenized.word_offsets[i])
+        word = text[offset:int(word_ends[i])].rstrip(" ")
+        spans.append(WordSpan(int(i), word, offset, int(frame_start), int(frame_end)))
+    return spans
+
+
+def book_text(num_chars, seed=0):
+    """Book-length text made of shuffled synthetic-corpus sentences, split into paragraphs."""
+    from audio_corpus import SYNTHETIC_SENTENCES
+
+    rng = np.random.default_rng(seed)
+    paragraphs = []
+    total = 0
+    while total < num_chars:
+        sentences = rng.choice(SYNTHETIC_SENTENCES, size=int(rng.integers(2, 8)))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 1
+    return paragraphs
+
+
+def _index_loop(paragraphs, labels):
+    """The spike_mms_fa.py approach: labels.index() per character."""
+    result = []
+    for text in paragraphs:
+        tokens = []
+        for char in text.lower():
+            if char in labels and char not in ("-", "*"):
+                tokens.append(labels.index(char))
+        result.append(tokens)
+    return result
+
+
+def _timed(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized MMS_FA tokenizer")
+    parser.add_argument("--text", help="book text file (paragraphs separated by blank lines)")
+    parser.add_argument("--chars", type=int, default=2_000_000, help="generated text size without --text")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs (best is reported)")
+    args = parser.parse_args()
+
+    labels = load_labels()
+    tokenizer = BatchTokenizer(labels)
+    if args.text:
+        with open(args.text, encoding="utf-8") as f:
+            paragraphs = [" ".join(p.split()) for p in f.read().split("\n\n") if p.strip()]
+    else:
+        paragraphs = book_text(args.chars)
+    num_chars = sum(len(p) for p in paragraphs)
+
+    print("=" * 60)
+    print("MMS_FA Batch Tokenizer")
+    print("=" * 60)
+    print(f"\n   Text: {args.text or 'generated'} ({len(paragraphs)} paragraphs, {num_chars:,} characters)")
+
+    # 1. Same tokens, word grouping and word spans as ctc_align
+    print("\n1. Checking against ctc_align.tokenize_words / merge_words...")
+    samples = paragraphs[:200] + ["", "   ", "Don't  stop — İstanbul 42 & naïve café!", " leading and trailing "]
+    mismatches = 0
+    for text, batch in zip(samples, tokenizer.encode_batch(samples)):
+        single = tokenizer.encode(text)
+        tokens, words, counts = tokenize_words(text, labels)
+        ok = (
+            np.array_equal(single.tokens, tokens)
+            and np.array_equal(batch.tokens, tokens)
+            and np.array_equal(tokenizer.token_counts(single), counts)
+            and np.array_equal(batch.word_starts, single.word_starts)
+            and [offset for _, offset in words] == single.word_offsets.tolist()
+            and all(text[o].lower()[0] == labels[t] for o, t in zip(single.offsets, single.tokens))
+        )
+        # Word spans from (made-up) token spans, two frames per token
+        spans = [TokenSpan(int(t), 2 * k, 2 * k + 1, 0.0) for k, t in enumerate(tokens)]
+        ok = ok and word_spans(spans, single, text) == merge_words(spans, words, counts)
+        mismatches += not ok
+    print(f"   {'[PASS]' if not mismatches else '[FAIL]'} {len(samples) - mismatches}/{len(samples)} texts match")
+    empty_ok = tokenizer.encode_batch([]) == []
+    mismatches += not empty_ok
+    print(f"   {'[PASS]' if empty_ok else '[FAIL]'} encode_batch([]) returns no results")
+
+    # 2. Benchmark
+    print(f"\n2. Tokenizing the whole text (best of {args.repeats})...")
+    rows = [
+        ("labels.index() loop", lambda: _index_loop(paragraphs, labels)),
+        ("tokenize_words", lambda: [tokenize_words(p, labels) for p in paragraphs]),
+        ("BatchTokenizer.encode", lambda: [tokenizer.encode(p) for p in paragraphs]),
+        ("BatchTokenizer.encode_batch", lambda: tokenizer.encode_batch(paragraphs)),
+    ]
+    baseline = None
+    print(f"\n   {'method':<30}{'seconds':>9}{'M chars/s':>11}{'speedup':>9}")
+    for name, function in rows:
+        seconds, _ = _timed(function, args.repeats)
+        baseline = baseline or seconds
+        print(f"   {name:<30}{seconds:>9.3f}{num_chars / seconds / 1e6:>11.2f}{baseline / seconds:>8.1f}x")
+
+    if mismatches:
+        print("\n[FAIL] Batch tokenizer disagrees with tokenize_words")
+        return 1
+    print("\n[PASS] Batch tokenizer matches tokenize_words")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
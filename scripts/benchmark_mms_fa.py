@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Reproducible alignment benchmark for MMS_FA model variants (FP32 / INT8 / FP16).
+
+For every model variant and thread count, a fresh process loads the model,
+runs every utterance of a fixed corpus `--repeats` times and forced-aligns
+the transcript. Reported per configuration:
+  - p50 / p95 latency of one session.run (ms) and real-time factor
+  - session load time and peak RSS of the worker process
+  - argmax agreement and word-boundary error (ms) against the reference
+    variant (the first model) at the same thread count
+
+Results go to a JSON file so runs can be diffed across exports.
+
+Usage:
+    python scripts/benchmark_mms_fa.py                      # all models in Resources/mms-fa, synthetic corpus
+    python scripts/benchmark_mms_fa.py --corpus DIR --threads 1,2,4 --output bench.json
+    python scripts/benchmark_mms_fa.py --models mms-fa.onnx mms-fa-int8.onnx
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import corpus_seconds, load_corpus, synthetic_corpus
+from ctc_align import align_words, boundary_errors_ms, log_softmax, word_times
+from mms_fa_inference import (
+    FRAME_DURATION,
+    MODEL_DIR,
+    SAMPLE_RATE,
+    create_session,
+    load_labels,
+    model_size_bytes,
+    run_emissions,
+)
+from resource_usage import mb, peak_rss_bytes
+
+
+def default_models():
+    """Every .onnx in Resources/mms-fa except backups, FP32 (mms-fa.onnx) first."""
+    models = [
+        path for path in sorted(glob.glob(os.path.join(MODEL_DIR, "*.onnx")))
+        if "backup" not in os.path.basename(path)
+    ]
+    models.sort(key=lambda path: os.path.basename(path) != "mms-fa.onnx")
+    return models
+
+
+def run_variant(model_path, threads, utterances, labels, repeats):
+    """Worker: benchmark one (model, threads) configuration in a fresh process."""
+    start = time.perf_counter()
+    session = create_session(model_path, intra_op_threads=threads)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    run_emissions(session, utterances[0].audio)  # warm-up
+
+    per_utterance = []
+    for utterance in utterances:
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            emissions = run_emissions(session, utterance.audio)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        words = align_words(log_softmax(emissions), utterance.transcript, labels)
+        per_utterance.append({
+            "name": utterance.name,
+            "latencies_ms": latencies,
+            "argmax": emissions.argmax(-1).astype(np.int8),
+            "word_times": word_times(words, FRAME_DURATION),
+        })
+
+    return {"load_ms": load_ms, "peak_rss_bytes": peak_rss_bytes(), "utterances": per_utterance}
+
+
+def summarize(model_path, threads, run, reference, audio_seconds):
+    """Condense one worker result into the JSON record (agreement is against `reference`)."""
+    latencies = np.concatenate([u["latencies_ms"] for u in run["utterances"]])
+    median_total = sum(np.median(u["latencies_ms"]) for u in run["utterances"]) / 1000
+
+    record = {
+        "model": os.path.basename(model_path),
+        "model_size_mb": round(mb(model_size_bytes(model_path)), 2),
+        "threads": threads,
+        "load_ms": round(run["load_ms"], 1),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "real_time_factor": round(median_total / audio_seconds, 4),
+        "peak_rss_mb": round(mb(run["peak_rss_bytes"]), 1),
+    }
+
+    matches = total = 0
+    errors = []
+    for ours, ref in zip(run["utterances"], reference["utterances"]):
+        matches += int(np.sum(ours["argmax"] == ref["argmax"]))
+        total += len(ref["argmax"])
+        errors.append(boundary_errors_ms(ref["word_times"], ours["word_times"]))
+    errors = np.concatenate(errors)
+
+    record["argmax_agreement"] = round(matches / total, 5)
+    record["boundary_error_mean_ms"] = round(float(errors.mean()), 2) if errors.size else None
+    record["boundary_error_p95_ms"] = round(float(np.percentile(errors, 95)), 2) if errors.size else None
+    record["boundary_error_max_ms"] = round(float(errors.max()), 2) if errors.size else None
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MMS_FA model variants")
+    parser.add_argument("--models", nargs="+", help="model files (default: Resources/mms-fa/*.onnx); first is the reference")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--threads", default="1,2,4", help="comma-separated intra-op thread counts")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per utterance")
+    parser.add_argument("--output", default="mms-fa-benchmark.json", help="JSON results file")
+    args = parser.parse_args()
+
+    models = [
+        path if os.path.exists(path) else os.path.join(MODEL_DIR, path)
+        for path in (args.models or default_models())
+    ]
+    threads = [int(t) for t in args.threads.split(",")]
+    utterances = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    labels = load_labels()
+    audio_seconds = corpus_seconds(utterances)
+
+    print("=" * 60)
+    print("MMS_FA Alignment Benchmark")
+    print("=" * 60)
+    print(f"\n   Models: {[os.path.basename(m) for m in models]}")
+    print(f"   Corpus: {args.corpus or 'synthetic'} ({len(utterances)} utterances, {audio_seconds:.1f}s)")
+    print(f"   Threads: {threads}, repeats: {args.repeats}")
+
+    if not models or not utterances:
+        print("\n   ERROR: no models or no utterances to benchmark")
+        return 1
+
+    # One fresh process per configuration so peak RSS and load time are per-variant
+    context = multiprocessing.get_context("spawn")
+    records = []
+    for thread_count in threads:
+        reference = None
+        for model_path in models:
+            print(f"\n   {os.path.basename(model_path)} @ {thread_count} thread(s)...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                run = pool.submit(
+                    run_variant, model_path, thread_count, utterances, labels, args.repeats
+                ).result()
+            reference = reference or run
+
+            record = summarize(model_path, thread_count, run, reference, audio_seconds)
+            records.append(record)
+            print(f"     p50 {record['latency_p50_ms']:.1f} ms, p95 {record['latency_p95_ms']:.1f} ms, "
+                  f"RTF {record['real_time_factor']:.3f}, peak RSS {record['peak_rss_mb']:.0f} MB")
+            print(f"     argmax agreement {record['argmax_agreement'] * 100:.2f}%, "
+                  f"boundary error mean {record['boundary_error_mean_ms']} ms, "
+                  f"max {record['boundary_error_max_ms']} ms")
+
+    import onnxruntime as ort
+
+    results = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "onnxruntime": ort.__version__,
+        "reference_model": os.path.basename(models[0]),
+        "corpus": {
+            "source": args.corpus or "synthetic",
+            "utterances": [u.name for u in utterances],
+            "audio_seconds": round(audio_seconds, 3),
+            "sample_rate": SAMPLE_RATE,
+        },
+        "repeats": args.repeats,
+        "results": records,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"{'model':<28}{'thr':>4}{'p50 ms':>9}{'p95 ms':>9}{'RTF':>8}{'RSS MB':>8}{'agree':>8}{'bnd ms':>8}")
+    for r in records:
+        bnd = "-" if r["boundary_error_mean_ms"] is None else f"{r['boundary_error_mean_ms']:.1f}"
+        print(f"{r['model']:<28}{r['threads']:>4}{r['latency_p50_ms']:>9.1f}{r['latency_p95_ms']:>9.1f}"
+              f"{r['real_time_factor']:>8.3f}{r['peak_rss_mb']:>8.0f}{r['argmax_agreement'] * 100:>7.1f}%{bnd:>8}")
+    print(f"\nResults written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Length-bucketed, fixed-shape MMS_FA models and a dispatcher for them.
+
+Static-shape execution providers (CoreML and friends) compile one graph per
+input shape and handle fully dynamic `audio`/`emissions` axes badly.
+`export_mms_fa_model.py --buckets 2,5,10,20` exports one fixed-length model
+per bucket (mms-fa-bucket-<seconds>s.onnx) with inputs:
+    audio   [1, seconds * 16000] float32, zero-padded
+    length  [1] int64, the number of real samples
+and a fixed [1, num_frames(bucket), vocab] emissions output.
+
+BucketDispatcher pads each clip to the smallest bucket that fits, runs that
+model and trims the emissions to num_frames(len(clip)). Clips longer than
+the largest bucket go to an optional dynamic-shape fallback model.
+
+Usage:
+    python scripts/bucket_models.py [--buckets 2,5,10,20]    # list bucket models and their shapes
+    python scripts/test_bucket_models.py                      # CPU-EP equivalence tests
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from mms_fa_inference import (
+    FP32_MODEL,
+    INPUT_NAME,
+    LENGTH_NAME,
+    MODEL_DIR,
+    OUTPUT_NAME,
+    SAMPLE_RATE,
+    create_session,
+    has_length_input,
+    num_frames,
+    run_emissions,
+)
+
+BUCKET_SECONDS = (2.0, 5.0, 10.0, 20.0)
+
+
+def bucket_model_path(seconds):
+    """mms-fa-bucket-<seconds>s.onnx in Resources/mms-fa."""
+    return os.path.join(MODEL_DIR, f"mms-fa-bucket-{seconds:g}s.onnx")
+
+
+class BucketDispatcher:
+    """Route clips to fixed-length bucket models; sessions are created on first use."""
+
+    def __init__(self, model_paths, fallback_model=None, providers=None, intra_op_threads=0):
+        self.providers = providers
+        self.intra_op_threads = intra_op_threads
+        self.buckets = []  # (samples, path), shortest first
+        for path in model_paths:
+            self.buckets.append((self._model_samples(path), path))
+        self.buckets.sort()
+        self.fallback_model = fallback_model
+        self._sessions = {}
+
+    @staticmethod
+    def _model_samples(path):
+        """Fixed audio length of a bucket model, read from its input shape."""
+        import onnx
+
+        model = onnx.load(path, load_external_data=False)
+        dims = model.graph.input[0].type.tensor_type.shape.dim
+        if len(dims) != 2 or not dims[1].HasField("dim_value"):
+            raise ValueError(f"{path} does not have a fixed [1, samples] audio input")
+        return dims[1].dim_value
+
+    def _session(self, path):
+        if path not in self._sessions:
+            self._sessions[path] = create_session(path, self.intra_op_threads, providers=self.providers)
+        return self._sessions[path]
+
+    def bucket_for(self, num_samples):
+        """(samples, path) of the smallest bucket that fits, or None."""
+        for samples, path in self.buckets:
+            if num_samples <= samples:
+                return samples, path
+        return None
+
+    def emissions(self, audio):
+        """Emissions [num_frames(len(audio)), vocab] (float32) for one 16 kHz clip."""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        bucket = self.bucket_for(len(audio))
+        if bucket is None:
+            if self.fallback_model is None:
+                raise ValueError(
+                    f"{len(audio) / SAMPLE_RATE:.1f}s clip is longer than the largest bucket "
+                    f"({self.buckets[-1][0] / SAMPLE_RATE:g}s) and there is no fallback model"
+                )
+            return run_emissions(self._session(self.fallback_model), audio)
+
+        samples, path = bucket
+        session = self._session(path)
+        padded = np.zeros((1, samples), dtype=np.float32)
+        padded[0, :len(audio)] = audio
+        feeds = {INPUT_NAME: padded}
+        if has_length_input(session):
+            feeds[LENGTH_NAME] = np.array([len(audio)], dtype=np.int64)
+        emissions = session.run([OUTPUT_NAME], feeds)[0][0]
+        return emissions[:num_frames(len(audio))].astype(np.float32, copy=False)
+
+
+def compare_with_dynamic(dispatcher, dynamic_model=FP32_MODEL, lengths_seconds=None, seed=0):
+    """Trimmed bucket emissions vs the dynamic model for clips inside every bucket."""
+    if lengths_seconds is None:
+        lengths_seconds = []
+        previous = 0.5
+        for samples, _ in dispatcher.buckets:
+            seconds = samples / SAMPLE_RATE
+            # Short clip in the bucket, mid-bucket, and a clip that fills it exactly
+            lengths_seconds += [previous, (previous + seconds) / 2, seconds]
+            previous = seconds + 0.3
+
+    session = create_session(dynamic_model)
+    rng = np.random.default_rng(seed)
+    max_diff = 0.0
+    matches = total = 0
+    for seconds in lengths_seconds:
+        audio = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+        expected = run_emissions(session, audio)
+        actual = dispatcher.emissions(audio)
+        if actual.shape != expected.shape:
+            raise RuntimeError(f"{seconds:g}s: shape {actual.shape} != dynamic {expected.shape}")
+        max_diff = max(max_diff, float(np.abs(actual - expected).max()))
+        matches += int(np.sum(actual.argmax(-1) == expected.argmax(-1)))
+        total += len(expected)
+    return {"lengths": lengths_seconds, "max_diff": max_diff, "argmax_match": matches / total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List fixed-length MMS_FA bucket models")
+    parser.add_argument("--buckets", default=",".join(f"{s:g}" for s in BUCKET_SECONDS),
+                        help="comma-separated bucket lengths in seconds")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MMS_FA Bucket Models")
+    print("=" * 60)
+    print()
+    for seconds in [float(value) for value in args.buckets.split(",")]:
+        path = bucket_model_path(seconds)
+        if not os.path.exists(path):
+            print(f"   {seconds:>5g}s: missing ({os.path.basename(path)}); "
+                  f"run export_mms_fa_model.py --buckets {args.buckets}")
+            continue
+        samples = BucketDispatcher._model_samples(path)
+        print(f"   {seconds:>5g}s: {os.path.basename(path)} audio [1, {samples}] -> "
+              f"emissions [1, {num_frames(samples)}, vocab]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+"""
+NumPy CTC forced alignment for MMS_FA emissions.
+
+Drop-in replacement for torchaudio.functional.forced_align, so the alignment
+scripts only need numpy and onnxruntime (no multi-second torch import).
+
+The trellis uses the same rules as CTCForcedAligner.buildTrellis/backtrack
+on iOS: states are [blank, token0, blank, token1, ..., blank], and a state can
+stay, advance by one, or skip the blank between two *different* tokens.
+Each time step is computed for all states at once. Tie-breaking, start/end
+pruning and the choice of final state follow torchaudio's CPU kernel, so the
+returned path is identical to forced_align on the same float32 emissions.
+
+forced_align keeps int8 backpointers for every (frame, state), which grows
+with frames x tokens: a 30-minute chapter is ~88k frames x ~48k states.
+forced_align_banded only evaluates states within `band` states of the
+diagonal (and/or within `beam` of the frame's best score), storing
+backpointers for the evaluated window only, so memory is linear in length.
+A second, relaxed pass bounds every path that leaves the band; if that bound
+could beat the banded path, or the end is unreachable, it raises
+BandTooNarrow. The bound is loose on noisy emissions and over very long
+spans (a 10-minute chapter is rarely certified), so forced_align_auto falls
+back to forced_align_checkpointed: the same full search, but keeping only a
+score row every ~sqrt(T) frames and recomputing backpointers one segment at
+a time, so its memory grows with tokens x sqrt(frames) rather than
+tokens x frames.
+
+Usage:
+    python scripts/ctc_align.py    # self-check (compares with torchaudio if installed)
+"""
+
+from collections import namedtuple
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+
+# Token span from merge_tokens (end is exclusive, like torchaudio's TokenSpan)
+TokenSpan = namedtuple("TokenSpan", ["token", "start", "end", "score"])
+
+# Backpointer values: how far back (in states) the best predecessor was
+STAY, STEP, SKIP = 0, 1, 2
+
+# Default half-width (in trellis states) of the band around the diagonal
+DEFAULT_BAND = 400
+
+
+class BandTooNarrow(ValueError):
+    """The banded/beam-pruned search could not guarantee the full-search path."""
+
+
+def log_softmax(emissions, axis=-1):
+    """Log-softmax over the vocab axis, computed in the input dtype."""
+    emissions = np.asarray(emissions)
+    shifted = emissions - emissions.max(axis=axis, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=axis, keepdims=True))
+
+
+def _as_frames(log_probs):
+    """Accept [T, C] or [1, T, C] emissions and return a [T, C] array."""
+    log_probs = np.asarray(log_probs)
+    if log_probs.ndim == 3:
+        if log_probs.shape[0] != 1:
+            raise ValueError(f"Only batch size 1 is supported, got {log_probs.shape[0]}")
+        log_probs = log_probs[0]
+    if log_probs.ndim != 2:
+        raise ValueError(f"Expected [T, C] or [1, T, C] emissions, got shape {log_probs.shape}")
+    if not np.issubdtype(log_probs.dtype, np.floating):
+        log_probs = log_probs.astype(np.float32)
+    return log_probs
+
+
+def _check_targets(targets, num_frames, vocab_size, blank):
+    """Validate targets and return (targets, number of adjacent repeats)."""
+    targets = np.asarray(targets, dtype=np.int64).reshape(-1)
+    if targets.size == 0:
+        raise ValueError("targets must contain at least one token")
+    if targets.min() < 0 or targets.max() >= vocab_size:
+        raise ValueError(f"targets must be in [0, {vocab_size}), got {targets.min()}..{targets.max()}")
+    if np.any(targets == blank):
+        raise ValueError(f"targets must not contain the blank index ({blank})")
+
+    repeats = int(np.count_nonzero(targets[1:] == targets[:-1]))
+    if num_frames < targets.size + repeats:
+        raise ValueError(
+            f"Not enough frames ({num_frames}) for {targets.size} tokens "
+            f"with {repeats} repeats"
+        )
+    return targets, repeats
+
+
+def state_labels(targets, blank=0):
+    """Vocabulary index emitted by each trellis state [blank, t0, blank, t1, ..., blank]."""
+    labels = np.full(2 * len(targets) + 1, blank, dtype=np.int64)
+    labels[1::2] = targets
+    return labels
+
+
+def skip_mask(targets):
+    """True for token states that may be entered directly from state-2 (blank skip)."""
+    skip = np.zeros(2 * len(targets) + 1, dtype=bool)
+    skip[3::2] = targets[1:] != targets[:-1]
+    return skip
+
+
+def _advance_window(t, start, end, num_frames, targets, repeats):
+    """
+    States [start, end) worth evaluating at frame t, given frame t-1's window.
+
+    Prunes states that can no longer reach the end (start) or cannot have
+    been reached yet (end), the way torchaudio's CPU kernel does.
+    """
+    num_tokens = targets.size
+    if num_frames - t <= num_tokens + repeats:
+        if start % 2 == 1 and start // 2 + 1 < num_tokens \
+                and targets[start // 2] != targets[start // 2 + 1]:
+            start += 1
+        start += 1
+    if t <= num_tokens + repeats:
+        if end % 2 == 0 and end < 2 * num_tokens \
+                and targets[end // 2 - 1] != targets[end // 2]:
+            end += 1
+        end += 1
+    return start, end
+
+
+def viterbi_step(prev, emission, skip, out, backptr):
+    """
+    Advance one frame of the trellis for a contiguous range of states.
+
+    `prev` is the previous frame's scores with two leading -inf pads, so that
+    prev[2:] lines up with `out`, prev[1:-1] is state-1 and prev[:-2] is
+    state-2. Ties resolve the way torchaudio does: SKIP or STEP only win when
+    strictly better than both alternatives, otherwise STAY.
+    """
+    stay = prev[2:]
+    step = prev[1:-1]
+    jump = np.where(skip, prev[:-2], -np.inf)
+
+    take_jump = (jump > step) & (jump > stay)
+    take_step = (step > stay) & (step > jump)
+
+    np.copyto(out, stay)
+    np.copyto(out, step, where=take_step)
+    np.copyto(out, jump, where=take_jump)
+    out += emission
+
+    backptr[:] = take_step
+    backptr[take_jump] = SKIP
+
+
+def forced_align(log_probs, targets, blank=0):
+    """
+    Viterbi CTC forced alignment of `targets` to `log_probs`.
+
+    Args:
+        log_probs: [T, C] or [1, T, C] log-probabilities (see log_softmax)
+        targets: token indices without blanks
+        blank: blank index (0 for MMS_FA)
+
+    Returns:
+        (path, scores): per-frame label indices [T] and the log-probability of
+        each frame's label [T], matching torchaudio's forced_align()[0][0] and
+        [1][0].
+    """
+    emissions = _as_frames(log_probs)
+    num_frames, vocab_size = emissions.shape
+    targets, repeats = _check_targets(targets, num_frames, vocab_size, blank)
+
+    num_tokens = targets.size
+    num_states = 2 * num_tokens + 1
+    labels = state_labels(targets, blank)
+    skip = skip_mask(targets)
+    dtype = emissions.dtype
+
+    # Two rows of scores (with 2 leading pads) and int8 backpointers for every frame
+    rows = np.full((2, num_states + 2), -np.inf, dtype=dtype)
+    backptr = np.zeros((num_frames, num_states), dtype=np.int8)
+
+    # Prune states that cannot reach the end (start) or be reached yet (end)
+    start = 0 if num_frames - (num_tokens + repeats) > 0 else 1
+    end = 2
+    rows[0, 2 + start:2 + end] = emissions[0, labels[start:end]]
+
+    for t in range(1, num_frames):
+        start, end = _advance_window(t, start, end, num_frames, targets, repeats)
+
+        prev = rows[(t - 1) % 2]
+        cur = rows[t % 2]
+        cur[2:].fill(-np.inf)
+        viterbi_step(
+            prev[start:end + 2],
+            emissions[t, labels[start:end]],
+            skip[start:end],
+            cur[2 + start:2 + end],
+            backptr[t, start:end],
+        )
+
+    last = rows[(num_frames - 1) % 2, 2:]
+    state = num_states - 1 if last[num_states - 1] > last[num_states - 2] else num_states - 2
+    states = backtrack(backptr, state)
+
+    path = labels[states]
+    scores = emissions[np.arange(num_frames), path]
+    return path, scores
+
+
+def forced_align_checkpointed(log_probs, targets, blank=0, segment=None):
+    """
+    forced_align with O(S * sqrt(T)) memory instead of O(S * T) backpointers.
+
+    A first pass keeps only the score row at the start of every `segment`
+    frames (default ~sqrt(T)). Backtracking then recomputes one segment at a
+    time from its checkpoint, storing backpointers for that segment only.
+    Every frame runs the same viterbi_step on the same window as
+    forced_align, so the path and scores are identical; the cost is a second
+    forward pass.
+    """
+    emissions = _as_frames(log_probs)
+    num_frames, vocab_size = emissions.shape
+    targets, repeats = _check_targets(targets, num_frames, vocab_size, blank)
+
+    num_tokens = targets.size
+    num_states = 2 * num_tokens + 1
+    labels = state_labels(targets, blank)
+    skip = skip_mask(targets)
+    if segment is None:
+        segment = int(np.ceil(np.sqrt(num_frames)))
+
+    rows = np.full((2, num_states + 2), -np.inf, dtype=emissions.dtype)
+    windows = np.zeros((num_frames, 2), dtype=np.int64)
+    checkpoints = []  # score row of frame k * segment - 1, for k = 1, 2, ...
+    backptr = np.zeros((segment, num_states), dtype=np.int8)
+
+    def forward(t, start, end, backptr_row):
+        prev = rows[(t - 1) % 2]
+        cur = rows[t % 2]
+        cur[2:].fill(-np.inf)
+        viterbi_step(
+            prev[start:end + 2],
+            emissions[t, labels[start:end]],
+            skip[start:end],
+            cur[2 + start:2 + end],
+            backptr_row[start:end],
+        )
+
+    start = 0 if num_frames - (num_tokens + repeats) > 0 else 1
+    end = 2
+    windows[0] = start, end
+    rows[0, 2 + start:2 + end] = emissions[0, labels[start:end]]
+    for t in range(1, num_frames):
+        if t % segment == 0:
+            checkpoints.append(rows[(t - 1) % 2].copy())
+        start, end = _advance_window(t, start, end, num_frames, targets, repeats)
+        windows[t] = start, end
+        forward(t, start, end, backptr[0])
+
+    last = rows[(num_frames - 1) % 2, 2:]
+    state = num_states - 1 if last[num_states - 1] > last[num_states - 2] else num_states - 2
+
+    states = np.empty(num_frames, dtype=np.int64)
+    for k in range((num_frames - 1) // segment, -1, -1):
+        first, stop = k * segment, min((k + 1) * segment, num_frames)
+        backptr.fill(0)
+        if k == 0:
+            rows[:, 2:].fill(-np.inf)
+            rows[0, 2 + windows[0, 0]:2 + windows[0, 1]] = emissions[0, labels[windows[0, 0]:windows[0, 1]]]
+        else:
+            rows[(first - 1) % 2] = checkpoints[k - 1]
+        for t in range(max(first, 1), stop):
+            forward(t, windows[t, 0], windows[t, 1], backptr[t - first])
+        for t in range(stop - 1, first - 1, -1):
+            states[t] = state
+            state -= int(backptr[t - first, state])
+
+    path = labels[states]
+    scores = emissions[np.arange(num_frames), path]
+    return path, scores
+
+
+def backtrack(backptr, final_state):
+    """Follow int8 backpointers from `final_state` at the last frame; returns state per frame."""
+    num_frames = backptr.shape[0]
+    states = np.empty(num_frames, dtype=np.int64)
+    state = final_state
+    for t in range(num_frames - 1, -1, -1):
+        states[t] = state
+        state -= int(backptr[t, state])
+    return states
+
+
+def forced_align_banded(log_probs, targets, blank=0, band=DEFAULT_BAND, beam=None):
+    """
+    Forced alignment that only evaluates part of the trellis.
+
+    Args:
+        log_probs, targets, blank: as forced_align
+        band: half-width in states around the diagonal (state ~ t * S / T),
+            or None for no band
+        beam: prune states more than `beam` below the frame's best score,
+            or None for no beam
+
+    Returns:
+        (path, scores, cells): as forced_align, plus the number of
+        backpointers stored (forced_align stores T x (2L+1)).
+
+    Raises:
+        BandTooNarrow: the end state was unreachable, or a path leaving the
+        band could beat the banded result. A second, relaxed trellis bounds
+        every path that has left the band at least once: outside the band
+        it earns the frame's best transcript-label emission, and it may come
+        back in at the band edge. When that bound does not beat the banded
+        score, the banded path is optimal over the whole trellis. Beam
+        pruning is a heuristic: pruned cells are not bounded, and it is only
+        reported when it leaves the end unreachable.
+    """
+    emissions = _as_frames(log_probs)
+    num_frames, vocab_size = emissions.shape
+    targets, repeats = _check_targets(targets, num_frames, vocab_size, blank)
+
+    num_tokens = targets.size
+    num_states = 2 * num_tokens + 1
+    labels = state_labels(targets, blank)
+    skip = skip_mask(targets)
+    slope = (num_states - 1) / max(num_frames - 1, 1)
+
+    rows = np.full((2, num_states + 2), -np.inf, dtype=emissions.dtype)
+    windows = [(0, 0), (0, 0)]  # state range last written to each row
+
+    # Backpointers of each frame's window, packed back to back
+    lows = np.zeros(num_frames, dtype=np.int64)
+    offsets = np.zeros(num_frames + 1, dtype=np.int64)
+    outside = _OutsideBound(emissions, labels, skip) if band is not None else None
+    width = num_states if band is None else min(num_states, 2 * band + 1)
+    backptr = np.zeros(num_frames * min(width, 256), dtype=np.int8)
+
+    start = 0 if num_frames - (num_tokens + repeats) > 0 else 1
+    end = 2
+    live = (0, num_states)
+
+    for t in range(num_frames):
+        if t > 0:
+            start, end = _advance_window(t, start, end, num_frames, targets, repeats)
+
+        lo, hi = start, end
+        if band is not None:
+            centre = int(round(t * slope))
+            lo, hi = max(lo, centre - band), min(hi, centre + band + 1)
+        band_lo, band_hi = lo, hi
+        # Only states reachable from the previous frame's live states
+        lo, hi = max(lo, live[0]), min(hi, live[1] + 2)
+        if lo >= hi:
+            raise BandTooNarrow(f"No states left to evaluate at frame {t}")
+
+        lows[t] = lo
+        offsets[t + 1] = offsets[t] + hi - lo
+        if offsets[t + 1] > backptr.size:
+            grown = np.zeros(max(2 * backptr.size, int(offsets[t + 1])), dtype=np.int8)
+            grown[:offsets[t]] = backptr[:offsets[t]]
+            backptr = grown
+
+        cur = rows[t % 2]
+        old_lo, old_hi = windows[t % 2]
+        cur[2 + old_lo:2 + old_hi] = -np.inf
+        windows[t % 2] = (lo, hi)
+
+        if t == 0:
+            cur[2 + lo:2 + hi] = emissions[0, labels[lo:hi]]
+        else:
+            viterbi_step(
+                rows[(t - 1) % 2][lo:hi + 2],
+                emissions[t, labels[lo:hi]],
+                skip[lo:hi],
+                cur[2 + lo:2 + hi],
+                backptr[offsets[t]:offsets[t + 1]],
+            )
+
+        if outside is not None:
+            outside.step(t, rows, (band_lo, band_hi), (start, end))
+
+        window = cur[2 + lo:2 + hi]
+        keep = window > -np.inf
+        if beam is not None and keep.any():
+            keep &= window >= window.max() - beam
+            window[~keep] = -np.inf
+        alive = np.flatnonzero(keep)
+        if not alive.size:
+            raise BandTooNarrow(f"Every state was pruned at frame {t}")
+        live = (lo + int(alive[0]), lo + int(alive[-1]) + 1)
+
+    last = rows[(num_frames - 1) % 2, 2:]
+    if last[num_states - 1] == -np.inf and last[num_states - 2] == -np.inf:
+        raise BandTooNarrow("End of the transcript is unreachable within the band/beam")
+    state = num_states - 1 if last[num_states - 1] > last[num_states - 2] else num_states - 2
+
+    states = np.empty(num_frames, dtype=np.int64)
+    for t in range(num_frames - 1, -1, -1):
+        states[t] = state
+        state -= int(backptr[offsets[t] + state - lows[t]])
+
+    path = labels[states]
+    scores = emissions[np.arange(num_frames), path]
+    if band is not None:
+        bound = outside.bound(num_frames - 1)
+        total = float(np.sum(scores, dtype=np.float64))
+        if bound > total + 1e-4 * max(1.0, abs(total)):
+            raise BandTooNarrow(f"A path leaving the band could score up to {bound:.2f} > {total:.2f}")
+    return path, scores, int(offsets[-1])
+
+
+class _OutsideBound:
+    """
+    forced_align_banded's relaxed trellis: an upper bound on paths that left the band.
+
+    `rows` holds, for every in-band state, a bound on paths that were outside
+    the band at some earlier frame; out_low / out_high bound paths currently
+    below / above the band. Outside, a path earns the frame's best
+    transcript-label emission, and it can come back in at the band edge.
+    """
+
+    def __init__(self, emissions, labels, skip):
+        self.emissions = emissions
+        self.labels = labels
+        self.skip = skip
+        self.best_label = emissions[:, np.unique(labels)].max(axis=1).astype(np.float64)
+        self.rows = np.full((2, len(labels) + 2), -np.inf, dtype=np.float64)
+        self.bands = [(0, 0), (0, 0)]
+        self.out_low = self.out_high = -np.inf
+
+    def step(self, t, band_rows, band, reachable):
+        """Advance to frame t; `band_rows` are the banded trellis rows, `band` this frame's [lo, hi)."""
+        lo, hi = band
+        start, end = reachable
+        prev_lo, prev_hi = self.bands[(t - 1) % 2]
+        cur = self.rows[t % 2]
+        old_lo, old_hi = self.bands[t % 2]
+        cur[2 + old_lo:2 + old_hi] = -np.inf
+        self.bands[t % 2] = (lo, hi)
+        if t == 0:
+            return
+        prev = self.rows[(t - 1) % 2]
+        emission = self.emissions[t]
+
+        # Paths that left earlier and are inside again: the same recurrence as the band
+        cur[2 + lo:2 + hi] = self._entry(prev, emission, lo, hi)
+        # Coming back in from below (states rise by at most 2) or from above (the band catches up)
+        for first, last, score in ((lo, min(hi, prev_lo + 2), self.out_low),
+                                   (max(lo, prev_hi), hi, self.out_high)):
+            if first < last:
+                np.maximum(cur[2 + first:2 + last], score + emission[self.labels[first:last]],
+                           out=cur[2 + first:2 + last])
+
+        # Leaving the band (from either trellis) or staying outside
+        leaving = []
+        for first, last in ((max(start, prev_lo), lo), (hi, min(end, prev_hi + 2))):
+            scores = [-np.inf]
+            if first < last:
+                scores += [self._entry(band_rows[(t - 1) % 2], emission, first, last).max(),
+                           self._entry(prev, emission, first, last).max()]
+            leaving.append(max(scores))
+        self.out_low = max(self.out_low + self.best_label[t], leaving[0])
+        self.out_high = max(self.out_high + self.best_label[t], leaving[1])
+
+    def _entry(self, prev, emission, first, last):
+        """Scores of states [first, last) reached from `prev` (padded row) in one frame."""
+        stay = prev[2 + first:2 + last]
+        step = prev[1 + first:1 + last]
+        jump = np.where(self.skip[first:last], prev[first:last], -np.inf)
+        return np.maximum(np.maximum(stay, step), jump) + emission[self.labels[first:last]]
+
+    def bound(self, t):
+        """Bound at frame t for paths ending in either final state."""
+        return float(self.rows[t % 2, -2:].max())
+
+
+def forced_align_auto(log_probs, targets, blank=0, band=DEFAULT_BAND, beam=None):
+    """
+    Banded alignment with a checkpointed full-search fallback.
+
+    Returns (path, scores, fallback_reason): fallback_reason is None when the
+    banded result was used, otherwise the BandTooNarrow message.
+    """
+    try:
+        path, scores, _ = forced_align_banded(log_probs, targets, blank=blank, band=band, beam=beam)
+        return path, scores, None
+    except BandTooNarrow as e:
+        path, scores = forced_align_checkpointed(log_probs, targets, blank=blank)
+        return path, scores, str(e)
+
+
+def merge_tokens(path, scores, blank=0):
+    """
+    Collapse a frame-level path into token spans (like torchaudio.functional.merge_tokens).
+
+    Returns a list of TokenSpan(token, start, end, score) with `end` exclusive
+    and `score` the mean frame score of the span.
+    """
+    path = np.asarray(path)
+    scores = np.asarray(scores)
+    changes = np.flatnonzero(np.diff(path, prepend=-1, append=-1) != 0)
+    starts, ends = changes[:-1], changes[1:]
+    keep = path[starts] != blank
+    starts, ends = starts[keep], ends[keep]
+
+    cumsum = np.concatenate([[0.0], np.cumsum(scores, dtype=np.float64)])
+    sums = cumsum[ends] - cumsum[starts]
+
+    return [
+        TokenSpan(int(path[s]), int(s), int(e), float(total / (e - s)))
+        for s, e, total in zip(starts, ends, sums)
+    ]
+
+
+def split_words(transcript):
+    """Split on spaces like CTCForcedAligner.mergeToWords; returns [(text, char_offset)]."""
+    words = []
+    offset = 0
+    for text in transcript.split(" "):
+        if text:
+            words.append((text, offset))
+        offset += len(text) + 1
+    return words
+
+
+def tokenize_words(transcript, labels, blank=0, space_label="*"):
+    """
+    Tokenize like CTCTokenizer.tokenize(_, includeSpaces: false).
+
+    Lowercases, skips characters that are not in `labels` and drops spaces.
+    The blank ("-" in MMS_FA) and the "*" space label are never produced from
+    text, so "well-known" tokenizes as "wellknown".
+    Returns (tokens, words, token_counts) where `words` is split_words() output
+    and token_counts[i] is how many tokens word i contributed.
+    """
+    index = {label: i for i, label in enumerate(labels) if i != blank and label != space_label}
+    tokens = []
+    words = split_words(transcript)
+    counts = []
+    for text, _ in words:
+        word_tokens = [index[c] for c in text.lower() if c in index]
+        tokens.extend(word_tokens)
+        counts.append(len(word_tokens))
+    return np.array(tokens, dtype=np.int64), words, counts
+
+
+# Word span in frames (end exclusive)
+WordSpan = namedtuple("WordSpan", ["index", "text", "offset", "start", "end"])
+
+
+def merge_words(spans, words, token_counts):
+    """Group consecutive token spans into WordSpans (words with no tokens are skipped)."""
+    result = []
+    position = 0
+    for i, ((text, offset), count) in enumerate(zip(words, token_counts)):
+        if count == 0 or position >= len(spans):
+            continue
+        first, last = spans[position], spans[min(position + count, len(spans)) - 1]
+        result.append(WordSpan(i, text, offset, first.start, last.end))
+        position += count
+    return result
+
+
+def align_words(log_probs, transcript, labels, blank=0, band=None, beam=None):
+    """
+    Forced-align `transcript` and return its WordSpans (empty if nothing to align).
+
+    With `band` or `beam` set, uses forced_align_auto (banded, falling back
+    to the full search).
+    """
+    tokens, words, counts = tokenize_words(transcript, labels)
+    if tokens.size == 0:
+        return []
+    if band is None and beam is None:
+        path, scores = forced_align(log_probs, tokens, blank=blank)
+    else:
+        path, scores, _ = forced_align_auto(log_probs, tokens, blank=blank, band=band, beam=beam)
+    return merge_words(merge_tokens(path, scores, blank=blank), words, counts)
+
+
+def word_times(word_spans, frame_duration):
+    """{word index: (start_seconds, end_seconds)} for WordSpans."""
+    return {w.index: (w.start * frame_duration, w.end * frame_duration) for w in word_spans}
+
+
+def boundary_errors_ms(reference, candidate):
+    """
+    Absolute start/end differences in ms for words present in both word_times() dicts.
+
+    Returns an array with two entries (start, end) per common word.
+    """
+    common = sorted(set(reference) & set(candidate))
+    if not common:
+        return np.zeros(0)
+    ref = np.array([reference[i] for i in common])
+    cand = np.array([candidate[i] for i in common])
+    return np.abs(ref - cand).reshape(-1) * 1000
+
+
+def random_case(rng, num_frames, num_tokens, vocab_size=29, noise=3.0):
+    """Random emissions and targets (with some forced repeats) for self-checks."""
+    emissions = log_softmax(rng.standard_normal((num_frames, vocab_size)).astype(np.float32) * noise)
+    targets = rng.integers(1, vocab_size, size=num_tokens)
+    repeat_at = rng.random(num_tokens) < 0.15
+    repeat_at[0] = False
+    targets[repeat_at] = np.roll(targets, 1)[repeat_at]
+    return emissions, targets
+
+
+def planted_case(rng, num_frames, num_tokens, vocab_size=29, noise=3.0):
+    """Noisy emissions with a speech-like alignment planted in them (for banded and online checks)."""
+    emissions, targets = random_case(rng, num_frames, num_tokens, vocab_size, noise)
+    # Irregular token durations, with pauses (blank runs) between some tokens
+    weights = rng.gamma(2.0, size=num_tokens) + (rng.random(num_tokens) < 0.05) * 20
+    bounds = np.concatenate([[0], np.cumsum(weights)]) / weights.sum() * num_frames
+    for i, token in enumerate(targets):
+        first = int(bounds[i])
+        last = max(first + 1, int(first + (bounds[i + 1] - first) * 0.6))
+        emissions[first:last, token] += 6.0
+    return log_softmax(emissions), targets
+
+
+def main():
+    print("=" * 60)
+    print("NumPy CTC Forced Alignment Self-Check")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    cases = [(49, 5), (98, 11), (200, 60), (300, 140), (30, 20), (12, 10)]
+
+    try:
+        import torch
+        from torchaudio.functional import forced_align as torch_forced_align
+    except ImportError:
+        torch = None
+        print("\n   torchaudio not installed - checking internal consistency only")
+
+    failures = 0
+    for num_frames, num_tokens in cases:
+        emissions, targets = random_case(rng, num_frames, num_tokens)
+        path, scores = forced_align(emissions, targets)
+
+        # Collapsing the path must give back exactly the target sequence
+        spans = merge_tokens(path, scores)
+        ok = [s.token for s in spans] == targets.tolist()
+        checkpointed_path, checkpointed_scores = forced_align_checkpointed(emissions, targets, segment=7)
+        ok = ok and np.array_equal(path, checkpointed_path) and np.array_equal(scores, checkpointed_scores)
+
+        if torch is not None:
+            ref_path, ref_scores = torch_forced_align(
+                torch.from_numpy(emissions[None]),
+                torch.from_numpy(targets[None].astype(np.int32)),
+                blank=0,
+            )
+            ok = ok and np.array_equal(path, ref_path[0].numpy())
+            ok = ok and np.array_equal(scores, ref_scores[0].numpy())
+
+        failures += not ok
+        print(f"   T={num_frames:4d} L={num_tokens:4d}: {'PASS' if ok else 'FAIL'}")
+
+    # Hyphens and "*" are labels too (blank and space) but must never become targets
+    labels = ["-"] + list("abcdefghijklmnopqrstuvwxyz'") + ["*"]
+    emissions, _ = random_case(rng, 60, 1, vocab_size=len(labels))
+    tokens, _, counts = tokenize_words("a well-known *fact", labels)
+    spans = align_words(emissions, "a well-known *fact", labels)
+    ok = counts == [1, 9, 4] and 0 not in tokens and [w.text for w in spans] == ["a", "well-known", "*fact"]
+    failures += not ok
+    print(f"   hyphenated transcript: {'PASS' if ok else 'FAIL'}")
+
+    # Timing on a long paragraph (~60 s of audio, ~800 characters)
+    emissions, targets = random_case(rng, 2940, 800)
+    start = time.perf_counter()
+    forced_align(emissions, targets)
+    elapsed = time.perf_counter() - start
+    print(f"\n   60s paragraph (2940 frames x 800 tokens): {elapsed * 1000:.1f} ms")
+
+    # Banded search must reproduce the full search or report that it could not
+    # (noise 1.0 is closer to a real model's peaked emissions than the default)
+    print("\n   Banded / beam-pruned search:")
+    for num_frames, num_tokens, band, beam in [(49, 5, 400, None), (300, 140, 400, None),
+                                               (2940, 800, 400, None), (2940, 800, 100, None),
+                                               (2940, 800, None, 100.0), (2940, 800, 400, 100.0)]:
+        emissions, targets = planted_case(rng, num_frames, num_tokens, noise=1.0)
+        path, scores = forced_align(emissions, targets)
+        try:
+            banded_path, _, cells = forced_align_banded(emissions, targets, band=band, beam=beam)
+            ok = np.array_equal(path, banded_path)
+            detail = f"{cells / (num_frames * (2 * num_tokens + 1)) * 100:.1f}% of backpointers"
+        except BandTooNarrow as e:
+            ok, detail = True, f"reported: {e}"
+        failures += not ok
+        print(f"   T={num_frames:4d} L={num_tokens:4d} band={band} beam={beam}: "
+              f"{'PASS' if ok else 'FAIL'} ({detail})")
+
+    # Fuzz: a banded result that is not reported must score as well as the full search
+    worse = certified = 0
+    for i in range(200):
+        num_frames = int(rng.integers(50, 600))
+        num_tokens = int(rng.integers(5, num_frames // 3))
+        emissions, targets = (planted_case if i % 2 else random_case)(
+            rng, num_frames, num_tokens, noise=float(rng.choice([1.0, 3.0])))
+        _, scores = forced_align(emissions, targets)
+        try:
+            _, banded_scores, _ = forced_align_banded(emissions, targets, band=int(rng.integers(3, 60)))
+        except BandTooNarrow:
+            continue
+        certified += 1
+        worse += banded_scores.sum(dtype=np.float64) < scores.sum(dtype=np.float64) - 1e-3
+    failures += worse
+    print(f"   fuzz (200 cases, {certified} certified): {'PASS' if not worse else 'FAIL'} "
+          f"({worse} worse than the full search)")
+
+    # A band that is too narrow must be reported and fall back to the full search
+    emissions, targets = planted_case(rng, 2940, 800)
+    path, _ = forced_align(emissions, targets)
+    fallback_path, _, reason = forced_align_auto(emissions, targets, band=3)
+    ok = reason is not None and np.array_equal(path, fallback_path)
+    failures += not ok
+    print(f"   band=3 fallback: {'PASS' if ok else 'FAIL'} ({reason})")
+
+    # Chapter-length alignment: banded when certified, otherwise the checkpointed full search
+    emissions, targets = planted_case(rng, 29400, 8000, noise=1.0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    _, _, reason = forced_align_auto(emissions, targets, band=DEFAULT_BAND)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    outcome = "banded" if reason is None else "not certified, checkpointed full search"
+    full = 29400 * 16001
+    ok = peak < full / 8
+    failures += not ok
+    print(f"\n   10 min chapter (29400 frames x 8000 tokens), band {DEFAULT_BAND}: {'PASS' if ok else 'FAIL'} "
+          f"({outcome}, {elapsed:.1f} s, peak {peak / 1e6:.0f} MB; dense backpointers: {full / 1e6:.0f} MB)")
+
+    if failures:
+        print(f"\n[FAIL] {failures} case(s) did not match")
+        return 1
+    print("\n[PASS] NumPy forced alignment matches" + (" torchaudio" if torch is not None else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
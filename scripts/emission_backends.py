@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Pluggable emission backends for the alignment tooling.
+
+Alignment only needs per-frame CTC log-probabilities and a way to turn the
+transcript into token indices, so each model is wrapped as an
+EmissionBackend that describes:
+  - model_path, tokens_path
+  - sample_rate and frame_duration (seconds per emission frame)
+  - blank index
+and implements emissions(audio) and tokenize(transcript). align() runs the
+shared CTC forced alignment (ctc_align) on top and returns WordSpans in the
+backend's own frames; word_times() converts them to seconds.
+
+Backends:
+  mms-fa    Resources/mms-fa/mms-fa.onnx, 29 character labels, blank 0, 20 ms frames
+  nemo-ctc  Resources/ASRModels/nemo-ctc-conformer-small/nemo-ctc-model.int8.onnx
+            (sherpa-onnx export), 1024 BPE tokens + <blk>, 80-dim log-mel input,
+            10 ms hop x subsampling_factor (4 -> 40 ms frames)
+
+main() compares backends on the same corpus, one fresh process each: load
+time, peak RSS, latency / real-time factor and word-boundary error against the
+first backend (MMS_FA).
+
+Usage:
+    python scripts/emission_backends.py [--backends mms-fa nemo-ctc] [--corpus DIR] [--threads 2]
+    python scripts/emission_backends.py --nemo-model PATH --max-boundary-ms 40 --output backends.json
+"""
+
+import abc
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import corpus_seconds, load_corpus, resample, synthetic_corpus
+from ctc_align import (
+    boundary_errors_ms,
+    forced_align,
+    log_softmax,
+    merge_tokens,
+    merge_words,
+    split_words,
+    tokenize_words,
+    word_times,
+)
+from mms_fa_inference import (
+    FP32_MODEL,
+    FRAME_DURATION,
+    LABELS_PATH,
+    PROJECT_ROOT,
+    SAMPLE_RATE,
+    create_session,
+    load_labels,
+    model_size_bytes,
+    run_emissions,
+)
+from resource_usage import mb, peak_rss_bytes
+
+NEMO_DIR = os.path.join(
+    PROJECT_ROOT, "Listen2", "Listen2", "Listen2", "Resources", "ASRModels", "nemo-ctc-conformer-small"
+)
+NEMO_MODEL = os.path.join(NEMO_DIR, "nemo-ctc-model.int8.onnx")
+NEMO_TOKENS = os.path.join(NEMO_DIR, "nemo-ctc-tokens.txt")
+
+# NeMo AudioToMelSpectrogramPreprocessor defaults the conformer was trained with
+NEMO_WINDOW = 400  # 25 ms
+NEMO_HOP = 160  # 10 ms
+NEMO_FFT = 512
+NEMO_MELS = 80
+NEMO_PREEMPHASIS = 0.97
+NEMO_LOG_GUARD = 2 ** -24
+
+WORD_BOUNDARY = "▁"  # SentencePiece word-start marker
+
+
+class EmissionBackend(abc.ABC):
+    """A CTC model the forced aligner can run on; subclasses set the attributes below."""
+
+    name = None
+    sample_rate = SAMPLE_RATE
+    frame_duration = None
+    blank = 0
+
+    def __init__(self, model_path, tokens_path, intra_op_threads=0):
+        self.model_path = model_path
+        self.tokens_path = tokens_path
+        self.intra_op_threads = intra_op_threads
+        self._session = None
+
+    @property
+    def session(self):
+        """onnxruntime session, created on first use."""
+        if self._session is None:
+            check_model_file(self.model_path)
+            self._session = create_session(self.model_path, self.intra_op_threads)
+        return self._session
+
+    @abc.abstractmethod
+    def emissions(self, audio):
+        """Log-probabilities [frames, vocab] (float32) for one mono clip at self.sample_rate."""
+
+    @abc.abstractmethod
+    def tokenize(self, transcript):
+        """(tokens, words, token_counts) like ctc_align.tokenize_words."""
+
+    def align(self, audio, transcript, log_probs=None):
+        """WordSpans (in this backend's frames) for `transcript` spoken in `audio`."""
+        if log_probs is None:
+            log_probs = self.emissions(audio)
+        tokens, words, counts = self.tokenize(transcript)
+        if tokens.size == 0:
+            return []
+        path, scores = forced_align(log_probs, tokens, blank=self.blank)
+        return merge_words(merge_tokens(path, scores, blank=self.blank), words, counts)
+
+    def word_times(self, word_spans):
+        """{word index: (start_seconds, end_seconds)}."""
+        return word_times(word_spans, self.frame_duration)
+
+
+class MMSFABackend(EmissionBackend):
+    """torchaudio MMS_FA export (see export_mms_fa_model.py)."""
+
+    name = "mms-fa"
+    frame_duration = FRAME_DURATION
+    blank = 0
+
+    def __init__(self, model_path=FP32_MODEL, tokens_path=LABELS_PATH, intra_op_threads=0):
+        super().__init__(model_path, tokens_path, intra_op_threads)
+        self.labels = load_labels(tokens_path)
+
+    def emissions(self, audio):
+        return log_softmax(run_emissions(self.session, audio))
+
+    def tokenize(self, transcript):
+        return tokenize_words(transcript, self.labels)
+
+
+class NemoCTCBackend(EmissionBackend):
+    """
+    NeMo EncDecCTCModelBPE exported by sherpa-onnx (the model WordAlignmentService loads).
+
+    Inputs are `audio_signal` [1, 80, T] log-mel features and `length` [1];
+    the output is log-probabilities [1, T / subsampling_factor, vocab + 1]
+    with <blk> last. Features follow NeMo's preprocessor (pre-emphasis,
+    25 ms Hann window, 10 ms hop, 512-point FFT, slaney mel, log with a 2^-24
+    guard, per-feature normalization), read from the model metadata where
+    sherpa-onnx records it.
+    """
+
+    name = "nemo-ctc"
+
+    def __init__(self, model_path=NEMO_MODEL, tokens_path=NEMO_TOKENS, intra_op_threads=0):
+        super().__init__(model_path, tokens_path, intra_op_threads)
+        self.tokens = load_tokens(tokens_path)
+        self.token_ids = {token: i for i, token in enumerate(self.tokens)}
+        self.blank = self.token_ids.get("<blk>", len(self.tokens) - 1)
+        self.max_token_chars = max(len(token) for token in self.tokens)
+        self.subsampling_factor = 4
+        self.normalize_type = "per_feature"
+        self.frame_duration = NEMO_HOP / SAMPLE_RATE * self.subsampling_factor
+        self._mel = mel_filterbank(SAMPLE_RATE, NEMO_FFT, NEMO_MELS)
+
+    @property
+    def session(self):
+        if self._session is None:
+            session = super().session
+            metadata = session.get_modelmeta().custom_metadata_map
+            self.subsampling_factor = int(metadata.get("subsampling_factor", self.subsampling_factor))
+            self.normalize_type = metadata.get("normalize_type", self.normalize_type)
+            self.frame_duration = NEMO_HOP / SAMPLE_RATE * self.subsampling_factor
+        return self._session
+
+    def features(self, audio):
+        """Log-mel features [80, frames] (float32)."""
+        return nemo_features(audio, self._mel, self.normalize_type)
+
+    def emissions(self, audio):
+        session = self.session
+        features = self.features(audio)[np.newaxis]
+        feeds = {session.get_inputs()[0].name: features}
+        if len(session.get_inputs()) > 1:
+            feeds[session.get_inputs()[1].name] = np.array([features.shape[2]], dtype=np.int64)
+        log_probs = session.run([session.get_outputs()[0].name], feeds)[0][0]
+        return log_softmax(log_probs.astype(np.float32, copy=False))
+
+    def tokenize(self, transcript):
+        """
+        Greedy longest-match BPE over the token list.
+
+        Each lowercased word is matched as "▁word"; characters no token
+        covers are skipped, like tokenize_words skips characters outside the
+        MMS_FA labels.
+        """
+        tokens = []
+        words = split_words(transcript)
+        counts = []
+        for text, _ in words:
+            piece = WORD_BOUNDARY + text.lower()
+            word_tokens = []
+            position = 0
+            while position < len(piece):
+                for length in range(min(self.max_token_chars, len(piece) - position), 0, -1):
+                    token = self.token_ids.get(piece[position:position + length])
+                    if token is not None and token != self.blank:
+                        word_tokens.append(token)
+                        position += length
+                        break
+                else:
+                    position += 1  # no token covers this character
+            tokens.extend(word_tokens)
+            counts.append(len(word_tokens))
+        return np.array(tokens, dtype=np.int64), words, counts
+
+
+BACKENDS = {backend.name: backend for backend in (MMSFABackend, NemoCTCBackend)}
+
+
+def create_backend(name, model_path=None, tokens_path=None, intra_op_threads=0):
+    """Backend `name` ("mms-fa" or "nemo-ctc") with optional model/tokens overrides."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {sorted(BACKENDS)}")
+    kwargs = {"intra_op_threads": intra_op_threads}
+    if model_path:
+        kwargs["model_path"] = model_path
+    if tokens_path:
+        kwargs["tokens_path"] = tokens_path
+    return BACKENDS[name](**kwargs)
+
+
+def check_model_file(path):
+    """Raise a helpful error for missing models and un-fetched git-lfs pointers."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found: {path}")
+    if os.path.getsize(path) < 1024:
+        with open(path, "rb") as f:
+            if f.read(32).startswith(b"version https://git-lfs"):
+                raise FileNotFoundError(f"{path} is a git-lfs pointer; run `git lfs pull` first")
+
+
+def load_tokens(path=NEMO_TOKENS):
+    """sherpa-onnx tokens.txt ("<token> <id>" per line) as a list indexed by id."""
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").rsplit(" ", 1)
+            if len(parts) == 2 and parts[1].isdigit():
+                entries[int(parts[1])] = parts[0]
+    return [entries[i] for i in range(len(entries))]
+
+
+def _hz_to_mel(hz):
+    """Slaney mel scale (librosa's default, which NeMo uses)."""
+    hz = np.asarray(hz, dtype=np.float64)
+    linear = hz / (200.0 / 3)
+    log = 15.0 + np.log(np.maximum(hz, 1e-10) / 1000.0) / (np.log(6.4) / 27.0)
+    return np.where(hz >= 1000.0, log, linear)
+
+
+def _mel_to_hz(mel):
+    mel = np.asarray(mel, dtype=np.float64)
+    linear = mel * (200.0 / 3)
+    log = 1000.0 * np.exp((np.log(6.4) / 27.0) * (mel - 15.0))
+    return np.where(mel >= 15.0, log, linear)
+
+
+def mel_filterbank(sample_rate, n_fft, n_mels, fmin=0.0, fmax=None):
+    """Slaney-normalized triangular mel filters [n_mels, n_fft // 2 + 1]."""
+    fmax = fmax or sample_rate / 2
+    fft_freqs = np.linspace(0, sample_rate / 2, n_fft // 2 + 1)
+    mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    widths = np.diff(mel_freqs)
+    ramps = mel_freqs[:, np.newaxis] - fft_freqs[np.newaxis, :]
+    lower = -ramps[:-2] / widths[:-1, np.newaxis]
+    upper = ramps[2:] / widths[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, np.newaxis]
+    return weights.astype(np.float32)
+
+
+def nemo_features(audio, mel, normalize_type="per_feature"):
+    """NeMo-style log-mel features [n_mels, len(audio) // hop + 1] for 16 kHz audio."""
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    audio = np.concatenate([audio[:1], audio[1:] - NEMO_PREEMPHASIS * audio[:-1]])
+
+    # Centered STFT: zero-pad by n_fft / 2, Hann window padded to n_fft
+    num_frames = len(audio) // NEMO_HOP + 1
+    padded = np.pad(audio, (NEMO_FFT // 2, NEMO_FFT // 2 + NEMO_HOP))
+    offsets = np.arange(num_frames)[:, np.newaxis] * NEMO_HOP + np.arange(NEMO_FFT)[np.newaxis, :]
+    window = np.zeros(NEMO_FFT, dtype=np.float32)
+    left = (NEMO_FFT - NEMO_WINDOW) // 2
+    window[left:left + NEMO_WINDOW] = np.hanning(NEMO_WINDOW)
+    power = np.abs(np.fft.rfft(padded[offsets] * window, n=NEMO_FFT)) ** 2
+
+    features = np.log(mel @ power.T.astype(np.float32) + NEMO_LOG_GUARD)
+    if normalize_type == "per_feature":
+        mean = features.mean(axis=1, keepdims=True)
+        std = features.std(axis=1, ddof=1, keepdims=True) if num_frames > 1 else np.zeros_like(mean)
+        features = (features - mean) / (std + 1e-5)
+    return features.astype(np.float32)
+
+
+def run_backend(name, model_path, threads, utterances, repeats):
+    """Worker: time one backend over the corpus in a fresh process."""
+    start = time.perf_counter()
+    backend = create_backend(name, model_path, intra_op_threads=threads)
+    backend.session
+    load_ms = (time.perf_counter() - start) * 1000
+
+    backend.emissions(utterances[0].audio)  # warm-up
+
+    per_utterance = []
+    for utterance in utterances:
+        audio = utterance.audio
+        if backend.sample_rate != SAMPLE_RATE:
+            audio = resample(audio, SAMPLE_RATE, backend.sample_rate)
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            log_probs = backend.emissions(audio)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        words = backend.align(audio, utterance.transcript, log_probs)
+        align_ms = (time.perf_counter() - start) * 1000
+        per_utterance.append({
+            "name": utterance.name,
+            "latencies_ms": latencies,
+            "align_ms": align_ms,
+            "frames": len(log_probs),
+            "word_times": backend.word_times(words),
+        })
+
+    return {
+        "model": backend.model_path,
+        "frame_duration": backend.frame_duration,
+        "load_ms": load_ms,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "utterances": per_utterance,
+    }
+
+
+def summarize(name, run, reference, audio_seconds):
+    """JSON record for one backend; boundary errors are against `reference`."""
+    latencies = np.concatenate([u["latencies_ms"] for u in run["utterances"]])
+    median_total = sum(np.median(u["latencies_ms"]) for u in run["utterances"]) / 1000
+    errors = np.concatenate([
+        boundary_errors_ms(ref["word_times"], ours["word_times"])
+        for ours, ref in zip(run["utterances"], reference["utterances"])
+    ])
+    return {
+        "backend": name,
+        "model": os.path.basename(run["model"]),
+        "model_size_mb": round(mb(model_size_bytes(run["model"])), 2),
+        "frame_ms": round(run["frame_duration"] * 1000, 1),
+        "frames": sum(u["frames"] for u in run["utterances"]),
+        "load_ms": round(run["load_ms"], 1),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "align_ms": round(sum(u["align_ms"] for u in run["utterances"]), 1),
+        "real_time_factor": round(median_total / audio_seconds, 4),
+        "peak_rss_mb": round(mb(run["peak_rss_bytes"]), 1),
+        "boundary_error_mean_ms": round(float(errors.mean()), 2) if errors.size else None,
+        "boundary_error_p95_ms": round(float(np.percentile(errors, 95)), 2) if errors.size else None,
+        "boundary_error_max_ms": round(float(errors.max()), 2) if errors.size else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CTC emission backends for forced alignment")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS),
+                        help="backends to compare; the first is the accuracy reference")
+    parser.add_argument("--mms-fa-model", default=FP32_MODEL, help="MMS_FA ONNX model")
+    parser.add_argument("--nemo-model", default=NEMO_MODEL, help="NeMo CTC ONNX model")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--threads", type=int, default=2, help="intra-op threads (the app uses 2)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per utterance")
+    parser.add_argument("--max-boundary-ms", type=float, default=40.0,
+                        help="p95 boundary error at which a backend is good enough")
+    parser.add_argument("--output", default="emission-backends.json", help="JSON results file")
+    args = parser.parse_args()
+
+    model_paths = {"mms-fa": args.mms_fa_model, "nemo-ctc": args.nemo_model}
+    utterances = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    audio_seconds = corpus_seconds(utterances)
+
+    print("=" * 60)
+    print("CTC Emission Backend Comparison")
+    print("=" * 60)
+    print(f"\n   Corpus: {args.corpus or 'synthetic'} ({len(utterances)} utterances, {audio_seconds:.1f}s)")
+    print(f"   Threads: {args.threads}, repeats: {args.repeats}")
+
+    context = multiprocessing.get_context("spawn")
+    records = []
+    reference = None
+    for name in args.backends:
+        path = model_paths[name]
+        print(f"\n   {name}: {path}")
+        try:
+            check_model_file(path)
+        except FileNotFoundError as e:
+            print(f"     WARNING: {e}, skipping")
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            run = pool.submit(run_backend, name, path, args.threads, utterances, args.repeats).result()
+        reference = reference or run
+        record = summarize(name, run, reference, audio_seconds)
+        records.append(record)
+        print(f"     {record['frame_ms']:g} ms frames, p50 {record['latency_p50_ms']:.1f} ms, "
+              f"RTF {record['real_time_factor']:.3f}, peak RSS {record['peak_rss_mb']:.0f} MB")
+
+    if not records:
+        print("\n   ERROR: no backend could be loaded")
+        return 1
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"{'backend':<10}{'MB':>7}{'frame':>7}{'p50 ms':>9}{'RTF':>8}{'align ms':>10}{'RSS MB':>8}"
+          f"{'mean ms':>9}{'p95 ms':>8}")
+    for r in records:
+        print(f"{r['backend']:<10}{r['model_size_mb']:>7.1f}{r['frame_ms']:>7g}{r['latency_p50_ms']:>9.1f}"
+              f"{r['real_time_factor']:>8.3f}{r['align_ms']:>10.1f}{r['peak_rss_mb']:>8.0f}"
+              f"{r['boundary_error_mean_ms'] or 0:>9.1f}{r['boundary_error_p95_ms'] or 0:>8.1f}")
+
+    reference_name = records[0]["backend"]
+    for r in records[1:]:
+        p95 = r["boundary_error_p95_ms"]
+        good = p95 is not None and p95 <= args.max_boundary_ms
+        speedup = records[0]["real_time_factor"] / r["real_time_factor"]
+        print(f"\n   {r['backend']} vs {reference_name}: {speedup:.2f}x real-time factor, "
+              f"p95 boundary error {p95} ms")
+        print(f"   {'[PASS]' if good else '[FAIL]'} {r['backend']} "
+              f"{'is' if good else 'is not'} within {args.max_boundary_ms:.0f} ms of {reference_name}")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "corpus": args.corpus or "synthetic",
+            "threads": args.threads,
+            "reference": reference_name,
+            "max_boundary_ms": args.max_boundary_ms,
+            "results": records,
+        }, f, indent=2)
+    print(f"\nResults written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
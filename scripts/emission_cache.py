@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Persistent, content-addressed cache of MMS_FA emissions.
+
+Repeated experiments over a fixed corpus (quantization checks, boundary
+sweeps, export verification) keep recomputing emissions for identical audio.
+Entries are keyed by a SHA-256 of the 16 kHz float32 audio bytes and a
+SHA-256 of the model file (plus its .data file), and stored as float16 .npy
+files that are memory-mapped on read:
+
+    <cache>/<model hash[:16]>/<audio hash>.npy
+
+Model hashes are remembered per (path, size, mtime) in model-hashes.json so
+a 1 GB model is only hashed once. Reads refresh an entry's mtime. The cache
+keeps a running size total (one directory scan per EmissionCache), and only
+when a write takes it over the size cap does it rescan and delete the least
+recently used entries until the cache is 10% under the cap, so filling the
+cache doesn't rescan it on every write.
+
+Misses return the float16 round-tripped values too, so results don't depend
+on whether the cache was warm.
+
+Usage:
+    python scripts/emission_cache.py              # show cache size and entries
+    python scripts/emission_cache.py --clear
+    python scripts/emission_cache.py --demo [--model PATH]   # cold vs warm pass over the synthetic corpus
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "listen2", "mms-fa-emissions",
+)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+MODEL_HASHES_FILE = "model-hashes.json"
+
+# Eviction frees space down to this fraction of the size cap
+EVICT_TO = 0.9
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_hash(audio):
+    """Hex SHA-256 of audio as contiguous float32 samples."""
+    return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes()).hexdigest()
+
+
+class EmissionCache:
+    """Disk cache of float16 emissions with LRU eviction under `max_bytes`."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # running total of entry sizes, scanned on first write
+        os.makedirs(directory, exist_ok=True)
+        self._model_hashes = self._load_model_hashes()
+
+    def _load_model_hashes(self):
+        try:
+            with open(os.path.join(self.directory, MODEL_HASHES_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_model_hashes(self):
+        path = os.path.join(self.directory, MODEL_HASHES_FILE)
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, delete=False) as f:
+            json.dump(self._model_hashes, f, indent=2)
+        os.replace(f.name, path)
+
+    def model_hash(self, model_path):
+        """SHA-256 over the model file and its .data file, memoized by path/size/mtime."""
+        files = [model_path] + ([model_path + ".data"] if os.path.exists(model_path + ".data") else [])
+        stamp = [[os.path.getsize(p), os.stat(p).st_mtime_ns] for p in files]
+        key = os.path.abspath(model_path)
+
+        entry = self._model_hashes.get(key)
+        if entry and entry["stamp"] == stamp:
+            return entry["sha256"]
+
+        digest = hashlib.sha256()
+        for path in files:
+            digest.update(sha256_file(path).encode())
+        value = digest.hexdigest()
+        self._model_hashes[key] = {"stamp": stamp, "sha256": value}
+        self._save_model_hashes()
+        return value
+
+    def path_for(self, model_path, audio):
+        return os.path.join(self.directory, self.model_hash(model_path)[:16], audio_hash(audio) + ".npy")
+
+    def get(self, model_path, audio):
+        """Memory-mapped float16 emissions, or None on a miss."""
+        path = self.path_for(model_path, audio)
+        try:
+            emissions = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return emissions
+
+    def put(self, model_path, audio, emissions):
+        """
+        Store emissions as float16 and evict old entries; returns the memory-mapped copy.
+
+        Entries larger than max_bytes on their own are not cached; the
+        float16 array is returned from memory instead.
+        """
+        emissions = np.asarray(emissions, dtype=np.float16)
+        if emissions.nbytes > self.max_bytes:
+            return emissions
+        path = self.path_for(model_path, audio)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replaced = os.path.getsize(path) if os.path.exists(path) else 0
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".npy", delete=False) as f:
+            np.save(f, emissions)
+        os.replace(f.name, path)
+        if self._size is None:
+            self._size = self.size_bytes()
+        else:
+            self._size += os.path.getsize(path) - replaced
+        if self._size > self.max_bytes:
+            self.evict(keep=path, target_bytes=int(self.max_bytes * EVICT_TO))
+        return np.load(path, mmap_mode="r")
+
+    def emissions(self, session, model_path, audio, compute=None):
+        """
+        Cached emissions for `audio`, running the model only on a miss.
+
+        `compute(session, audio)` defaults to mms_fa_inference.run_emissions.
+        Returned values are float16 (memory-mapped); callers upcast as needed.
+        """
+        cached = self.get(model_path, audio)
+        if cached is not None:
+            return cached
+        if compute is None:
+            from mms_fa_inference import run_emissions as compute
+        return self.put(model_path, audio, compute(session, audio))
+
+    def entries(self):
+        """[(mtime, size, path)] for every cached .npy, oldest first."""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".npy"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, stat.st_size, path))
+        return sorted(found)
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None, target_bytes=None):
+        """
+        Delete least recently used entries (never `keep`) until the cache is
+        under `target_bytes` (default max_bytes); returns how many were removed.
+
+        Rescans the directory, so the running size total also picks up
+        entries written or deleted by other processes.
+        """
+        if target_bytes is None:
+            target_bytes = self.max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self._model_hashes = {}
+        self._size = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or exercise the MMS_FA emission cache")
+    parser.add_argument("--dir", default=DEFAULT_CACHE_DIR, help="cache directory")
+    parser.add_argument("--max-gb", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3, help="size cap in GB")
+    parser.add_argument("--clear", action="store_true", help="delete every cached entry")
+    parser.add_argument("--demo", action="store_true", help="time a cold and a warm pass over the synthetic corpus")
+    parser.add_argument("--model", help="model for --demo (default: Resources/mms-fa/mms-fa.onnx)")
+    args = parser.parse_args()
+
+    cache = EmissionCache(args.dir, int(args.max_gb * 1024 ** 3))
+
+    print("=" * 60)
+    print("MMS_FA Emission Cache")
+    print("=" * 60)
+    print(f"\n   Directory: {cache.directory}")
+
+    if args.clear:
+        cache.clear()
+        print("   Cleared")
+
+    if args.demo:
+        from audio_corpus import synthetic_corpus
+        from mms_fa_inference import FP32_MODEL, create_session
+
+        model_path = args.model or FP32_MODEL
+        session = create_session(model_path)
+        corpus = synthetic_corpus()
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            for utterance in corpus:
+                cache.emissions(session, model_path, utterance.audio)
+            elapsed = time.perf_counter() - start
+            print(f"   {label} pass: {elapsed * 1000:.1f} ms ({cache.hits} hits, {cache.misses} misses so far)")
+
+    entries = cache.entries()
+    print(f"   Entries: {len(entries)}")
+    print(f"   Size: {sum(size for _, size, _ in entries) / 1024 / 1024:.1f} MB "
+          f"(cap {cache.max_bytes / 1024 ** 3:.1f} GB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,31 @@ This script:
 2. Exports it to ONNX with dynamic axes for batch and time dimensions
 3. Saves the labels to a text file
 4. Verifies the export with onnxruntime inference test
+5. Optionally pre-optimizes the graph offline (--optimize, see optimize_mms_fa.py)
+6. Optionally exports a native-rate variant (--native-rate 22050) that takes
+   Piper's audio, resamples it in-graph and outputs log-probabilities
+   (--fp16-output for float16), see native_rate_mms_fa.py
+7. Optionally drops the top N transformer layers (--drop-layers N) before
+   exporting to mms-fa-drop<N>.onnx, see sweep_layer_pruning.py
+8. Optionally exports fixed-length bucket models (--buckets 2,5,10,20) for
+   static-shape execution providers, see bucket_models.py
+9. Optionally exports a length-aware batch model (--batch, mms-fa-batch.onnx)
+   whose clips stay independent when padded into one [B, T] batch, see
+   mms_fa_inference.py
+
+export_pipeline.py runs load/export/optimize/quantize/verify/package as
+cached stages and only re-runs the ones whose inputs changed.
 
 Usage:
     source venv-mms-spike/bin/activate && python scripts/export_mms_fa_model.py
+    python scripts/export_mms_fa_model.py --optimize [--optimize-level extended] [--ort-format]
+    python scripts/export_mms_fa_model.py --native-rate 22050 [--fp16-output]
+    python scripts/export_mms_fa_model.py --drop-layers 6 [--output PATH]
+    python scripts/export_mms_fa_model.py --buckets 2,5,10,20
+    python scripts/export_mms_fa_model.py --batch
 """
 
-import torch
-import torchaudio
+import argparse
 import numpy as np
 import os
 import sys
@@ -24,9 +42,47 @@ PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "Listen2", "Listen2", "Listen2", "Resources", "mms-fa")
 ONNX_PATH = os.path.join(OUTPUT_DIR, "mms-fa.onnx")
 LABELS_PATH = os.path.join(OUTPUT_DIR, "labels.txt")
+BATCH_PATH = os.path.join(OUTPUT_DIR, "mms-fa-batch.onnx")
+
+
+def pruned_model_path(count):
+    """mms-fa-drop<N>.onnx next to mms-fa.onnx."""
+    return os.path.join(OUTPUT_DIR, f"mms-fa-drop{count}.onnx")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Export MMS_FA to ONNX")
+    parser.add_argument("--optimize", action="store_true",
+                        help="also save an offline-optimized model and compare session creation time")
+    parser.add_argument("--optimize-level", choices=["basic", "extended", "all"], default="extended",
+                        help="onnxruntime optimization level for --optimize")
+    parser.add_argument("--ort-format", action="store_true", help="save the optimized model in ORT format")
+    parser.add_argument("--native-rate", type=int,
+                        help="also export a variant taking audio at this rate (e.g. 22050) and returning log-probs")
+    parser.add_argument("--fp16-output", action="store_true", help="native-rate variant outputs float16")
+    parser.add_argument("--drop-layers", type=int, default=0, help="drop the top N transformer layers")
+    parser.add_argument("--output", help="ONNX path (default: mms-fa.onnx, or mms-fa-drop<N>.onnx when pruning)")
+    parser.add_argument("--buckets", help="also export fixed-length models for these seconds (e.g. 2,5,10,20)")
+    parser.add_argument("--batch", action="store_true",
+                        help="also export a length-aware batch model (audio [B, T] + length [B])")
+    args = parser.parse_args()
+
+    # torch/torchaudio are imported after argument parsing so --help works
+    # without them; the model wrappers live in mms_fa_torch.py
+    import torch
+    import torchaudio
+    from mms_fa_torch import (
+        BucketWrapper,
+        EmissionsOnlyWrapper,
+        NativeRateWrapper,
+        drop_encoder_layers,
+        export_batch_onnx,
+        export_bucket_onnx,
+        export_onnx,
+    )
+
+    onnx_path = args.output or (pruned_model_path(args.drop_layers) if args.drop_layers else ONNX_PATH)
+
     print("=" * 60)
     print("MMS_FA Model Export to ONNX")
     print("=" * 60)
@@ -74,6 +130,12 @@ def main():
         total_params = sum(p.numel() for p in model.parameters())
         print(f"   Total parameters: {total_params:,}")
         print(f"   Estimated size: {total_params * 4 / 1024 / 1024:.1f} MB (float32)")
+
+        if args.drop_layers:
+            kept = drop_encoder_layers(model, args.drop_layers)
+            total_params = sum(p.numel() for p in model.parameters())
+            print(f"   Dropped top {args.drop_layers} transformer layers, {kept} kept")
+            print(f"   Parameters after pruning: {total_params:,} ({total_params * 4 / 1024 / 1024:.1f} MB)")
     except Exception as e:
         print(f"   ERROR loading model: {e}")
         sys.exit(1)
@@ -113,38 +175,14 @@ def main():
     # 5. Export to ONNX
     print("\n5. Exporting to ONNX...")
     try:
-        # Wrap model to return only the emissions tensor
-        class EmissionsOnlyWrapper(torch.nn.Module):
-            def __init__(self, model):
-                super().__init__()
-                self.model = model
-
-            def forward(self, audio):
-                output = self.model(audio)
-                if isinstance(output, tuple):
-                    return output[0]
-                return output
-
         wrapped_model = EmissionsOnlyWrapper(model)
         wrapped_model.eval()
 
-        torch.onnx.export(
-            wrapped_model,
-            dummy_audio,
-            ONNX_PATH,
-            input_names=["audio"],
-            output_names=["emissions"],
-            dynamic_axes={
-                "audio": {0: "batch", 1: "time"},
-                "emissions": {0: "batch", 1: "frames", 2: "vocab"}
-            },
-            opset_version=14,
-            verbose=False
-        )
+        export_onnx(wrapped_model, dummy_audio, onnx_path)
 
         # Calculate total size including any external data file
-        file_size_bytes = os.path.getsize(ONNX_PATH)
-        external_data_path = ONNX_PATH + ".data"
+        file_size_bytes = os.path.getsize(onnx_path)
+        external_data_path = onnx_path + ".data"
         external_data_size = 0
         if os.path.exists(external_data_path):
             external_data_size = os.path.getsize(external_data_path)
@@ -154,7 +192,7 @@ def main():
         file_size_mb = file_size_bytes / 1024 / 1024
 
         print(f"   Export successful!")
-        print(f"   ONNX file: {ONNX_PATH}")
+        print(f"   ONNX file: {onnx_path}")
         print(f"   ONNX file size: {file_size_mb:.2f} MB ({file_size_bytes:,} bytes)")
         if external_data_size > 0:
             ext_mb = external_data_size / 1024 / 1024
@@ -173,7 +211,7 @@ def main():
     try:
         import onnxruntime as ort
 
-        session = ort.InferenceSession(ONNX_PATH)
+        session = ort.InferenceSession(onnx_path)
 
         # Get input/output info
         print(f"   Inputs:")
@@ -226,15 +264,124 @@ def main():
     except Exception as e:
         print(f"   ERROR with variable length: {e}")
 
+    # 8. Offline graph optimization
+    optimized_model = None
+    if args.optimize:
+        print(f"\n8. Optimizing graph offline ({args.optimize_level})...")
+        try:
+            from optimize_mms_fa import optimize_model, report
+
+            optimized_model = optimize_model(onnx_path, level=args.optimize_level, ort_format=args.ort_format)
+            print(f"   Saved: {optimized_model}")
+            report(onnx_path, optimized_model)
+        except Exception as e:
+            print(f"   ERROR optimizing graph: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+    # 9. Native-rate log-prob variant
+    native_model = None
+    if args.native_rate:
+        print(f"\n9. Exporting {args.native_rate} Hz log-prob variant...")
+        try:
+            from native_rate_mms_fa import compare, native_model_path, report
+            from audio_corpus import synthetic_corpus
+
+            native_model = native_model_path(args.native_rate, args.fp16_output)
+            native_wrapper = NativeRateWrapper(
+                wrapped_model, args.native_rate, bundle.sample_rate, fp16_output=args.fp16_output
+            )
+            native_wrapper.eval()
+            export_onnx(native_wrapper, torch.randn(1, args.native_rate), native_model)
+            print(f"   Saved: {native_model}")
+            totals = report(compare(
+                onnx_path, native_model, synthetic_corpus(sample_rate=args.native_rate),
+                labels, args.native_rate,
+            ))
+            if totals["argmax"] < 0.99:
+                print("   WARNING: native-rate variant disagrees with the 16 kHz path")
+        except Exception as e:
+            print(f"   ERROR exporting native-rate variant: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+    # 10. Fixed-length bucket models
+    bucket_models = []
+    if args.buckets:
+        print(f"\n10. Exporting fixed-length bucket models ({args.buckets} s)...")
+        try:
+            from bucket_models import BucketDispatcher, bucket_model_path, compare_with_dynamic
+
+            bucket_wrapper = BucketWrapper(model)
+            bucket_wrapper.eval()
+            for seconds in [float(value) for value in args.buckets.split(",")]:
+                path = bucket_model_path(seconds)
+                samples = int(seconds * bundle.sample_rate)
+                export_bucket_onnx(bucket_wrapper, samples, path)
+                bucket_models.append(path)
+                print(f"   {seconds:g}s: {path}")
+
+            stats = compare_with_dynamic(BucketDispatcher(bucket_models), onnx_path)
+            print(f"   Trimmed vs dynamic: max diff {stats['max_diff']:.6f}, "
+                  f"argmax {stats['argmax_match'] * 100:.2f}%")
+        except Exception as e:
+            print(f"   ERROR exporting bucket models: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+    # 11. Length-aware batch model
+    batch_model = None
+    if args.batch:
+        print("\n11. Exporting length-aware batch model...")
+        try:
+            from mms_fa_inference import batch_emissions, create_session, run_emissions
+
+            batch_wrapper = BucketWrapper(model)
+            batch_wrapper.eval()
+            export_batch_onnx(batch_wrapper, BATCH_PATH)
+            batch_model = BATCH_PATH
+            print(f"   Saved: {batch_model}")
+
+            rng = np.random.default_rng(0)
+            clips = [
+                (rng.standard_normal(int(rng.uniform(1.0, 8.0) * bundle.sample_rate)) * 0.1).astype(np.float32)
+                for _ in range(16)
+            ]
+            reference = create_session(onnx_path)
+            single = [run_emissions(reference, clip) for clip in clips]
+            batched = batch_emissions(create_session(batch_model), clips, max_padding=0.5)
+            matches = sum(np.sum(a.argmax(-1) == b.argmax(-1)) for a, b in zip(single, batched))
+            total = sum(a.shape[0] for a in single)
+            max_diff = max(np.abs(a - b).max() for a, b in zip(single, batched))
+            print(f"   Batched vs batch=1: max diff {max_diff:.6f}, argmax {matches / total * 100:.2f}%")
+            if matches / total < 0.99:
+                print("   WARNING: batched emissions disagree with batch=1")
+        except Exception as e:
+            print(f"   ERROR exporting batch model: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
     # Summary
     print("\n" + "=" * 60)
     print("EXPORT SUMMARY")
     print("=" * 60)
-    print(f"ONNX model: {ONNX_PATH}")
+    print(f"ONNX model: {onnx_path}")
     print(f"  ONNX file size: {file_size_mb:.2f} MB")
     if external_data_size > 0:
         print(f"  External data: {external_data_size / 1024 / 1024:.2f} MB")
     print(f"  TOTAL SIZE: {total_size_mb:.2f} MB")
+    if optimized_model:
+        print(f"Optimized model: {optimized_model}")
+    if native_model:
+        print(f"Native-rate model: {native_model} ({args.native_rate} Hz in, log-probs out)")
+    for path in bucket_models:
+        print(f"Bucket model: {path}")
+    if batch_model:
+        print(f"Batch model: {batch_model} (audio [B, T] + length [B])")
     print(f"Labels file: {LABELS_PATH}")
     print(f"  Count: {len(labels)}")
     print(f"  Labels: {labels}")
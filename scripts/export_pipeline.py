@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Incremental MMS_FA export: load -> export -> optimize -> quantize -> verify -> package.
+
+export_mms_fa_model.py redoes everything on every run, and a run that only
+changes the package layout still loads torch and re-exports 1.2 GB of
+weights. Here each stage writes its outputs under --build-dir and records
+them in manifest.json together with a key: SHA-256 over the stage name, its
+parameters, the hashes of its input files and the source of the code it
+runs. A stage re-runs only when its key changed or an output is missing or
+was modified; everything downstream of a re-run stage is re-checked the
+same way, so a new --package-layout only re-runs package.
+
+Stages (inputs -> outputs, frameworks imported):
+  load      torchaudio bundle -> mms-fa-torch.pt, labels.txt, reference.npz   torch
+  export    mms-fa-torch.pt -> mms-fa.onnx (+ .data)                          torch
+  optimize  mms-fa.onnx -> mms-fa.opt.onnx (+ .data)                          onnxruntime
+  quantize  mms-fa.onnx -> mms-fa-int8.onnx                                   onnxruntime
+  verify    models + reference.npz -> verify.json                             onnxruntime
+  package   chosen model + labels.txt -> package/                             onnx
+
+Heavy frameworks are imported inside the stages that use them, so a run
+where only onnxruntime stages are stale never imports torch. File hashes
+are memoized in the manifest by size and mtime.
+
+Every stage that runs is recorded by resource_usage.MemoryTracker (peak and
+retained RSS; Python allocations only with --trace-python, since tracemalloc
+slows the torch export stages considerably). With --memory-budget-mb a stage
+that peaks above the budget fails the run and is not recorded as done, and
+--timeline writes the RSS samples and stage records as JSON.
+
+Usage:
+    python scripts/export_pipeline.py                          # run whatever is stale
+    python scripts/export_pipeline.py --dry-run                # show what would run
+    python scripts/export_pipeline.py --until verify --drop-layers 6
+    python scripts/export_pipeline.py --force quantize --package-model int8 --package-layout aligned
+    python scripts/export_pipeline.py --force --memory-budget-mb 4000 --timeline export-memory.json
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from emission_cache import sha256_file
+from mms_fa_inference import PROJECT_ROOT, SCRIPT_DIR, SAMPLE_RATE, model_size_bytes, num_frames
+from resource_usage import MemoryTracker, mb
+
+DEFAULT_BUILD_DIR = os.path.join(PROJECT_ROOT, "build", "mms-fa-export")
+MANIFEST_FILE = "manifest.json"
+
+# Reference clip lengths (seconds) whose PyTorch emissions the ONNX models are checked against
+REFERENCE_SECONDS = (0.5, 1.0, 2.0, 5.0)
+
+# --package-model -> build file
+PACKAGE_MODELS = {"export": "mms-fa.onnx", "optimized": "mms-fa.opt.onnx", "int8": "mms-fa-int8.onnx"}
+
+# Modules whose import the run reports, to show which stages pulled them in
+HEAVY_MODULES = ("torch", "torchaudio", "onnx", "onnxruntime")
+
+
+def _path(build_dir, name):
+    return os.path.join(build_dir, name)
+
+
+def stage_load(build_dir, args):
+    """MMS_FA bundle -> pickled (optionally pruned) model, labels and reference emissions."""
+    import torch
+    from torchaudio.pipelines import MMS_FA as bundle
+    from mms_fa_torch import EmissionsOnlyWrapper, drop_encoder_layers
+
+    model = bundle.get_model()
+    model.eval()
+    if args.drop_layers:
+        drop_encoder_layers(model, args.drop_layers)
+    wrapped = EmissionsOnlyWrapper(model)
+    wrapped.eval()
+    torch.save(wrapped, _path(build_dir, "mms-fa-torch.pt"))
+
+    with open(_path(build_dir, "labels.txt"), "w") as f:
+        for label in bundle.get_labels():
+            f.write(f"{label}\n")
+
+    rng = np.random.default_rng(0)
+    reference = {}
+    for i, seconds in enumerate(REFERENCE_SECONDS):
+        audio = rng.standard_normal((1, int(seconds * SAMPLE_RATE))).astype(np.float32)
+        with torch.no_grad():
+            reference[f"audio_{i}"] = audio
+            reference[f"emissions_{i}"] = wrapped(torch.from_numpy(audio)).numpy()
+    np.savez(_path(build_dir, "reference.npz"), **reference)
+
+
+def stage_export(build_dir, args):
+    """Pickled model -> mms-fa.onnx with the app's input/output names and dynamic axes."""
+    import torch
+    from mms_fa_torch import export_onnx
+
+    wrapped = torch.load(_path(build_dir, "mms-fa-torch.pt"), weights_only=False)
+    wrapped.eval()
+    path = _path(build_dir, "mms-fa.onnx")
+    for stale in (path, path + ".data"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    export_onnx(wrapped, torch.randn(1, SAMPLE_RATE), path)
+
+
+def stage_optimize(build_dir, args):
+    from optimize_mms_fa import optimize_model
+
+    optimize_model(_path(build_dir, "mms-fa.onnx"), _path(build_dir, "mms-fa.opt.onnx"), level=args.optimize_level)
+
+
+def stage_quantize(build_dir, args):
+    from quantize_mms_fa import quantize_dynamic_model
+
+    quantize_dynamic_model(_path(build_dir, "mms-fa.onnx"), _path(build_dir, "mms-fa-int8.onnx"))
+
+
+def stage_verify(build_dir, args):
+    """
+    Check every model on the reference clips; raises when a check fails.
+
+    export and optimized must match PyTorch within --tolerance, int8 must
+    agree with the export's frame argmax on --min-argmax-match of frames,
+    and every model must return num_frames(samples) frames.
+    """
+    from mms_fa_inference import create_session, run_emissions
+
+    reference = np.load(_path(build_dir, "reference.npz"))
+    count = len(reference.files) // 2
+    models = {
+        "export": _path(build_dir, "mms-fa.onnx"),
+        "optimized": _path(build_dir, "mms-fa.opt.onnx"),
+        "int8": _path(build_dir, "mms-fa-int8.onnx"),
+    }
+    outputs = {name: [] for name in models}
+    report = {"tolerance": args.tolerance, "min_argmax_match": args.min_argmax_match, "models": {}}
+    failures = []
+    for name, path in models.items():
+        session = create_session(path)
+        max_diff = 0.0
+        for i in range(count):
+            audio = reference[f"audio_{i}"][0]
+            emissions = run_emissions(session, audio)
+            outputs[name].append(emissions)
+            if len(emissions) != num_frames(len(audio)):
+                failures.append(f"{name}: {len(emissions)} frames for {len(audio)} samples, "
+                                f"expected {num_frames(len(audio))}")
+            max_diff = max(max_diff, float(np.abs(emissions - reference[f"emissions_{i}"][0]).max()))
+        report["models"][name] = {"size_bytes": model_size_bytes(path), "max_diff": round(max_diff, 6)}
+        if name != "int8" and max_diff > args.tolerance:
+            failures.append(f"{name}: max diff {max_diff:.6f} vs PyTorch > {args.tolerance:g}")
+
+    matches = [
+        np.mean(np.argmax(int8, axis=-1) == np.argmax(fp32, axis=-1))
+        for int8, fp32 in zip(outputs["int8"], outputs["export"])
+    ]
+    report["models"]["int8"]["argmax_match"] = round(float(np.mean(matches)), 4)
+    if np.mean(matches) < args.min_argmax_match:
+        failures.append(f"int8: argmax match {np.mean(matches) * 100:.2f}% < {args.min_argmax_match * 100:.0f}%")
+
+    report["failures"] = failures
+    with open(_path(build_dir, "verify.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    for name, entry in report["models"].items():
+        extra = f", argmax {entry['argmax_match'] * 100:.2f}%" if "argmax_match" in entry else ""
+        print(f"     {name:<10} {mb(entry['size_bytes']):7.1f} MB, max diff {entry['max_diff']:.6f}{extra}")
+    if failures:
+        raise RuntimeError("; ".join(failures))
+
+
+def stage_package(build_dir, args):
+    """Write the chosen model in --package-layout next to its labels."""
+    import onnx
+    from package_mms_fa import write_layout
+
+    directory = _path(build_dir, "package")
+    model = onnx.load(_path(build_dir, PACKAGE_MODELS[args.package_model]))
+    write_layout(model, directory, "mms-fa.onnx", args.package_layout)
+    shutil.copyfile(_path(build_dir, "labels.txt"), os.path.join(directory, "labels.txt"))
+
+
+def stages(args):
+    """
+    The pipeline for these arguments, in order.
+
+    Each stage is (name, function, input files, output files, sibling
+    modules whose source is part of the key, parameters). verify.json is an
+    input of package so nothing is packaged from a failed verify.
+    """
+    return [
+        ("load", stage_load, [], ["mms-fa-torch.pt", "labels.txt", "reference.npz"], ["mms_fa_torch.py"],
+         {"bundle": "MMS_FA", "torch": _version("torch"), "torchaudio": _version("torchaudio"),
+          "drop_layers": args.drop_layers, "reference_seconds": list(REFERENCE_SECONDS)}),
+        ("export", stage_export, ["mms-fa-torch.pt"], ["mms-fa.onnx"], ["mms_fa_torch.py"],
+         {"torch": _version("torch")}),
+        ("optimize", stage_optimize, ["mms-fa.onnx"], ["mms-fa.opt.onnx"], ["optimize_mms_fa.py"],
+         {"level": args.optimize_level, "onnxruntime": _version("onnxruntime")}),
+        ("quantize", stage_quantize, ["mms-fa.onnx"], ["mms-fa-int8.onnx"], ["quantize_mms_fa.py"],
+         {"onnxruntime": _version("onnxruntime")}),
+        ("verify", stage_verify, ["mms-fa.onnx", "mms-fa.opt.onnx", "mms-fa-int8.onnx", "reference.npz"],
+         ["verify.json"], ["mms_fa_inference.py"],
+         {"tolerance": args.tolerance, "min_argmax_match": args.min_argmax_match,
+          "onnxruntime": _version("onnxruntime")}),
+        ("package", stage_package, [PACKAGE_MODELS[args.package_model], "labels.txt", "verify.json"],
+         [os.path.join("package", "mms-fa.onnx"), os.path.join("package", "labels.txt")], ["package_mms_fa.py"],
+         {"model": args.package_model, "layout": args.package_layout, "onnx": _version("onnx")}),
+    ]
+
+
+def _version(distribution):
+    """Installed version of a package without importing it (None when missing)."""
+    from importlib import metadata
+
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class Manifest:
+    """manifest.json: per-stage keys and output hashes, plus memoized file hashes."""
+
+    def __init__(self, build_dir):
+        self.path = _path(build_dir, MANIFEST_FILE)
+        self.build_dir = build_dir
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.stages = data.get("stages", {})
+        self.files = data.get("files", {})
+
+    def save(self):
+        os.makedirs(self.build_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.build_dir, delete=False) as f:
+            json.dump({"stages": self.stages, "files": self.files}, f, indent=2)
+        os.replace(f.name, self.path)
+
+    def file_hash(self, name):
+        """SHA-256 of a build file and its .data file, memoized by size/mtime; None when missing."""
+        path = _path(self.build_dir, name)
+        if not os.path.exists(path):
+            return None
+        files = [path] + ([path + ".data"] if os.path.exists(path + ".data") else [])
+        stamp = [[os.path.getsize(p), os.stat(p).st_mtime_ns] for p in files]
+        entry = self.files.get(name)
+        if entry and entry["stamp"] == stamp:
+            return entry["sha256"]
+
+        digest = hashlib.sha256()
+        for p in files:
+            digest.update(sha256_file(p).encode())
+        self.files[name] = {"stamp": stamp, "sha256": digest.hexdigest()}
+        return self.files[name]["sha256"]
+
+    def stage_key(self, name, function, inputs, modules, params):
+        """Key over the stage, its parameters, input hashes and code; None if an input is missing."""
+        input_hashes = {i: self.file_hash(i) for i in inputs}
+        if None in input_hashes.values():
+            return None
+        code = hashlib.sha256(inspect.getsource(function).encode())
+        for module in modules:
+            code.update(sha256_file(os.path.join(SCRIPT_DIR, module)).encode())
+        payload = {"stage": name, "params": params, "inputs": input_hashes, "code": code.hexdigest()}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def stale_reason(self, name, key, outputs):
+        """Why the stage must run, or None when its recorded outputs are current."""
+        entry = self.stages.get(name)
+        if entry is None:
+            return "never run"
+        if key is None:
+            return "inputs missing"
+        if entry["key"] != key:
+            return "inputs/params/code changed"
+        for output in outputs:
+            if self.file_hash(output) != entry["outputs"].get(output):
+                return f"{output} missing or modified"
+        return None
+
+    def record(self, name, key, outputs, seconds):
+        self.stages[name] = {
+            "key": key,
+            "outputs": {output: self.file_hash(output) for output in outputs},
+            "seconds": round(seconds, 2),
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental MMS_FA export pipeline")
+    parser.add_argument("--build-dir", default=DEFAULT_BUILD_DIR, help="stage outputs and manifest.json")
+    parser.add_argument("--until", help="stop after this stage")
+    parser.add_argument("--force", nargs="*", help="re-run these stages (no names: all)")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages are stale")
+    parser.add_argument("--drop-layers", type=int, default=0, help="load: drop the top N transformer layers")
+    parser.add_argument("--optimize-level", choices=["basic", "extended", "all"], default="extended",
+                        help="optimize: onnxruntime optimization level")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="verify: max diff vs PyTorch")
+    parser.add_argument("--min-argmax-match", type=float, default=0.95, help="verify: int8 argmax agreement")
+    parser.add_argument("--package-model", choices=sorted(PACKAGE_MODELS), default="optimized",
+                        help="package: which model to ship")
+    parser.add_argument("--package-layout", choices=["inline", "external", "aligned", "aligned64k"],
+                        default="aligned", help="package: tensor-data layout (see package_mms_fa.py)")
+    parser.add_argument("--memory-budget-mb", type=float, help="fail a stage whose peak RSS exceeds this")
+    parser.add_argument("--timeline", help="write the RSS timeline and per-stage memory as JSON")
+    parser.add_argument("--trace-python", action="store_true",
+                        help="also record peak Python allocations per stage (tracemalloc; slow)")
+    args = parser.parse_args()
+
+    pipeline = stages(args)
+    names = [stage[0] for stage in pipeline]
+    if args.until:
+        if args.until not in names:
+            parser.error(f"--until must be one of {names}")
+        pipeline = pipeline[:names.index(args.until) + 1]
+    forced = set(names) if args.force == [] else set(args.force or [])
+    if forced - set(names):
+        parser.error(f"unknown stage(s) for --force: {sorted(forced - set(names))}")
+
+    print("=" * 60)
+    print("MMS_FA Incremental Export Pipeline")
+    print("=" * 60)
+    print(f"\n   Build directory: {args.build_dir}")
+
+    os.makedirs(args.build_dir, exist_ok=True)
+    manifest = Manifest(args.build_dir)
+    budget = args.memory_budget_mb * 1024 * 1024 if args.memory_budget_mb else None
+    tracker = MemoryTracker(budget_bytes=budget, trace_python=args.trace_python)
+    tracker.start()
+    try:
+        return _run(args, pipeline, forced, manifest, tracker)
+    finally:
+        tracker.stop()
+        if args.timeline:
+            tracker.write_timeline(args.timeline)
+            print(f"Memory timeline: {args.timeline}")
+
+
+def _run(args, pipeline, forced, manifest, tracker):
+    ran = []
+    rerun_outputs = set()  # outputs a dry run assumes would change
+    for step, (name, function, inputs, outputs, modules, params) in enumerate(pipeline, 1):
+        key = manifest.stage_key(name, function, inputs, modules, params)
+        reason = manifest.stale_reason(name, key, outputs)
+        if name in forced:
+            reason = "forced"
+        elif args.dry_run and rerun_outputs.intersection(inputs):
+            reason = "upstream stage re-runs"
+
+        if reason is None:
+            print(f"\n{step}. {name}: up to date")
+            continue
+        print(f"\n{step}. {name}: running ({reason})")
+        if args.dry_run:
+            rerun_outputs.update(outputs)
+            ran.append(name)
+            continue
+        if key is None:
+            missing = [i for i in inputs if manifest.file_hash(i) is None]
+            print(f"   [FAIL] missing inputs: {missing}")
+            return 1
+
+        start = time.perf_counter()
+        try:
+            with tracker.stage(name):
+                function(args.build_dir, args)
+            memory = tracker.stages[-1]
+            if memory in tracker.over_budget():
+                raise MemoryError(f"peak RSS {mb(memory['rss_peak']):.0f} MB "
+                                  f"> budget {args.memory_budget_mb:.0f} MB")
+        except Exception as e:
+            manifest.stages.pop(name, None)
+            manifest.save()
+            print(f"   [FAIL] {type(e).__name__}: {e}")
+            return 1
+        seconds = time.perf_counter() - start
+        manifest.record(name, key, outputs, seconds)
+        ran.append(name)
+        print(f"   done in {seconds:.1f}s, peak RSS {mb(memory['rss_peak']):.0f} MB -> {', '.join(outputs)}")
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    verb = "Would run" if args.dry_run else "Ran"
+    print(f"\n   {verb}: {', '.join(ran) if ran else 'nothing (all stages up to date)'}")
+    print(f"   Frameworks imported: {', '.join(m for m in HEAVY_MODULES if m in sys.modules) or 'none'}")
+    print(f"\nManifest: {manifest.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Peak memory of MMS_FA inference against audio length and model variant.
+
+The tooling so far reports file sizes, but device crashes came from RSS
+(docs/archive/session-handoffs/HANDOFF_2025-11-15_CPU_MEMORY_*). For every
+model, a fresh spawn process loads the session and runs one clip of each
+--seconds length (shortest first) under resource_usage.MemoryTracker, so
+every step gets a record:
+  - load: RSS before/after/peak while creating the session
+  - session.run per clip: peak RSS during the run, RSS retained afterwards,
+    peak Python/NumPy allocations (tracemalloc)
+The summary fits peak RSS per audio-second for each model (attention makes
+long clips grow faster than linearly, so the fit is only a guide) and the run
+fails when any stage's peak RSS exceeds --budget-mb. --timeline writes the
+RSS samples and stage records of every model to one JSON file.
+
+Usage:
+    python scripts/memory_profile.py                                  # mms-fa.onnx + int8 variants
+    python scripts/memory_profile.py --seconds 5,30,60,120 --budget-mb 1500 --timeline memory.json
+    python scripts/memory_profile.py --models mms-fa.opt.onnx --threads 2
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from mms_fa_inference import INPUT_NAME, MODEL_DIR, OUTPUT_NAME, SAMPLE_RATE, create_session, input_dtype
+from resource_usage import MemoryTracker, mb
+from sweep_session_config import default_models
+
+
+def profile_model(model_path, seconds_list, threads, interval):
+    """Worker: load `model_path` and run one clip per length; returns the tracker timeline."""
+    rng = np.random.default_rng(0)
+    with MemoryTracker(interval=interval) as tracker:
+        with tracker.stage("load", model=os.path.basename(model_path)):
+            session = create_session(model_path, intra_op_threads=threads)
+        dtype = input_dtype(session)
+        for seconds in sorted(seconds_list):
+            audio = (rng.standard_normal((1, int(seconds * SAMPLE_RATE))) * 0.1).astype(dtype)
+            tracker.run_session(session, [OUTPUT_NAME], {INPUT_NAME: audio},
+                                model=os.path.basename(model_path), audio_seconds=seconds)
+    return tracker.timeline()
+
+
+def fit_per_second(records):
+    """Least-squares (MB at 0 s, MB per audio-second) of peak RSS over the session.run records."""
+    seconds = np.array([r["audio_seconds"] for r in records], dtype=np.float64)
+    peaks = np.array([mb(r["rss_peak"]) for r in records], dtype=np.float64)
+    if len(records) < 2 or np.ptp(seconds) == 0:
+        return float(peaks.mean()) if len(peaks) else 0.0, 0.0
+    slope, intercept = np.polyfit(seconds, peaks, 1)
+    return float(intercept), float(slope)
+
+
+def _fmt_mb(value):
+    return "   n/a" if value is None else f"{mb(value):7.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile MMS_FA memory against audio length and model")
+    parser.add_argument("--models", nargs="+", help="model files (default: mms-fa.onnx + mms-fa-int8*.onnx)")
+    parser.add_argument("--seconds", default="2,5,10,30,60", help="comma-separated clip lengths")
+    parser.add_argument("--threads", type=int, default=2, help="intra-op threads (the app uses 2)")
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="RSS sampling interval")
+    parser.add_argument("--budget-mb", type=float, help="fail when any stage's peak RSS exceeds this")
+    parser.add_argument("--timeline", help="write RSS samples and stage records as JSON")
+    args = parser.parse_args()
+
+    models = [
+        path if os.path.exists(path) else os.path.join(MODEL_DIR, path)
+        for path in (args.models or default_models())
+    ]
+    seconds_list = [float(s) for s in args.seconds.split(",")]
+    budget = args.budget_mb * 1024 * 1024 if args.budget_mb else None
+
+    print("=" * 60)
+    print("MMS_FA Memory Profile")
+    print("=" * 60)
+    print(f"\n   Models: {[os.path.basename(m) for m in models]}")
+    print(f"   Clip lengths: {seconds_list} s, {args.threads} threads")
+    if budget:
+        print(f"   Budget: {args.budget_mb:.0f} MB peak RSS per stage")
+    if not models:
+        print("\n   ERROR: no models to profile")
+        return 1
+
+    timelines = {}
+    context = multiprocessing.get_context("spawn")
+    print(f"\n   {'model':<26}{'stage':<14}{'audio s':>8}{'before':>8}{'peak':>8}{'after':>8}"
+          f"{'python':>8}{'ms':>9}")
+    for model_path in models:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            timeline = pool.submit(
+                profile_model, model_path, seconds_list, args.threads, args.interval_ms / 1000
+            ).result()
+        name = os.path.basename(model_path)
+        timelines[name] = timeline
+        for record in timeline["stages"]:
+            audio = f"{record['audio_seconds']:g}" if "audio_seconds" in record else "-"
+            print(f"   {name[:25]:<26}{record['stage']:<14}{audio:>8}{_fmt_mb(record['rss_before']):>8}"
+                  f"{_fmt_mb(record['rss_peak']):>8}{_fmt_mb(record['rss_after']):>8}"
+                  f"{_fmt_mb(record.get('python_peak')):>8}{record['seconds'] * 1000:>9.1f}")
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    over = []
+    for name, timeline in timelines.items():
+        runs = [r for r in timeline["stages"] if r["stage"] == "session.run"]
+        base, per_second = fit_per_second(runs)
+        peak = max(r["rss_peak"] or 0 for r in timeline["stages"])
+        print(f"\n   {name}: peak {mb(peak):.0f} MB, ~{base:.0f} MB + {per_second:.1f} MB per audio-second")
+        if budget:
+            over += [(name, r) for r in timeline["stages"] if r["rss_peak"] and r["rss_peak"] > budget]
+
+    if args.timeline:
+        with open(args.timeline, "w") as f:
+            json.dump({"threads": args.threads, "budget_mb": args.budget_mb, "models": timelines}, f, indent=2)
+        print(f"\nTimeline written to: {args.timeline}")
+
+    if over:
+        print()
+        for name, record in over:
+            audio = f" ({record['audio_seconds']:g}s)" if "audio_seconds" in record else ""
+            print(f"[FAIL] {name} {record['stage']}{audio}: peak {mb(record['rss_peak']):.0f} MB "
+                  f"> budget {args.budget_mb:.0f} MB")
+        return 1
+    if budget:
+        print(f"\n[PASS] Every stage stayed under {args.budget_mb:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Batched MMS_FA emission inference with onnxruntime.
+
+Several clips can share one session.run: clips are bucketed by length (to
+keep zero-padding small), padded into one [B, T] tensor, run once, and each
+clip's emissions are cropped back to its real frame count.
+
+The frame count comes from the wav2vec2 feature-extractor conv stack rather
+than a rounded frame rate: 16000 samples -> 49 frames (the ~49 fps the export
+script reports), with a 320-sample (20 ms) hop.
+
+Batching needs the length-aware export (`export_mms_fa_model.py --batch`,
+mms-fa-batch.onnx), which takes `audio` [B, T] plus `length` [B] int64,
+normalizes each clip over its real samples and masks the padded frames out of
+attention. The plain dynamic export (mms-fa.onnx) normalizes the waveform over
+the whole [B, T] tensor and has no mask, so every clip in a batch would
+change every other clip's emissions; run_batch therefore runs one clip per
+session.run on a model without a `length` input. main() compares the batched
+emissions against batch=1 on the plain export.
+
+Usage:
+    python scripts/mms_fa_inference.py [--model PATH] [--reference PATH] [--clips 64] [--batch-size 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Model paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+MODEL_DIR = os.path.join(PROJECT_ROOT, "Listen2", "Listen2", "Listen2", "Resources", "mms-fa")
+FP32_MODEL = os.path.join(MODEL_DIR, "mms-fa.onnx")
+LABELS_PATH = os.path.join(MODEL_DIR, "labels.txt")
+BATCH_MODEL = os.path.join(MODEL_DIR, "mms-fa-batch.onnx")
+
+# MMS_FA input/output names (see export_mms_fa_model.py)
+INPUT_NAME = "audio"
+LENGTH_NAME = "length"  # real samples per clip, length-aware exports only
+OUTPUT_NAME = "emissions"
+
+SAMPLE_RATE = 16000
+
+# wav2vec2 feature extractor (kernel, stride) per conv layer
+CONV_LAYERS = [(10, 5), (3, 2), (3, 2), (3, 2), (3, 2), (2, 2), (2, 2)]
+
+# Samples per emission frame (product of strides): 20 ms at 16 kHz
+FRAME_STRIDE = 320
+FRAME_DURATION = FRAME_STRIDE / SAMPLE_RATE
+
+
+def num_frames(num_samples):
+    """Number of emission frames the model produces for `num_samples` of audio (int or array)."""
+    frames = np.asarray(num_samples, dtype=np.int64)
+    for kernel, stride in CONV_LAYERS:
+        frames = np.maximum((frames - kernel) // stride + 1, 0)
+    return int(frames) if frames.ndim == 0 else frames
+
+
+def load_labels(path=LABELS_PATH):
+    """Read labels.txt (one label per line, blank first)."""
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def model_size_bytes(model_path):
+    """Size of the model file plus its external data file, if any."""
+    size = os.path.getsize(model_path)
+    if os.path.exists(model_path + ".data"):
+        size += os.path.getsize(model_path + ".data")
+    return size
+
+
+def create_session(model_path=FP32_MODEL, intra_op_threads=0, inter_op_threads=0, providers=None):
+    """Create an onnxruntime session (0 threads = onnxruntime default)."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    return ort.InferenceSession(
+        model_path, sess_options=options, providers=providers or ["CPUExecutionProvider"]
+    )
+
+
+def input_dtype(session):
+    """NumPy dtype of the model's audio input (float16 exports keep float16 I/O)."""
+    return np.float16 if session.get_inputs()[0].type == "tensor(float16)" else np.float32
+
+
+def has_length_input(session):
+    """True for length-aware exports (bucket and batch models) that take real clip lengths."""
+    return any(i.name == LENGTH_NAME for i in session.get_inputs())
+
+
+def run_emissions(session, audio):
+    """Emissions [frames, vocab] (float32) for one mono 16 kHz clip."""
+    audio = np.asarray(audio, dtype=input_dtype(session)).reshape(1, -1)
+    feeds = {INPUT_NAME: audio}
+    if has_length_input(session):
+        feeds[LENGTH_NAME] = np.array([audio.shape[1]], dtype=np.int64)
+    return session.run([OUTPUT_NAME], feeds)[0][0].astype(np.float32, copy=False)
+
+
+def bucket_by_length(lengths, max_batch_size=8, max_padding=0.1, max_batch_samples=None):
+    """
+    Group clip indices into batches of similar length.
+
+    Clips are taken longest-first. A batch is closed when it is full, when the
+    next clip would need more than `max_padding` (fraction of the longest clip)
+    of zero-padding, or when B * longest would exceed `max_batch_samples`.
+    """
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    buckets = []
+    current = []
+    longest = 0
+
+    for index in order:
+        length = lengths[index]
+        if current:
+            full = len(current) >= max_batch_size
+            too_short = (longest - length) > max_padding * longest
+            too_big = max_batch_samples is not None and (len(current) + 1) * longest > max_batch_samples
+            if full or too_short or too_big:
+                buckets.append(current)
+                current = []
+        if not current:
+            longest = length
+        current.append(int(index))
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def run_batch(session, clips):
+    """
+    Zero-pad `clips` into one [B, T] tensor, run once, crop each clip's emissions.
+
+    Only a length-aware export keeps the clips independent; any other model
+    runs one clip per session.run so results never depend on the batch.
+    """
+    if not has_length_input(session):
+        return [run_emissions(session, clip) for clip in clips]
+
+    lengths = np.array([len(clip) for clip in clips], dtype=np.int64)
+    batch = np.zeros((len(clips), lengths.max()), dtype=input_dtype(session))
+    for row, clip in zip(batch, clips):
+        row[:len(clip)] = clip
+
+    feeds = {INPUT_NAME: batch, LENGTH_NAME: lengths}
+    emissions = session.run([OUTPUT_NAME], feeds)[0].astype(np.float32, copy=False)
+    return [emissions[i, :frames] for i, frames in enumerate(num_frames(lengths))]
+
+
+def batch_emissions(session, clips, max_batch_size=8, max_padding=0.1, max_batch_seconds=120.0):
+    """
+    Emissions for many clips using length-bucketed batches.
+
+    Args:
+        session: onnxruntime session for an MMS_FA export
+        clips: sequence of mono 16 kHz float arrays
+        max_batch_size: most clips per session.run
+        max_padding: largest allowed padding, as a fraction of the batch's longest clip
+        max_batch_seconds: cap on B * longest clip, to bound activation memory
+
+    Returns:
+        List of [frames, vocab] arrays in the same order as `clips`.
+    """
+    clips = [np.asarray(clip, dtype=np.float32).reshape(-1) for clip in clips]
+    lengths = [len(clip) for clip in clips]
+    results = [None] * len(clips)
+
+    buckets = bucket_by_length(
+        lengths,
+        max_batch_size=max_batch_size,
+        max_padding=max_padding,
+        max_batch_samples=int(max_batch_seconds * SAMPLE_RATE),
+    )
+    for bucket in buckets:
+        for index, emissions in zip(bucket, run_batch(session, [clips[i] for i in bucket])):
+            results[index] = emissions
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare batched vs one-at-a-time MMS_FA inference")
+    parser.add_argument("--model", default=BATCH_MODEL, help="length-aware batch export")
+    parser.add_argument("--reference", default=FP32_MODEL, help="plain export run one clip at a time")
+    parser.add_argument("--clips", type=int, default=64, help="number of synthetic clips")
+    parser.add_argument("--batch-size", type=int, default=8, help="max clips per session.run")
+    parser.add_argument("--max-padding", type=float, default=0.1, help="max padding fraction per batch")
+    parser.add_argument("--min-argmax-match", type=float, default=0.99,
+                        help="fail below this batched-vs-reference argmax agreement")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MMS_FA Batched Emission Inference")
+    print("=" * 60)
+
+    # Sentence-length clips between 1 and 8 seconds
+    rng = np.random.default_rng(0)
+    clips = [
+        (rng.standard_normal(int(rng.uniform(1.0, 8.0) * SAMPLE_RATE)) * 0.1).astype(np.float32)
+        for _ in range(args.clips)
+    ]
+    audio_seconds = sum(len(c) for c in clips) / SAMPLE_RATE
+    print(f"\n   Model: {args.model}")
+    print(f"   Reference: {args.reference}")
+    print(f"   Clips: {len(clips)} ({audio_seconds:.1f}s of audio)")
+
+    session = create_session(args.model)
+    reference = create_session(args.reference)
+    if not has_length_input(session):
+        print(f"   WARNING: no '{LENGTH_NAME}' input, run_batch falls back to one clip per session.run")
+    run_emissions(session, clips[0])  # warm-up
+    run_emissions(reference, clips[0])
+
+    print("\n1. One clip per session.run (reference)...")
+    start = time.perf_counter()
+    single = [run_emissions(reference, clip) for clip in clips]
+    single_time = time.perf_counter() - start
+    print(f"   {single_time:.2f}s ({audio_seconds / single_time:.1f} audio-s/s)")
+
+    print("\n2. Length-bucketed batches...")
+    start = time.perf_counter()
+    batched = batch_emissions(session, clips, args.batch_size, args.max_padding)
+    batch_time = time.perf_counter() - start
+    buckets = bucket_by_length([len(c) for c in clips], args.batch_size, args.max_padding)
+    print(f"   {len(buckets)} batches, {batch_time:.2f}s ({audio_seconds / batch_time:.1f} audio-s/s)")
+
+    print("\n3. Comparing outputs...")
+    frames_ok = all(a.shape == b.shape for a, b in zip(single, batched))
+    matches = sum(np.sum(a.argmax(-1) == b.argmax(-1)) for a, b in zip(single, batched))
+    total = sum(a.shape[0] for a in single)
+    max_diff = max(np.abs(a - b).max() for a, b in zip(single, batched))
+    print(f"   Frame counts match: {frames_ok}")
+    print(f"   Argmax agreement: {matches / total * 100:.2f}% ({matches}/{total})")
+    print(f"   Max logit difference: {max_diff:.4f}")
+    print(f"\n   Speedup: {single_time / batch_time:.2f}x")
+
+    agreement_ok = matches / total >= args.min_argmax_match
+    if frames_ok and agreement_ok:
+        print(f"\n[PASS] Batched emissions match batch=1 (argmax >= {args.min_argmax_match * 100:.0f}%)")
+        return 0
+    print(f"\n[FAIL] Batched emissions differ from batch=1 (argmax < {args.min_argmax_match * 100:.0f}%)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
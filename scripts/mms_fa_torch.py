@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+PyTorch pieces of the MMS_FA export: wrappers, layer pruning and torch.onnx.export.
+
+Only the stages that need torch import this module (export_mms_fa_model.main,
+export_pipeline's load/export stages, sweep_layer_pruning.export_depths), so
+tools that only run onnxruntime never pay for importing torch/torchaudio.
+"""
+
+import math
+
+import torch
+
+
+class EmissionsOnlyWrapper(torch.nn.Module):
+    """Wrap model to return only the emissions tensor"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, audio):
+        output = self.model(audio)
+        if isinstance(output, tuple):
+            return output[0]
+        return output
+
+
+def encoder_transformer(model):
+    """The wav2vec2 transformer of an MMS_FA model (unwrapping torchaudio's bundle wrapper)."""
+    inner = getattr(model, "model", model)
+    return inner.encoder.transformer
+
+
+def drop_encoder_layers(model, count):
+    """
+    Remove the top `count` transformer layers in place; returns the layers kept.
+
+    The final layer norm and the CTC head (aux) stay attached, so the model
+    still outputs emissions over the same labels from a shallower encoder.
+    """
+    transformer = encoder_transformer(model)
+    total = len(transformer.layers)
+    if not 0 <= count < total:
+        raise ValueError(f"Can drop 0..{total - 1} of {total} layers, not {count}")
+    if count:
+        transformer.layers = transformer.layers[:total - count]
+    return total - count
+
+
+def export_onnx(module, dummy_audio, path):
+    """torch.onnx.export with the audio/emissions names and dynamic axes the app expects."""
+    torch.onnx.export(
+        module,
+        dummy_audio,
+        path,
+        input_names=["audio"],
+        output_names=["emissions"],
+        dynamic_axes={
+            "audio": {0: "batch", 1: "time"},
+            "emissions": {0: "batch", 1: "frames", 2: "vocab"}
+        },
+        opset_version=14,
+        verbose=False
+    )
+
+
+class BucketWrapper(torch.nn.Module):
+    """
+    Length-aware model: zero-padded `audio` [B, N] plus each clip's real `length` [B].
+
+    Reproduces torchaudio's MMS_FA wrapper (waveform normalization, log-softmax,
+    star column) but normalizes each clip over its own real samples and passes
+    the lengths to wav2vec2, which masks the padded frames out of attention.
+    The first num_frames(length) frames of each row then match the dynamic
+    model run on that clip alone. Exported with a fixed [1, N] shape for the
+    bucket models and with dynamic axes for the batch model.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.inner = getattr(model, "model", model)
+        self.normalize_waveform = getattr(model, "normalize_waveform", False)
+        self.apply_log_softmax = getattr(model, "apply_log_softmax", False)
+        self.append_star = getattr(model, "append_star", False)
+
+    def forward(self, audio, length):
+        mask = (torch.arange(audio.shape[1], device=audio.device)[None, :] < length[:, None]).to(audio.dtype)
+        if self.normalize_waveform:
+            count = length.to(audio.dtype)[:, None]
+            mean = (audio * mask).sum(dim=1, keepdim=True) / count
+            var = (((audio - mean) * mask) ** 2).sum(dim=1, keepdim=True) / count
+            audio = (audio - mean) / torch.sqrt(var + 1e-5) * mask
+
+        emissions, _ = self.inner(audio, length)
+        if self.apply_log_softmax:
+            emissions = torch.log_softmax(emissions, dim=-1)
+        if self.append_star:
+            star = torch.zeros((emissions.size(0), emissions.size(1), 1), dtype=emissions.dtype,
+                               device=emissions.device)
+            emissions = torch.cat((emissions, star), dim=-1)
+        return emissions
+
+
+def export_bucket_onnx(module, samples, path):
+    """torch.onnx.export of a BucketWrapper with fixed [1, samples] audio and a [1] length input."""
+    torch.onnx.export(
+        module,
+        (torch.randn(1, samples), torch.tensor([samples], dtype=torch.int64)),
+        path,
+        input_names=["audio", "length"],
+        output_names=["emissions"],
+        opset_version=14,
+        verbose=False
+    )
+
+
+def export_batch_onnx(module, path):
+    """torch.onnx.export of a BucketWrapper with dynamic [B, T] audio and a [B] length input."""
+    torch.onnx.export(
+        module,
+        (torch.randn(2, 16000), torch.tensor([16000, 12000], dtype=torch.int64)),
+        path,
+        input_names=["audio", "length"],
+        output_names=["emissions"],
+        dynamic_axes={
+            "audio": {0: "batch", 1: "time"},
+            "length": {0: "batch"},
+            "emissions": {0: "batch", 1: "frames"}
+        },
+        opset_version=14,
+        verbose=False
+    )
+
+
+class NativeRateWrapper(torch.nn.Module):
+    """
+    Take audio at `source_rate`, resample to 16 kHz in-graph and return log-probabilities.
+
+    The resampling is CTCForcedAligner.resample's linear interpolation, with
+    exact integer source indices (i * p // q for the reduced ratio p/q).
+    """
+
+    def __init__(self, model, source_rate, target_rate=16000, fp16_output=False):
+        super().__init__()
+        self.model = model
+        divisor = math.gcd(source_rate, target_rate)
+        self.source_step = source_rate // divisor
+        self.target_step = target_rate // divisor
+        self.fp16_output = fp16_output
+
+    def forward(self, audio):
+        length = audio.shape[1]
+        new_length = length * self.target_step // self.source_step
+        positions = torch.arange(new_length, device=audio.device) * self.source_step
+        index = positions // self.target_step
+        frac = (positions % self.target_step).to(audio.dtype) / self.target_step
+
+        # Repeat the last sample so index + 1 is always valid (same as the Swift edge case)
+        padded = torch.cat([audio, audio[:, -1:]], dim=1)
+        resampled = padded[:, index] * (1 - frac) + padded[:, index + 1] * frac
+
+        log_probs = torch.log_softmax(self.model(resampled), dim=-1)
+        if self.fp16_output:
+            log_probs = log_probs.half()
+        return log_probs
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Measure the native-rate MMS_FA export against the current 16 kHz path.
+
+Today every sentence goes:
+    Piper audio (22.05 kHz) -> CTCForcedAligner.resample (new array)
+    -> mms-fa.onnx -> emissions -> log-softmax (second pass, new array)
+
+`export_mms_fa_model.py --native-rate 22050` bakes both into the graph
+(NativeRateWrapper): the model takes Piper's audio as-is, resamples with the
+same linear interpolation in-graph and returns log-probabilities, optionally
+as float16 (--fp16-output). The output keeps the name "emissions"; applying
+log-softmax to log-probabilities is a no-op, so existing callers still work.
+
+For each utterance of the corpus (synthesized at the native rate) this
+reports the end-to-end time of both paths and checks that log-probabilities,
+argmax and word boundaries agree.
+
+Usage:
+    python scripts/native_rate_mms_fa.py [--model mms-fa.onnx] [--native-model mms-fa-22k.onnx]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import load_corpus, resample, synthetic_corpus
+from ctc_align import align_words, boundary_errors_ms, log_softmax, word_times
+from mms_fa_inference import (
+    FP32_MODEL,
+    FRAME_DURATION,
+    MODEL_DIR,
+    create_session,
+    load_labels,
+    run_emissions,
+)
+
+# Piper voices synthesize at 22.05 kHz
+NATIVE_RATE = 22050
+
+
+def native_model_path(rate=NATIVE_RATE, fp16_output=False):
+    """mms-fa-22k.onnx / mms-fa-22k-fp16out.onnx in Resources/mms-fa."""
+    name = f"mms-fa-{rate // 1000}k" + ("-fp16out" if fp16_output else "")
+    return os.path.join(MODEL_DIR, name + ".onnx")
+
+
+def current_path(session, audio, rate=NATIVE_RATE):
+    """What the app does now: resample, run the 16 kHz model, log-softmax."""
+    return log_softmax(run_emissions(session, resample(audio, rate)))
+
+
+def native_path(session, audio):
+    """Native-rate export: one session.run, output is already log-probabilities."""
+    return run_emissions(session, audio)
+
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def compare(model_path, native_model, utterances, labels, rate=NATIVE_RATE, repeats=5):
+    """Latency and accuracy of the native-rate model vs the current path, per utterance."""
+    session = create_session(model_path)
+    native = create_session(native_model)
+    current_path(session, utterances[0].audio, rate)  # warm-up
+    native_path(native, utterances[0].audio)
+
+    rows = []
+    for utterance in utterances:
+        reference = current_path(session, utterance.audio, rate)
+        candidate = native_path(native, utterance.audio)
+        # Frame counts can differ by one when the two resamplers round the length differently
+        frames = min(len(reference), len(candidate))
+        diff = np.abs(reference[:frames] - candidate[:frames])
+
+        errors = boundary_errors_ms(
+            word_times(align_words(reference, utterance.transcript, labels), FRAME_DURATION),
+            word_times(align_words(candidate, utterance.transcript, labels), FRAME_DURATION),
+        )
+        rows.append({
+            "name": utterance.name,
+            "seconds": len(utterance.audio) / rate,
+            "current_ms": median_ms(lambda: current_path(session, utterance.audio, rate), repeats),
+            "native_ms": median_ms(lambda: native_path(native, utterance.audio), repeats),
+            "frames": (len(reference), len(candidate)),
+            "max_diff": float(diff.max()),
+            "argmax": float(np.mean(reference[:frames].argmax(-1) == candidate[:frames].argmax(-1))),
+            "boundary_max_ms": float(errors.max()) if errors.size else 0.0,
+        })
+    return rows
+
+
+def report(rows):
+    """Print the per-utterance table and return the totals."""
+    print(f"\n   {'utterance':<14}{'audio s':>8}{'cur ms':>9}{'nat ms':>9}{'max diff':>10}{'argmax':>8}{'bnd ms':>8}")
+    for r in rows:
+        print(f"   {r['name']:<14}{r['seconds']:>8.1f}{r['current_ms']:>9.1f}{r['native_ms']:>9.1f}"
+              f"{r['max_diff']:>10.4f}{r['argmax'] * 100:>7.1f}%{r['boundary_max_ms']:>8.0f}")
+
+    current = sum(r["current_ms"] for r in rows)
+    native = sum(r["native_ms"] for r in rows)
+    totals = {
+        "current_ms": current,
+        "native_ms": native,
+        "max_diff": max(r["max_diff"] for r in rows),
+        "argmax": min(r["argmax"] for r in rows),
+        "boundary_max_ms": max(r["boundary_max_ms"] for r in rows),
+    }
+    print(f"\n   End-to-end: current {current:.1f} ms, native {native:.1f} ms "
+          f"({(1 - native / current) * 100:.1f}% less)")
+    print(f"   Worst: max log-prob diff {totals['max_diff']:.4f}, argmax {totals['argmax'] * 100:.2f}%, "
+          f"boundary {totals['boundary_max_ms']:.0f} ms")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the native-rate MMS_FA export with the 16 kHz path")
+    parser.add_argument("--model", default=FP32_MODEL, help="16 kHz emissions model (current path)")
+    parser.add_argument("--native-model", default=native_model_path(), help="native-rate log-prob model")
+    parser.add_argument("--rate", type=int, default=NATIVE_RATE, help="native sample rate")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per utterance")
+    parser.add_argument("--min-agreement", type=float, default=0.99, help="min argmax agreement")
+    parser.add_argument("--max-boundary-ms", type=float, default=20.0, help="max word boundary shift")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MMS_FA Native-Rate Export Check")
+    print("=" * 60)
+    print(f"\n   Current: {os.path.basename(args.model)} (resample + log-softmax outside the model)")
+    print(f"   Native: {os.path.basename(args.native_model)} ({args.rate} Hz in, log-probs out)")
+
+    utterances = load_corpus(args.corpus, args.rate) if args.corpus else synthetic_corpus(sample_rate=args.rate)
+    totals = report(compare(args.model, args.native_model, utterances, load_labels(), args.rate, args.repeats))
+
+    if totals["argmax"] >= args.min_agreement and totals["boundary_max_ms"] <= args.max_boundary_ms:
+        print("\n[PASS] Native-rate export matches the current path")
+        return 0
+    print("\n[FAIL] Native-rate export differs from the current path")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
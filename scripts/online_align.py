@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Incremental (online) CTC forced alignment that emits word boundaries early.
+
+forced_align needs the whole sentence's emissions before it can backtrack,
+so the first word can't be highlighted until the sentence has been
+synthesized and run through MMS_FA. OnlineAligner takes emission chunks as
+they arrive and runs the same Viterbi recursion (ctc_align.viterbi_step)
+frame by frame, keeping only states within `beam` of the best score.
+
+After each chunk it traces every surviving state back through the pending
+backpointers. Once all of them pass through the same state at some frame,
+the path up to that frame can no longer change; those frames are committed
+and every word whose last token the committed path has moved past is
+yielded immediately. finish() backtracks from the end state like
+forced_align and yields the rest.
+
+The benchmark streams synthetic utterances through the model in chunks
+(with audio context on both sides, frames cut on the 320-sample / 20 ms
+hop) while simulating TTS producing audio at --tts-rtf, and compares
+time-to-first-word and word boundaries against the full-sentence path.
+
+Usage:
+    python scripts/online_align.py                 # self-check + latency benchmark
+    python scripts/online_align.py --model PATH --chunk 0.5 --context 0.5 --tts-rtf 0.3
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from ctc_align import (
+    BandTooNarrow,
+    WordSpan,
+    align_words,
+    forced_align,
+    log_softmax,
+    merge_tokens,
+    merge_words,
+    planted_case,
+    skip_mask,
+    state_labels,
+    tokenize_words,
+    viterbi_step,
+)
+
+DEFAULT_BEAM = 60.0
+
+
+class OnlineAligner:
+    """
+    Frame-synchronous Viterbi alignment of one transcript.
+
+    feed(log_probs) and finish() return the WordSpans that became final,
+    in word order, with the same frame semantics as ctc_align.merge_words.
+    """
+
+    def __init__(self, transcript, labels, blank=0, beam=DEFAULT_BEAM):
+        self.tokens, self.words, self.counts = tokenize_words(transcript, labels)
+        if self.tokens.size == 0:
+            raise ValueError("Transcript has no alignable characters")
+        self.blank = blank
+        self.beam = beam
+
+        self.num_states = 2 * self.tokens.size + 1
+        self.labels = state_labels(self.tokens, blank)
+        self.skip = skip_mask(self.tokens)
+
+        # Last token (and its state) of each word that has tokens
+        self.word_last_state = []
+        position = 0
+        for count in self.counts:
+            position += count
+            self.word_last_state.append(2 * position - 1 if count else None)
+
+        self.rows = np.full((2, self.num_states + 2), -np.inf, dtype=np.float32)
+        self.windows = [(0, 0), (0, 0)]
+        self.live = (0, 2)
+        self.frames = 0
+
+        # Backpointers of frames not yet committed: (lo, int8 row) per frame
+        self.pending = []
+        self.committed = 0          # frames whose state is final
+        self.committed_state = 0    # state at the last committed frame
+
+        self.token_start = np.full(self.tokens.size, np.iinfo(np.int64).max, dtype=np.int64)
+        self.token_end = np.full(self.tokens.size, -1, dtype=np.int64)
+        self.next_word = 0
+
+    def feed(self, log_probs):
+        """Advance over a [frames, vocab] chunk of log-probabilities; returns newly final words."""
+        log_probs = np.asarray(log_probs, dtype=np.float32)
+        for frame in log_probs:
+            self._step(frame)
+        return self._commit(self._converged_frame())
+
+    def finish(self):
+        """Backtrack from the end state and return the remaining words."""
+        last = self.rows[(self.frames - 1) % 2, 2:]
+        end_state = self.num_states - 1 if last[self.num_states - 1] > last[self.num_states - 2] \
+            else self.num_states - 2
+        if last[end_state] == -np.inf:
+            raise BandTooNarrow("End of the transcript is unreachable (too few frames or beam too narrow)")
+        return self._commit((self.frames - 1, end_state), flush=True)
+
+    def _step(self, emission):
+        t = self.frames
+        lo, hi = self.live[0], min(self.num_states, self.live[1] + 2)
+        if t == 0:
+            lo, hi = 0, 2
+
+        cur = self.rows[t % 2]
+        old_lo, old_hi = self.windows[t % 2]
+        cur[2 + old_lo:2 + old_hi] = -np.inf
+        self.windows[t % 2] = (lo, hi)
+
+        backptr = np.zeros(hi - lo, dtype=np.int8)
+        if t == 0:
+            cur[2:4] = emission[self.labels[:2]]
+        else:
+            viterbi_step(
+                self.rows[(t - 1) % 2][lo:hi + 2],
+                emission[self.labels[lo:hi]],
+                self.skip[lo:hi],
+                cur[2 + lo:2 + hi],
+                backptr,
+            )
+        self.pending.append((lo, backptr))
+
+        window = cur[2 + lo:2 + hi]
+        keep = window > -np.inf
+        if self.beam is not None and keep.any():
+            keep &= window >= window.max() - self.beam
+            window[~keep] = -np.inf
+        alive = np.flatnonzero(keep)
+        if not alive.size:
+            raise BandTooNarrow(f"Every state was pruned at frame {t}")
+        self.live = (lo + int(alive[0]), lo + int(alive[-1]) + 1)
+        self.frames += 1
+
+    def _converged_frame(self):
+        """(frame, state) of the latest frame all surviving paths share, or None."""
+        if not self.pending:
+            return None
+        lo, hi = self.windows[(self.frames - 1) % 2]
+        row = self.rows[(self.frames - 1) % 2, 2 + lo:2 + hi]
+        states = lo + np.flatnonzero(row > -np.inf)
+
+        frame = self.frames - 1
+        for offset in range(len(self.pending) - 1, -1, -1):
+            if np.all(states == states[0]):
+                return frame, int(states[0])
+            if offset == 0:
+                break
+            row_lo, backptr = self.pending[offset]
+            states = np.unique(states - backptr[states - row_lo])
+            frame -= 1
+        return None
+
+    def _commit(self, converged, flush=False):
+        """
+        Fix the path up to `converged` (frame, state) and return words that became final.
+
+        With flush, every word not yet emitted is returned, even when feed()
+        already committed all frames.
+        """
+        if converged is not None and converged[0] >= self.committed:
+            self._fix_path(*converged)
+        elif not flush:
+            return []
+
+        final = []
+        while self.next_word < len(self.words):
+            last_state = self.word_last_state[self.next_word]
+            if last_state is not None:
+                # A word is final once the committed path has left its last token
+                if not flush and self.committed_state <= last_state:
+                    break
+                first_token = (last_state + 1) // 2 - self.counts[self.next_word]
+                text, offset = self.words[self.next_word]
+                final.append(WordSpan(
+                    self.next_word, text, offset,
+                    int(self.token_start[first_token]), int(self.token_end[(last_state - 1) // 2]),
+                ))
+            self.next_word += 1
+        return final
+
+    def _fix_path(self, frame, state):
+        """Backtrack pending frames up to `frame` (ending in `state`) and record token spans."""
+        first = self.committed
+        count = frame - first + 1
+        states = np.empty(count, dtype=np.int64)
+        for i in range(count - 1, -1, -1):
+            states[i] = state
+            lo, backptr = self.pending[i]
+            state -= int(backptr[state - lo])
+        del self.pending[:count]
+        self.committed = frame + 1
+        self.committed_state = int(states[-1])
+
+        # Token spans (end exclusive) from the committed frames
+        frames = first + np.arange(count)
+        is_token = states % 2 == 1
+        tokens = states[is_token] // 2
+        np.minimum.at(self.token_start, tokens, frames[is_token])
+        np.maximum.at(self.token_end, tokens, frames[is_token] + 1)
+
+
+def align_stream(chunks, transcript, labels, blank=0, beam=DEFAULT_BEAM):
+    """Generator over (frames_seen, WordSpan) as words become final while `chunks` arrive."""
+    aligner = OnlineAligner(transcript, labels, blank=blank, beam=beam)
+    for chunk in chunks:
+        for word in aligner.feed(chunk):
+            yield aligner.frames, word
+    for word in aligner.finish():
+        yield aligner.frames, word
+
+
+def emission_chunks(session, audio, chunk_seconds=0.5, context_seconds=0.5):
+    """
+    Yield (audio_needed, emissions) as a streaming front end would produce them.
+
+    Each chunk of `chunk_seconds` is run with `context_seconds` of audio on
+    both sides (so it needs audio up to `audio_needed` samples) and trimmed
+    to its own frames; the blocks concatenate to num_frames(len(audio)).
+    """
+    from mms_fa_inference import FRAME_STRIDE, SAMPLE_RATE, num_frames, run_emissions
+
+    chunk = max(1, int(chunk_seconds * SAMPLE_RATE) // FRAME_STRIDE) * FRAME_STRIDE
+    context = int(context_seconds * SAMPLE_RATE) // FRAME_STRIDE * FRAME_STRIDE
+    total = num_frames(len(audio))
+
+    for start in range(0, len(audio), chunk):
+        first, last = start // FRAME_STRIDE, min(total, (start + chunk) // FRAME_STRIDE)
+        if start + chunk >= len(audio):
+            last = total
+        if last <= first:
+            continue
+        window_start = max(0, start - context)
+        window_end = min(len(audio), start + chunk + context)
+        emissions = run_emissions(session, audio[window_start:window_end])
+        offset = window_start // FRAME_STRIDE
+        yield window_end, emissions[first - offset:last - offset]
+        if last == total:
+            break
+
+
+def _transcript_for(targets, labels, rng):
+    """A transcript whose tokens are `targets`, split into words of 2-8 tokens."""
+    text = []
+    i = 0
+    while i < len(targets):
+        size = int(rng.integers(2, 9))
+        text.append("".join(labels[t] for t in targets[i:i + size]))
+        i += size
+    return " ".join(text)
+
+
+def self_check(labels, beam):
+    """Incremental words must equal the full-search words; returns the number of failures."""
+    rng = np.random.default_rng(0)
+    failures = 0
+    for num_frames, num_tokens, chunk in [(98, 20, 10), (490, 150, 25), (980, 300, 25), (2940, 800, 50)]:
+        # The "*" space label (last) never comes from text, so targets stop short of it
+        emissions, targets = planted_case(rng, num_frames, num_tokens, vocab_size=len(labels) - 1)
+        emissions = np.pad(emissions, ((0, 0), (0, 1)), constant_values=-np.inf)
+        transcript = _transcript_for(targets, labels, rng)
+        path, scores = forced_align(emissions, targets)
+        tokens, words, counts = tokenize_words(transcript, labels)
+        expected = merge_words(merge_tokens(path, scores), words, counts)
+
+        emitted_at = []
+        got = []
+        for seen, word in align_stream(
+                (emissions[i:i + chunk] for i in range(0, num_frames, chunk)), transcript, labels, beam=beam):
+            got.append(word)
+            emitted_at.append(seen)
+        ok = got == expected
+        failures += not ok
+        early = sum(seen < num_frames for seen in emitted_at)
+        lag = np.mean([seen - w.end for seen, w in zip(emitted_at, got)]) * 20
+        print(f"   T={num_frames:4d} words={len(expected):3d}: {'PASS' if ok else 'FAIL'} "
+              f"({early}/{len(got)} emitted before the end, mean lag {lag:.0f} ms)")
+
+    # Peaked emissions: one state survives the beam, so feed() commits every frame before finish()
+    tokens, words, counts = tokenize_words("hi yo", labels)
+    emissions = np.full((12, len(labels)), -30.0, dtype=np.float32)
+    for frame, label in enumerate([0, 0] + [t for t in tokens for _ in range(2)] + [0, 0]):
+        emissions[frame, label] = 0.0
+    path, scores = forced_align(emissions, tokens)
+    expected = merge_words(merge_tokens(path, scores), words, counts)
+    got = [word for _, word in align_stream([emissions[:6], emissions[6:]], "hi yo", labels, beam=beam)]
+    ok = got == expected and len(got) == 2
+    failures += not ok
+    print(f"   peaked \"hi yo\": {'PASS' if ok else 'FAIL'} ({[w.text for w in got]})")
+    return failures
+
+
+def benchmark(model_path, labels, beam, chunk_seconds, context_seconds, tts_rtf):
+    """Simulated time-to-first-word: full-sentence path vs incremental alignment."""
+    from audio_corpus import synthetic_corpus
+    from ctc_align import boundary_errors_ms, word_times
+    from mms_fa_inference import FRAME_DURATION, SAMPLE_RATE, create_session, run_emissions
+
+    session = create_session(model_path)
+    run_emissions(session, np.zeros(SAMPLE_RATE, dtype=np.float32))  # warm-up
+
+    print(f"\n   {'utterance':<14}{'audio s':>8}{'full ms':>9}{'online ms':>11}{'speedup':>9}{'bnd ms':>8}")
+    full_latencies, online_latencies, errors = [], [], []
+    for utterance in synthetic_corpus():
+        audio = utterance.audio
+        duration = len(audio) / SAMPLE_RATE
+
+        # Full sentence: wait for all audio, one session.run, one forced alignment
+        start = time.perf_counter()
+        emissions = run_emissions(session, audio)
+        full_words = align_words(log_softmax(emissions), utterance.transcript, labels)
+        full_latency = duration * tts_rtf + time.perf_counter() - start
+
+        # Incremental: each chunk waits for its audio, then runs the model and feeds the aligner
+        aligner = OnlineAligner(utterance.transcript, labels, beam=beam)
+        clock = 0.0
+        first_word = None
+        online_words = []
+        chunks = emission_chunks(session, audio, chunk_seconds, context_seconds)
+        while True:
+            start = time.perf_counter()
+            item = next(chunks, None)
+            if item is None:
+                break
+            needed, block = item
+            words = aligner.feed(log_softmax(block))
+            clock = max(clock, needed / SAMPLE_RATE * tts_rtf) + time.perf_counter() - start
+            if words and first_word is None:
+                first_word = clock
+            online_words.extend(words)
+        start = time.perf_counter()
+        words = aligner.finish()
+        clock += time.perf_counter() - start
+        if words and first_word is None:
+            first_word = clock
+        online_words.extend(words)
+
+        error = boundary_errors_ms(word_times(full_words, FRAME_DURATION), word_times(online_words, FRAME_DURATION))
+        errors.append(error)
+        full_latencies.append(full_latency)
+        if first_word is None:
+            # No alignable word: nothing to compare
+            print(f"   {utterance.name:<14}{duration:>8.1f}{full_latency * 1000:>9.0f}{'n/a':>11}{'n/a':>9}"
+                  f"{error.mean() if error.size else 0:>8.1f}")
+            continue
+        online_latencies.append(first_word)
+        print(f"   {utterance.name:<14}{duration:>8.1f}{full_latency * 1000:>9.0f}{first_word * 1000:>11.0f}"
+              f"{full_latency / first_word:>8.1f}x{error.mean() if error.size else 0:>8.1f}")
+
+    errors = np.concatenate(errors)
+    return {
+        "full_ms": float(np.mean(full_latencies)) * 1000,
+        "online_ms": float(np.mean(online_latencies)) * 1000 if online_latencies else None,
+        "boundary_mean_ms": float(errors.mean()) if errors.size else 0.0,
+    }
+
+
+def main():
+    from mms_fa_inference import FP32_MODEL, load_labels
+
+    parser = argparse.ArgumentParser(description="Incremental forced alignment self-check and latency benchmark")
+    parser.add_argument("--model", default=FP32_MODEL, help="MMS_FA ONNX model for the benchmark")
+    parser.add_argument("--beam", type=float, default=DEFAULT_BEAM, help="pruning beam (log-prob)")
+    parser.add_argument("--chunk", type=float, default=0.5, help="seconds of audio per emission chunk")
+    parser.add_argument("--context", type=float, default=0.5, help="seconds of audio context on each side")
+    parser.add_argument("--tts-rtf", type=float, default=0.3, help="simulated TTS real-time factor")
+    parser.add_argument("--skip-benchmark", action="store_true", help="only run the self-check")
+    args = parser.parse_args()
+
+    labels = load_labels()
+
+    print("=" * 60)
+    print("Online CTC Alignment")
+    print("=" * 60)
+
+    print(f"\n1. Incremental vs full search (beam {args.beam})...")
+    failures = self_check(labels, args.beam)
+
+    if not args.skip_benchmark:
+        print(f"\n2. Time to first word (chunk {args.chunk}s, context {args.context}s, TTS RTF {args.tts_rtf})...")
+        stats = benchmark(args.model, labels, args.beam, args.chunk, args.context, args.tts_rtf)
+        online = f"{stats['online_ms']:.0f} ms" if stats["online_ms"] is not None else "n/a"
+        print(f"\n   Mean time to first word: full {stats['full_ms']:.0f} ms, online {online}")
+        print(f"   Mean boundary difference vs full path: {stats['boundary_mean_ms']:.1f} ms")
+
+    if failures:
+        print(f"\n[FAIL] {failures} case(s) differ from the full search")
+        return 1
+    print("\n[PASS] Incremental alignment matches the full search")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
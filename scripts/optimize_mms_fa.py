@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Offline graph optimization for the MMS_FA ONNX export.
+
+The app creates its session with ORT_ENABLE_ALL, so every cold start pays for
+constant folding, shape inference and operator fusion on the raw opset-14
+graph the exporter writes. This stage does that work once, offline:
+1. ONNX shape inference (value_info for every intermediate tensor)
+2. onnxruntime offline optimization (constant folding, redundant node
+   elimination, fusions) at the chosen level
+3. Saves a pre-optimized .onnx (weights in external data) or an .ort
+   flatbuffer
+4. Compares session-creation time and outputs of the original and the
+   optimized model
+
+"extended" is the default level. "all" adds layout transforms that are tied
+to the machine doing the optimization, so keep it for same-hardware use.
+A pre-optimized model can be loaded with optimizations disabled (or basic),
+which is where the cold-start saving comes from.
+
+Usage:
+    python scripts/optimize_mms_fa.py [--model PATH] [--level extended] [--ort-format]
+    python scripts/export_mms_fa_model.py --optimize     # as export step 8
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from mms_fa_inference import FP32_MODEL, INPUT_NAME, OUTPUT_NAME, SAMPLE_RATE, model_size_bytes
+from resource_usage import mb
+
+LEVELS = ("basic", "extended", "all")
+
+
+def optimization_level(name):
+    """Map 'disabled' / 'basic' / 'extended' / 'all' to ort.GraphOptimizationLevel."""
+    import onnxruntime as ort
+
+    return {
+        "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[name]
+
+
+def optimized_path(model_path, ort_format=False):
+    """mms-fa.onnx -> mms-fa.opt.onnx (or mms-fa.ort)."""
+    stem = os.path.splitext(model_path)[0]
+    return stem + (".ort" if ort_format else ".opt.onnx")
+
+
+def infer_shapes(model_path, output_path):
+    """Run ONNX shape inference and save with weights in `<output>.data`."""
+    import onnx
+
+    model = onnx.load(model_path)
+    inferred = onnx.shape_inference.infer_shapes(model, data_prop=True)
+    for stale in (output_path, output_path + ".data"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    onnx.save_model(
+        inferred,
+        output_path,
+        save_as_external_data=True,
+        all_tensors_to_one_file=True,
+        location=os.path.basename(output_path) + ".data",
+    )
+
+
+def optimize_model(model_path, output_path=None, level="extended", ort_format=False):
+    """
+    Shape-infer and optimize `model_path` offline; returns the output path.
+
+    .onnx outputs keep weights in `<output>.data`; .ort outputs are a single
+    flatbuffer file.
+    """
+    import onnxruntime as ort
+
+    output_path = output_path or optimized_path(model_path, ort_format)
+    for stale in (output_path, output_path + ".data"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inferred_path = os.path.join(tmp, "inferred.onnx")
+        infer_shapes(model_path, inferred_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = optimization_level(level)
+        options.optimized_model_filepath = output_path
+        if ort_format:
+            options.add_session_config_entry("session.save_model_format", "ORT")
+        else:
+            options.add_session_config_entry(
+                "session.optimized_model_external_initializers_file_name",
+                os.path.basename(output_path) + ".data",
+            )
+            options.add_session_config_entry(
+                "session.optimized_model_external_initializers_min_size_in_bytes", "1024"
+            )
+        # Creating the session runs the optimizers and writes optimized_model_filepath
+        ort.InferenceSession(inferred_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    return output_path
+
+
+def session_creation_ms(model_path, level, repeats=5):
+    """Median time to create a CPU session for `model_path` at optimization `level`."""
+    import onnxruntime as ort
+
+    times = []
+    for _ in range(repeats):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = optimization_level(level)
+        start = time.perf_counter()
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        times.append((time.perf_counter() - start) * 1000)
+        del session
+    return statistics.median(times)
+
+
+def compare_outputs(original_path, optimized, seconds=2.0):
+    """Max |difference| of emissions between the original and optimized model."""
+    import onnxruntime as ort
+
+    audio = (np.random.default_rng(0).standard_normal((1, int(seconds * SAMPLE_RATE))) * 0.1).astype(np.float32)
+    outputs = []
+    for path in (original_path, optimized):
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        outputs.append(session.run([OUTPUT_NAME], {INPUT_NAME: audio})[0])
+    return float(np.abs(outputs[0] - outputs[1]).max())
+
+
+def report(original_path, optimized, repeats=5):
+    """Print and return session-creation times and the output difference."""
+    timings = {
+        "original @ all (current app)": session_creation_ms(original_path, "all", repeats),
+        "optimized @ all": session_creation_ms(optimized, "all", repeats),
+        "optimized @ basic": session_creation_ms(optimized, "basic", repeats),
+        "optimized @ disabled": session_creation_ms(optimized, "disabled", repeats),
+    }
+    max_diff = compare_outputs(original_path, optimized)
+
+    print(f"   Original: {original_path} ({mb(model_size_bytes(original_path)):.1f} MB)")
+    print(f"   Optimized: {optimized} ({mb(model_size_bytes(optimized)):.1f} MB)")
+    print(f"\n   Session creation (median of {repeats}):")
+    baseline = timings["original @ all (current app)"]
+    for name, ms in timings.items():
+        print(f"     {name:<30} {ms:8.1f} ms  ({baseline / ms:.2f}x)")
+    print(f"\n   Max emissions difference: {max_diff:.6f}")
+    return {"session_creation_ms": timings, "max_diff": max_diff}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-optimize the MMS_FA ONNX model")
+    parser.add_argument("--model", default=FP32_MODEL, help="exported ONNX model")
+    parser.add_argument("--output", help="output path (default: <model>.opt.onnx or <model>.ort)")
+    parser.add_argument("--level", choices=LEVELS, default="extended", help="onnxruntime optimization level")
+    parser.add_argument("--ort-format", action="store_true", help="save as an ORT-format flatbuffer")
+    parser.add_argument("--repeats", type=int, default=5, help="session creations to time")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MMS_FA Offline Graph Optimization")
+    print("=" * 60)
+
+    print(f"\n1. Optimizing ({args.level})...")
+    output = optimize_model(args.model, args.output, args.level, args.ort_format)
+    print(f"   Saved: {output}")
+
+    print("\n2. Comparing session creation...")
+    report(args.model, output, args.repeats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
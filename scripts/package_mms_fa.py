@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Package the MMS_FA model with a chosen tensor-data layout and measure load cost.
+
+The export writes whatever layout torch.onnx picks (mms-fa.onnx plus
+mms-fa.onnx.data) and nobody controls where the weights land. This step
+writes the same model in several layouts:
+  - inline:     one .onnx file, weights inside the protobuf
+  - external:   weights in <model>.data, packed back to back (onnx default)
+  - aligned:    weights in <model>.data, each tensor starting on a page
+                boundary (4 KiB) so onnxruntime can memory-map it
+  - aligned64k: same with 64 KiB alignment (Windows allocation granularity)
+
+Each layout is loaded in a fresh process that reports session-creation time,
+RSS after load, RSS after the first inference and peak RSS. With inline
+weights the protobuf copy and onnxruntime's copy coexist while loading,
+which roughly doubles peak memory. Aligned external data can be mapped
+instead of read. The chosen layout (or the lowest peak RSS with --layout
+auto) is written to --output-dir.
+
+Usage:
+    python scripts/package_mms_fa.py [--model PATH] [--layout auto|inline|external|aligned|aligned64k]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from mms_fa_inference import (
+    FP32_MODEL,
+    INPUT_NAME,
+    OUTPUT_NAME,
+    PROJECT_ROOT,
+    SAMPLE_RATE,
+    model_size_bytes,
+)
+from resource_usage import current_rss_bytes, mb, peak_rss_bytes
+
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "build", "mms-fa-package")
+
+# Layout name -> external data alignment (None = inline, 1 = packed)
+LAYOUTS = {
+    "inline": None,
+    "external": 1,
+    "aligned": 4096,
+    "aligned64k": 65536,
+}
+
+
+def save_inline(model, path):
+    """Save with every tensor inside the .onnx protobuf (must stay under 2 GB)."""
+    import onnx
+
+    for tensor in model.graph.initializer:
+        if tensor.data_location == onnx.TensorProto.EXTERNAL:
+            raise ValueError("Load the model with its external data before saving inline")
+    onnx.save_model(model, path)
+
+
+def save_external(model, path, alignment=4096, size_threshold=1024):
+    """
+    Save with initializers >= `size_threshold` bytes in `<path>.data`.
+
+    Each tensor's offset is rounded up to a multiple of `alignment`, which is
+    what onnxruntime needs to memory-map it instead of copying.
+    """
+    import onnx
+    from onnx import external_data_helper, numpy_helper
+
+    model = onnx.ModelProto.FromString(model.SerializeToString())
+    location = os.path.basename(path) + ".data"
+
+    with open(path + ".data", "wb") as data:
+        for tensor in model.graph.initializer:
+            if not tensor.HasField("raw_data"):
+                # Typed fields (float_data, ...) -> raw bytes
+                tensor.CopyFrom(numpy_helper.from_array(numpy_helper.to_array(tensor), tensor.name))
+            if len(tensor.raw_data) < size_threshold:
+                continue
+
+            offset = data.tell()
+            padding = -offset % alignment
+            if padding:
+                data.write(b"\0" * padding)
+                offset += padding
+            data.write(tensor.raw_data)
+
+            external_data_helper.set_external_data(tensor, location, offset, len(tensor.raw_data))
+            tensor.data_location = onnx.TensorProto.EXTERNAL
+            tensor.ClearField("raw_data")
+
+    onnx.save_model(model, path)
+
+
+def write_layout(model, directory, name, layout):
+    """Write `model` as `directory/name` in one of LAYOUTS; returns the .onnx path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    for stale in (path, path + ".data"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    alignment = LAYOUTS[layout]
+    if alignment is None:
+        save_inline(model, path)
+    else:
+        save_external(model, path, alignment=alignment)
+    return path
+
+
+def measure_load(model_path, disable_prepacking=False):
+    """Worker: load `model_path` in a fresh process and report time and memory."""
+    import onnxruntime as ort
+
+    baseline = current_rss_bytes()
+    options = ort.SessionOptions()
+    if disable_prepacking:
+        options.add_session_config_entry("session.disable_prepacking", "1")
+
+    start = time.perf_counter()
+    session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    load_ms = (time.perf_counter() - start) * 1000
+    after_load = current_rss_bytes()
+
+    audio = np.zeros((1, 2 * SAMPLE_RATE), dtype=np.float32)
+    session.run([OUTPUT_NAME], {INPUT_NAME: audio})
+    after_run = current_rss_bytes()
+
+    def delta(value):
+        return None if value is None or baseline is None else value - baseline
+
+    return {
+        "load_ms": load_ms,
+        "rss_after_load": delta(after_load),
+        "rss_after_run": delta(after_run),
+        "peak_rss": peak_rss_bytes() - (baseline or 0),
+    }
+
+
+def _fmt_mb(value):
+    return "   n/a" if value is None else f"{mb(value):6.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Package MMS_FA with a measured tensor-data layout")
+    parser.add_argument("--model", default=FP32_MODEL, help="model to package (external data is loaded)")
+    parser.add_argument("--layout", choices=["auto"] + list(LAYOUTS), default="auto",
+                        help="layout to write (auto = lowest peak RSS)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="where the packaged model goes")
+    parser.add_argument("--disable-prepacking", action="store_true",
+                        help="measure with session.disable_prepacking (avoids a packed weight copy)")
+    args = parser.parse_args()
+
+    import onnx
+
+    print("=" * 60)
+    print("MMS_FA Model Packaging")
+    print("=" * 60)
+
+    print(f"\n1. Loading {args.model}...")
+    model = onnx.load(args.model)
+    name = os.path.basename(args.model)
+    print(f"   {len(model.graph.initializer)} initializers, {mb(model_size_bytes(args.model)):.1f} MB on disk")
+
+    print("\n2. Measuring layouts (fresh process each)...")
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in LAYOUTS:
+            try:
+                path = write_layout(model, os.path.join(tmp, layout), name, layout)
+            except ValueError as e:
+                print(f"   {layout}: skipped ({e})")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                stats = pool.submit(measure_load, path, args.disable_prepacking).result()
+            stats["size"] = model_size_bytes(path)
+            results[layout] = stats
+
+    print(f"\n   {'layout':<12}{'size MB':>9}{'load ms':>9}{'RSS load':>10}{'RSS run':>9}{'peak':>8}")
+    for layout, stats in results.items():
+        print(f"   {layout:<12}{mb(stats['size']):>9.1f}{stats['load_ms']:>9.1f}"
+              f"{_fmt_mb(stats['rss_after_load']):>10}{_fmt_mb(stats['rss_after_run']):>9}"
+              f"{_fmt_mb(stats['peak_rss']):>8}")
+    print("   (RSS figures are MB above the worker's baseline)")
+
+    layout = args.layout
+    if layout == "auto":
+        layout = min(results, key=lambda key: results[key]["peak_rss"])
+    print(f"\n3. Writing '{layout}' layout to {args.output_dir}...")
+    output = write_layout(model, args.output_dir, name, layout)
+    labels = os.path.join(os.path.dirname(args.model), "labels.txt")
+    if os.path.exists(labels):
+        shutil.copy(labels, args.output_dir)
+    print(f"   {output} ({mb(model_size_bytes(output)):.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
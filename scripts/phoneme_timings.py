@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Word timings straight from Piper's phoneme durations (w_ceil), checked against MMS_FA.
+
+Piper models exported by export-and-update-model.sh have a `w_ceil` output:
+the number of 256-sample decoder frames each input id (phoneme, pad, BOS/EOS)
+lasts. With each id's text range (PhonemeInfo.textRange in SherpaOnnx.swift),
+word timings are a cumulative sum plus a per-word min/max, with no second
+model pass. phoneme_word_times() does that with NumPy.
+
+For every sentence this tool gets phoneme durations and audio either by
+running a w_ceil Piper model with onnxruntime (--piper-model; phonemized with
+piper-phonemize like sherpa-onnx does), or from a JSON dump (--phonemes) of
+  [{"text": ..., "audio": "x.wav", "phonemes": [{"symbol": "h", "duration": 0.06, "textRange": [0, 5]}, ...]}]
+then aligns the same audio with MMS_FA and reports:
+  - per-word start/end disagreement (mean, p95, max, share within --tolerance-ms)
+  - time for the phoneme path vs the MMS_FA path (inference + forced alignment)
+
+Usage:
+    python scripts/phoneme_timings.py --piper-model en_US-lessac-medium.onnx [--sentences doc.txt] [--tolerance-ms 50]
+    python scripts/phoneme_timings.py --phonemes phonemes.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import SYNTHETIC_SENTENCES, load_audio, resample
+from ctc_align import align_words, boundary_errors_ms, log_softmax, split_words, word_times
+from emission_backends import load_tokens
+from mms_fa_inference import FP32_MODEL, FRAME_DURATION, SAMPLE_RATE, create_session, load_labels, run_emissions
+from precompute_alignments import load_paragraphs
+from speed_transform import PIPER_DIR
+
+# Piper decoder hop: each w_ceil unit is 256 output samples
+PIPER_HOP = 256
+
+# Piper id-sequence markers (see piper_phonemize phonemes_to_ids)
+PAD, BOS, EOS, WORD_SEPARATOR = "_", "^", "$", " "
+
+# Piper inference scales: noise_scale, length_scale, noise_w
+PIPER_SCALES = (0.667, 1.0, 0.8)
+
+
+def phoneme_word_times(durations, text_ranges, text):
+    """
+    {word index: (start_seconds, end_seconds)} from phoneme durations and text ranges.
+
+    durations: seconds per phoneme, in order
+    text_ranges: [N, 2] character ranges into `text`; empty ranges (pads,
+        pauses, BOS/EOS) take time but belong to no word
+    Words are split like split_words(); a word spans from its first
+    phoneme's start to its last phoneme's end.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    ranges = np.asarray(text_ranges, dtype=np.int64).reshape(-1, 2)
+    ends = np.cumsum(durations)
+    starts = ends - durations
+
+    words = split_words(text)
+    if not words or not len(durations):
+        return {}
+    word_offsets = np.array([offset for _, offset in words], dtype=np.int64)
+    word_ends = word_offsets + np.array([len(word) for word, _ in words], dtype=np.int64)
+
+    word_of = np.searchsorted(word_offsets, ranges[:, 0], side="right") - 1
+    valid = (ranges[:, 1] > ranges[:, 0]) & (word_of >= 0)
+    valid &= ranges[:, 0] < word_ends[np.maximum(word_of, 0)]
+
+    first = np.full(len(words), np.inf)
+    last = np.full(len(words), -np.inf)
+    np.minimum.at(first, word_of[valid], starts[valid])
+    np.maximum.at(last, word_of[valid], ends[valid])
+    return {int(i): (float(first[i]), float(last[i])) for i in np.flatnonzero(np.isfinite(first))}
+
+
+def phoneme_ids(text, token_ids, voice="en-us", data_path=None):
+    """
+    Piper input ids for `text` and the text range of every id.
+
+    The sentence is phonemized once; if espeak's words do not line up with
+    the text's words (numbers, abbreviations), each word is phonemized on
+    its own instead.
+    """
+    from piper_phonemize import phonemize_espeak
+
+    data_path = data_path or os.path.join(PIPER_DIR, "espeak-ng-data")
+    words = split_words(text)
+    sentences = phonemize_espeak(text, voice, data_path=data_path)
+    phoneme_words = WORD_SEPARATOR.join("".join(sentence) for sentence in sentences).split(WORD_SEPARATOR)
+    phoneme_words = [w for w in phoneme_words if w]
+    if len(phoneme_words) != len(words):
+        phoneme_words = [
+            "".join("".join(sentence) for sentence in phonemize_espeak(word, voice, data_path=data_path))
+            .replace(WORD_SEPARATOR, "")
+            for word, _ in words
+        ]
+
+    ids = [token_ids[BOS], token_ids[PAD]]
+    ranges = [(0, 0), (0, 0)]
+    for i, ((word, offset), phonemes) in enumerate(zip(words, phoneme_words)):
+        if i:
+            ids += [token_ids[WORD_SEPARATOR], token_ids[PAD]]
+            ranges += [(0, 0), (0, 0)]
+        for phoneme in phonemes:
+            if phoneme in token_ids:
+                ids += [token_ids[phoneme], token_ids[PAD]]
+                ranges += [(offset, offset + len(word))] * 2
+    ids.append(token_ids[EOS])
+    ranges.append((0, 0))
+    return np.array(ids, dtype=np.int64), np.array(ranges, dtype=np.int64)
+
+
+class PiperSynthesizer:
+    """A w_ceil Piper export run directly with onnxruntime."""
+
+    def __init__(self, model_path, tokens_path=None, intra_op_threads=2):
+        import onnx
+
+        self.session = create_session(model_path, intra_op_threads)
+        outputs = [o.name for o in self.session.get_outputs()]
+        if "w_ceil" not in outputs:
+            raise ValueError(f"{model_path} has no w_ceil output; export it with export-and-update-model.sh")
+        metadata = {p.key: p.value for p in onnx.load(model_path, load_external_data=False).metadata_props}
+        self.sample_rate = int(metadata.get("sample_rate", 22050))
+        self.token_ids = {
+            symbol: i for i, symbol in enumerate(load_tokens(tokens_path or os.path.join(PIPER_DIR, "tokens.txt")))
+        }
+
+    def synthesize(self, text):
+        """(audio at self.sample_rate, phoneme durations in seconds, text ranges)."""
+        ids, ranges = phoneme_ids(text, self.token_ids)
+        feeds = {
+            "input": ids[np.newaxis],
+            "input_lengths": np.array([len(ids)], dtype=np.int64),
+            "scales": np.array(PIPER_SCALES, dtype=np.float32),
+        }
+        if any(i.name == "sid" for i in self.session.get_inputs()):
+            feeds["sid"] = np.array([0], dtype=np.int64)
+        audio, w_ceil = self.session.run(["output", "w_ceil"], feeds)
+        durations = np.asarray(w_ceil, dtype=np.float64).reshape(-1) * PIPER_HOP / self.sample_rate
+        return np.asarray(audio, dtype=np.float32).reshape(-1), durations, ranges
+
+
+def load_phoneme_dump(path):
+    """[(text, 16 kHz audio, durations, text ranges)] from a --phonemes JSON file."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    items = []
+    for entry in entries:
+        phonemes = entry["phonemes"]
+        items.append((
+            entry["text"],
+            load_audio(os.path.join(base, entry["audio"])),
+            np.array([p["duration"] for p in phonemes], dtype=np.float64),
+            np.array([p["textRange"] for p in phonemes], dtype=np.int64).reshape(-1, 2),
+        ))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare w_ceil phoneme timings with MMS_FA alignment")
+    parser.add_argument("--piper-model", help="Piper .onnx exported with w_ceil")
+    parser.add_argument("--phonemes", help="JSON dump of text, audio and PhonemeInfo entries")
+    parser.add_argument("--sentences", help="sentences to synthesize (JSON array or .txt; default: synthetic corpus text)")
+    parser.add_argument("--model", default=FP32_MODEL, help="MMS_FA ONNX model")
+    parser.add_argument("--threads", type=int, default=2, help="intra-op threads (the app uses 2)")
+    parser.add_argument("--tolerance-ms", type=float, default=50.0, help="word boundary agreement budget")
+    args = parser.parse_args()
+
+    if not args.piper_model and not args.phonemes:
+        parser.error("need --piper-model or --phonemes")
+
+    print("=" * 60)
+    print("Phoneme-Duration Word Timings vs MMS_FA")
+    print("=" * 60)
+
+    # 1. Audio and phoneme durations
+    print("\n1. Getting audio and phoneme durations...")
+    if args.phonemes:
+        items = load_phoneme_dump(args.phonemes)
+    else:
+        synthesizer = PiperSynthesizer(args.piper_model)
+        sentences = load_paragraphs(args.sentences) if args.sentences else list(SYNTHETIC_SENTENCES)
+        items = []
+        for text in sentences:
+            audio, durations, ranges = synthesizer.synthesize(text)
+            items.append((text, resample(audio, synthesizer.sample_rate), durations, ranges))
+    print(f"   {len(items)} sentences, {sum(len(i[1]) for i in items) / SAMPLE_RATE:.1f}s of audio")
+
+    # 2. Both timing paths
+    print("\n2. Timing both paths...")
+    session = create_session(args.model, intra_op_threads=args.threads)
+    labels = load_labels()
+    run_emissions(session, items[0][1])  # warm-up
+
+    phoneme_seconds = mms_seconds = 0.0
+    errors = []
+    print(f"\n   {'sentence':<34}{'words':>6}{'mean ms':>9}{'max ms':>8}{'phon ms':>9}{'mms ms':>9}")
+    for text, audio, durations, ranges in items:
+        start = time.perf_counter()
+        from_phonemes = phoneme_word_times(durations, ranges, text)
+        phoneme_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        spans = align_words(log_softmax(run_emissions(session, audio)), text, labels)
+        from_mms = word_times(spans, FRAME_DURATION)
+        mms_ms = (time.perf_counter() - start) * 1000
+
+        sentence_errors = boundary_errors_ms(from_mms, from_phonemes)
+        errors.append(sentence_errors)
+        phoneme_seconds += phoneme_ms / 1000
+        mms_seconds += mms_ms / 1000
+        print(f"   {text[:32]:<34}{len(from_phonemes):>6}"
+              f"{sentence_errors.mean() if sentence_errors.size else 0:>9.1f}"
+              f"{sentence_errors.max() if sentence_errors.size else 0:>8.1f}{phoneme_ms:>9.3f}{mms_ms:>9.1f}")
+
+    errors = np.concatenate(errors)
+    within = float(np.mean(errors <= args.tolerance_ms)) if errors.size else 0.0
+    p95 = float(np.percentile(errors, 95)) if errors.size else 0.0
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"\n   Boundaries compared: {errors.size}")
+    print(f"   Disagreement: mean {errors.mean() if errors.size else 0:.1f} ms, p95 {p95:.1f} ms, "
+          f"max {errors.max() if errors.size else 0:.1f} ms")
+    print(f"   Within {args.tolerance_ms:.0f} ms: {within * 100:.1f}%")
+    print(f"   Phoneme path: {phoneme_seconds * 1000:.2f} ms, MMS_FA path: {mms_seconds * 1000:.1f} ms "
+          f"({mms_seconds / max(phoneme_seconds, 1e-9):.0f}x)")
+
+    if p95 <= args.tolerance_ms:
+        print(f"\n[PASS] Phoneme timings agree with MMS_FA within {args.tolerance_ms:.0f} ms (p95); "
+              "the CTC pass can be skipped")
+        return 0
+    print(f"\n[FAIL] Phoneme timings differ from MMS_FA by more than {args.tolerance_ms:.0f} ms (p95)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Precompute word alignments offline in AlignmentCache's on-disk layout.
+
+AlignmentCache keeps one pretty-printed AlignmentResult JSON per
+(document, paragraph, speed) under Caches/WordAlignments:
+
+    WordAlignments/<DOCUMENT-UUID>/<paragraph>_<speed>.json
+
+This CLI produces the same files from a document's paragraphs plus their
+synthesized audio, using the MMS_FA ONNX export and ctc_align, spread over a
+process pool (one warm onnxruntime session per worker). Content shipped with
+the app (Resources/SampleContent) can then be copied into the cache under its
+document ID and play with highlighting on first use without any CPU cost.
+
+Timings follow CTCForcedAligner.align/mergeToWords:
+  - frame rate = emission frames / audio seconds (~49 fps)
+  - a word starts at its first token's frame and runs until the next word's
+    first token (the last word runs to the end of the audio)
+  - rangeLocation/rangeLength are offsets into the paragraph text
+  - if alignment fails, words get uniform timings (createUniformWordTimings)
+
+Offsets are Python code-point offsets. They match Swift's Character offsets
+except for text with multi-code-point graphemes (emoji, combining marks).
+
+Inputs:
+    --paragraphs  JSON array of paragraph strings, or a .txt with one paragraph per line
+    --audio-dir   <paragraph>_<speed>.wav (e.g. 3_1.0.wav) or <paragraph>.wav (uses --speed)
+
+Usage:
+    python scripts/precompute_alignments.py --paragraphs doc.json --audio-dir wavs/ \\
+        --document-id 6F9619FF-8B86-D011-B42D-00CF4FC964FF --output WordAlignments --workers 4
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import json
+import os
+import re
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from audio_corpus import load_audio
+from ctc_align import align_words, log_softmax, split_words
+from mms_fa_inference import FP32_MODEL, SAMPLE_RATE, create_session, load_labels, run_emissions
+
+# Paragraph audio longer than this goes through windowed inference (stream_emissions.py)
+LONG_AUDIO_SECONDS = 30.0
+
+# Worker state (one session per process)
+_session = None
+_labels = None
+
+
+def speed_string(speed):
+    """Format a speed like Swift's Float description ("1.0", "1.25")."""
+    return str(np.float32(speed))
+
+
+def cache_file_name(paragraph, speed):
+    """AlignmentCache.getFileURL file name."""
+    return f"{paragraph}_{speed_string(speed)}.json"
+
+
+def uniform_word_timings(transcript, total_duration):
+    """CTCForcedAligner.createUniformWordTimings: evenly spread words over the audio."""
+    words = split_words(transcript)
+    if not words:
+        return []
+    per_word = total_duration / len(words)
+    return [
+        word_timing(i, i * per_word, per_word, text, offset)
+        for i, (text, offset) in enumerate(words)
+    ]
+
+
+def word_timing(index, start, duration, text, offset):
+    """One AlignmentResult.WordTiming, keys in CodingKeys order."""
+    return {
+        "wordIndex": index,
+        "startTime": start,
+        "duration": duration,
+        "text": text,
+        "rangeLocation": offset,
+        "rangeLength": len(text),
+    }
+
+
+def alignment_result(paragraph_index, transcript, emissions, num_samples, labels):
+    """AlignmentResult dict for one paragraph from its raw emissions."""
+    total_duration = num_samples / SAMPLE_RATE
+    if num_samples == 0 or len(emissions) == 0:
+        # Nothing to align against: uniform timings (all zero-length for empty audio)
+        return {"paragraphIndex": paragraph_index, "totalDuration": total_duration,
+                "wordTimings": uniform_word_timings(transcript, total_duration)}
+    frame_rate = len(emissions) / total_duration
+
+    try:
+        spans = align_words(log_softmax(emissions), transcript, labels)
+    except ValueError:
+        spans = []  # more tokens than frames
+
+    timings = []
+    for i, span in enumerate(spans):
+        # Swift spans run through trailing blanks up to the next token
+        end = spans[i + 1].start if i + 1 < len(spans) else len(emissions)
+        start_time = span.start / frame_rate
+        timings.append(word_timing(span.index, start_time, end / frame_rate - start_time, span.text, span.offset))
+
+    if not timings:
+        timings = uniform_word_timings(transcript, total_duration)
+
+    return {"paragraphIndex": paragraph_index, "totalDuration": total_duration, "wordTimings": timings}
+
+
+def encode_alignment(result):
+    """JSON text in the shape JSONEncoder(.prettyPrinted) writes."""
+    return json.dumps(result, indent=2, separators=(",", " : "), ensure_ascii=False)
+
+
+def load_paragraphs(path):
+    """Paragraph strings from a JSON array or a one-paragraph-per-line text file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [str(p) for p in json.load(f)]
+        return [line.rstrip("\n") for line in f]
+
+
+def find_audio(audio_dir, default_speed):
+    """[(paragraph, speed, wav_path)] for <p>_<speed>.wav and <p>.wav files."""
+    jobs = []
+    for path in sorted(glob.glob(os.path.join(audio_dir, "*.wav"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        match = re.fullmatch(r"(\d+)(?:_([0-9.]+))?", name)
+        if match:
+            speed = float(match.group(2)) if match.group(2) else default_speed
+            jobs.append((int(match.group(1)), speed, path))
+    return sorted(jobs)
+
+
+def _init_worker(model_path, threads):
+    global _session, _labels
+    _session = create_session(model_path, intra_op_threads=threads)
+    _labels = load_labels()
+
+
+def _align_job(job):
+    """Worker: align one paragraph and write its cache file."""
+    paragraph, speed, wav_path, transcript, output_dir = job
+    start = time.perf_counter()
+    audio = load_audio(wav_path)
+
+    if len(audio) / SAMPLE_RATE > LONG_AUDIO_SECONDS:
+        from stream_emissions import stitched_emissions
+        emissions = stitched_emissions(_session, audio)
+    else:
+        emissions = run_emissions(_session, audio)
+
+    result = alignment_result(paragraph, transcript, emissions, len(audio), _labels)
+    path = os.path.join(output_dir, cache_file_name(paragraph, speed))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(encode_alignment(result))
+    os.replace(tmp_path, path)
+
+    return paragraph, speed, len(result["wordTimings"]), len(audio) / SAMPLE_RATE, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute AlignmentCache files offline")
+    parser.add_argument("--paragraphs", required=True, help="JSON array or one-paragraph-per-line .txt")
+    parser.add_argument("--audio-dir", required=True, help="folder of <paragraph>[_<speed>].wav files")
+    parser.add_argument("--document-id", help="document UUID (default: a new random UUID)")
+    parser.add_argument("--output", default="WordAlignments", help="cache root (Caches/WordAlignments layout)")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed for <paragraph>.wav files")
+    parser.add_argument("--model", default=FP32_MODEL, help="MMS_FA ONNX model")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads per worker")
+    args = parser.parse_args()
+
+    document_id = str(uuid.UUID(args.document_id) if args.document_id else uuid.uuid4()).upper()
+    output_dir = os.path.join(args.output, document_id)
+    os.makedirs(output_dir, exist_ok=True)
+
+    paragraphs = load_paragraphs(args.paragraphs)
+    jobs = []
+    for paragraph, speed, path in find_audio(args.audio_dir, args.speed):
+        if paragraph >= len(paragraphs):
+            print(f"   WARNING: {os.path.basename(path)} has no paragraph {paragraph}, skipping")
+            continue
+        jobs.append((paragraph, speed, path, paragraphs[paragraph], output_dir))
+
+    print("=" * 60)
+    print("Offline Alignment Precompute")
+    print("=" * 60)
+    print(f"\n   Document: {document_id}")
+    print(f"   Paragraphs: {len(paragraphs)}, audio files: {len(jobs)}")
+    print(f"   Workers: {args.workers} x {args.threads} thread(s)")
+
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.model, args.threads)) as pool:
+        for paragraph, speed, words, seconds, elapsed in pool.map(_align_job, jobs):
+            audio_seconds += seconds
+            print(f"   {cache_file_name(paragraph, speed)}: {words} words, {seconds:.1f}s audio, {elapsed:.2f}s")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n   Aligned {audio_seconds:.1f}s of audio in {elapsed:.1f}s "
+          f"({audio_seconds / max(elapsed, 1e-9):.1f} audio-s/s)")
+    print(f"   Output: {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Per-operator onnxruntime profiling of MMS_FA exports.
+
+Enables onnxruntime session profiling, runs every model over a set of audio
+lengths, and condenses the Chrome-trace JSON into:
+  - total model_run time per audio length
+  - a per-op-type table (time, share, node count, calls)
+  - the top-N slowest nodes
+  - an op-type comparison across models (e.g. fp32 vs int8), which shows
+    where quantization helps, where it adds work (QuantizeLinear,
+    DynamicQuantizeLinear, casts) and which op types are worth targeting
+
+The first run of each length is a warm-up and is excluded. Node names are
+those of the graph after onnxruntime's optimizations at --level (the app uses
+"all"), so fused nodes such as FusedConv or Attention show up as such.
+
+Usage:
+    python scripts/profile_mms_fa.py                                   # mms-fa.onnx vs mms-fa-int8.onnx
+    python scripts/profile_mms_fa.py --models mms-fa.onnx mms-fa-int8-static.onnx --lengths 2,5,10 --top 15
+    python scripts/profile_mms_fa.py --output profile.json
+"""
+
+import argparse
+from collections import defaultdict
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from mms_fa_inference import INPUT_NAME, MODEL_DIR, OUTPUT_NAME, SAMPLE_RATE, input_dtype
+
+KERNEL_SUFFIX = "_kernel_time"
+
+
+def profile_model(model_path, lengths_seconds, repeats=3, threads=2, level="all"):
+    """
+    Run `model_path` with profiling on and return the parsed trace events.
+
+    Returns (node_events, run_events): kernel events as
+    (length_seconds, node_name, op_type, duration_us) and model_run events
+    as (length_seconds, duration_us), warm-up runs excluded.
+    """
+    import onnxruntime as ort
+    from optimize_mms_fa import optimization_level
+
+    with tempfile.TemporaryDirectory() as tmp:
+        options = ort.SessionOptions()
+        options.enable_profiling = True
+        options.profile_file_prefix = os.path.join(tmp, "mms-fa")
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = optimization_level(level)
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        rng = np.random.default_rng(0)
+        schedule = []  # (audio length, is warm-up) of each run, in order
+        for seconds in lengths_seconds:
+            audio = (rng.standard_normal((1, int(seconds * SAMPLE_RATE))) * 0.1).astype(input_dtype(session))
+            for repeat in range(repeats + 1):
+                session.run([OUTPUT_NAME], {INPUT_NAME: audio})
+                schedule.append((seconds, repeat == 0))
+
+        with open(session.end_profiling()) as f:
+            events = json.load(f)
+
+    runs = sorted((e for e in events if e.get("name") == "model_run"), key=lambda e: e["ts"])
+    if len(runs) != len(schedule):
+        raise RuntimeError(f"Expected {len(schedule)} model_run events, found {len(runs)}")
+
+    # Drop the warm-up (first) run of every length
+    keep = [
+        (run["ts"], run["ts"] + run["dur"], seconds)
+        for run, (seconds, warm_up) in zip(runs, schedule)
+        if not warm_up
+    ]
+
+    node_events = []
+    for event in events:
+        if event.get("cat") != "Node" or not event["name"].endswith(KERNEL_SUFFIX):
+            continue
+        for start, end, seconds in keep:
+            if start <= event["ts"] <= end:
+                node_events.append((
+                    seconds,
+                    event["name"][:-len(KERNEL_SUFFIX)],
+                    event["args"].get("op_name", "?"),
+                    event["dur"],
+                ))
+                break
+    run_events = [(seconds, end - start) for start, end, seconds in keep]
+    return node_events, run_events
+
+
+def summarize(node_events, run_events):
+    """Aggregate trace events into per-length, per-op-type and per-node totals (ms per run)."""
+    runs_per_length = defaultdict(int)
+    run_ms = defaultdict(float)
+    for seconds, duration in run_events:
+        runs_per_length[seconds] += 1
+        run_ms[seconds] += duration / 1000
+    total_runs = len(run_events)
+
+    op_types = defaultdict(lambda: {"ms": 0.0, "calls": 0, "nodes": set()})
+    nodes = defaultdict(lambda: {"ms": 0.0, "op_type": None})
+    for seconds, name, op_type, duration in node_events:
+        entry = op_types[op_type]
+        entry["ms"] += duration / 1000 / total_runs
+        entry["calls"] += 1
+        entry["nodes"].add(name)
+        nodes[name]["ms"] += duration / 1000 / total_runs
+        nodes[name]["op_type"] = op_type
+
+    kernel_ms = sum(entry["ms"] for entry in op_types.values())
+    return {
+        "run_ms": {seconds: run_ms[seconds] / runs_per_length[seconds] for seconds in sorted(run_ms)},
+        "kernel_ms": kernel_ms,
+        "op_types": {
+            op_type: {
+                "ms": entry["ms"],
+                "share": entry["ms"] / kernel_ms if kernel_ms else 0.0,
+                "nodes": len(entry["nodes"]),
+                "calls_per_run": entry["calls"] / total_runs,
+            }
+            for op_type, entry in sorted(op_types.items(), key=lambda item: -item[1]["ms"])
+        },
+        "nodes": {
+            name: {"op_type": entry["op_type"], "ms": entry["ms"],
+                   "share": entry["ms"] / kernel_ms if kernel_ms else 0.0}
+            for name, entry in sorted(nodes.items(), key=lambda item: -item[1]["ms"])
+        },
+    }
+
+
+def print_summary(name, summary, top):
+    print(f"\n   {name}")
+    for seconds, ms in summary["run_ms"].items():
+        print(f"     {seconds:g}s audio: {ms:.1f} ms per run")
+
+    print(f"\n     {'op type':<28}{'ms/run':>9}{'share':>8}{'nodes':>7}")
+    for op_type, entry in summary["op_types"].items():
+        print(f"     {op_type:<28}{entry['ms']:>9.2f}{entry['share'] * 100:>7.1f}%{entry['nodes']:>7}")
+
+    print(f"\n     Top {top} nodes:")
+    print(f"     {'node':<40}{'op type':<20}{'ms/run':>9}{'share':>8}")
+    for node, entry in list(summary["nodes"].items())[:top]:
+        print(f"     {node[:39]:<40}{entry['op_type'][:19]:<20}{entry['ms']:>9.2f}{entry['share'] * 100:>7.1f}%")
+
+
+def print_comparison(summaries):
+    """Op-type ms/run side by side; the first model is the reference."""
+    names = list(summaries)
+    op_types = []
+    for summary in summaries.values():
+        op_types.extend(op for op in summary["op_types"] if op not in op_types)
+
+    header = "".join(f"{os.path.basename(n)[:18]:>20}" for n in names)
+    print(f"\n   {'op type (ms/run)':<28}{header}{'delta':>10}")
+    for op_type in op_types:
+        values = [summaries[n]["op_types"].get(op_type, {}).get("ms", 0.0) for n in names]
+        delta = values[-1] - values[0]
+        print(f"   {op_type:<28}" + "".join(f"{v:>20.2f}" for v in values) + f"{delta:>+10.2f}")
+    totals = [summaries[n]["kernel_ms"] for n in names]
+    print(f"   {'TOTAL (kernels)':<28}" + "".join(f"{v:>20.2f}" for v in totals)
+          + f"{totals[-1] - totals[0]:>+10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile MMS_FA exports per operator")
+    parser.add_argument("--models", nargs="+", default=["mms-fa.onnx", "mms-fa-int8.onnx"],
+                        help="model files (names are looked up in Resources/mms-fa); first is the reference")
+    parser.add_argument("--lengths", default="1,5,15", help="comma-separated audio lengths in seconds")
+    parser.add_argument("--repeats", type=int, default=3, help="profiled runs per length (after a warm-up)")
+    parser.add_argument("--threads", type=int, default=2, help="intra-op threads (the app uses 2)")
+    parser.add_argument("--level", choices=["disabled", "basic", "extended", "all"], default="all",
+                        help="graph optimization level")
+    parser.add_argument("--top", type=int, default=10, help="slowest nodes to list")
+    parser.add_argument("--output", help="write the summaries as JSON")
+    args = parser.parse_args()
+
+    models = [path if os.path.exists(path) else os.path.join(MODEL_DIR, path) for path in args.models]
+    lengths = [float(value) for value in args.lengths.split(",")]
+
+    print("=" * 60)
+    print("MMS_FA Operator Profile")
+    print("=" * 60)
+    print(f"\n   Lengths: {lengths} s, {args.repeats} runs each, {args.threads} thread(s), level {args.level}")
+
+    summaries = {}
+    for model_path in models:
+        if not os.path.exists(model_path):
+            print(f"\n   WARNING: {model_path} not found, skipping")
+            continue
+        node_events, run_events = profile_model(model_path, lengths, args.repeats, args.threads, args.level)
+        summaries[model_path] = summarize(node_events, run_events)
+        print_summary(os.path.basename(model_path), summaries[model_path], args.top)
+
+    if not summaries:
+        print("\n   ERROR: no models to profile")
+        return 1
+
+    if len(summaries) > 1:
+        print("\n" + "=" * 60)
+        print("COMPARISON")
+        print("=" * 60)
+        print_comparison(summaries)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({os.path.basename(path): summary for path, summary in summaries.items()}, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Static (calibrated) INT8 quantization of mms-fa.onnx, including Conv layers.
+
+test_int8_quantization.py only runs quantize_dynamic on MatMul/Gemm, so the
+wav2vec2 feature-extractor convolutions stay FP32 and every call pays for
+computing activation scales. This script:
+1. Pre-processes the model (shape inference + ORT graph cleanup)
+2. Calibrates activation ranges on a folder of representative speech
+   (e.g. Piper TTS output; any WAV rate, resampled to 16 kHz). --calibration
+   is required: --synthetic-calibration calibrates on the synthetic tone
+   corpus instead, which only checks the pipeline, and writes
+   mms-fa-int8-static.pipeline-check.onnx rather than a shippable model
+3. Quantizes to QDQ INT8 with per-op-type include and per-node exclude lists
+4. Checks the result against FP32: frame argmax agreement and word-boundary
+   drift (ms) from forced alignment, with pass/fail thresholds
+
+Usage:
+    python scripts/quantize_mms_fa.py --calibration DIR
+    python scripts/quantize_mms_fa.py --calibration DIR --op-types Conv MatMul --exclude-nodes "*pos_conv*"
+    python scripts/quantize_mms_fa.py --synthetic-calibration     # pipeline check, not shippable
+    python scripts/quantize_mms_fa.py --mode dynamic     # same as test_int8_quantization.py
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from audio_corpus import load_corpus, synthetic_corpus
+from ctc_align import align_words, boundary_errors_ms, log_softmax, word_times
+from emission_cache import EmissionCache
+from mms_fa_inference import (
+    FP32_MODEL,
+    FRAME_DURATION,
+    INPUT_NAME,
+    MODEL_DIR,
+    SAMPLE_RATE,
+    create_session,
+    load_labels,
+    model_size_bytes,
+    run_emissions,
+)
+from resource_usage import mb
+
+STATIC_MODEL = os.path.join(MODEL_DIR, "mms-fa-int8-static.onnx")
+PIPELINE_CHECK_MODEL = os.path.join(MODEL_DIR, "mms-fa-int8-static.pipeline-check.onnx")
+DYNAMIC_MODEL = os.path.join(MODEL_DIR, "mms-fa-int8.onnx")
+
+
+class SpeechCalibrationReader:
+    """
+    CalibrationDataReader over 16 kHz clips, cropped to `max_seconds`.
+
+    Kept duck-typed (get_next/rewind) so importing this module does not need
+    onnxruntime.quantization.
+    """
+
+    def __init__(self, clips, max_seconds=10.0):
+        limit = int(max_seconds * SAMPLE_RATE)
+        self.clips = [np.asarray(c[:limit], dtype=np.float32) for c in clips]
+        self.position = 0
+
+    def get_next(self):
+        if self.position >= len(self.clips):
+            return None
+        clip = self.clips[self.position]
+        self.position += 1
+        return {INPUT_NAME: clip.reshape(1, -1)}
+
+    def rewind(self):
+        self.position = 0
+
+
+def matching_nodes(model_path, patterns):
+    """Names of graph nodes matching any fnmatch pattern (e.g. '*pos_conv*')."""
+    if not patterns:
+        return []
+    import onnx
+
+    model = onnx.load(model_path, load_external_data=False)
+    return [
+        node.name for node in model.graph.node
+        if node.name and any(fnmatch.fnmatch(node.name, p) for p in patterns)
+    ]
+
+
+def quantize_static_model(model_path, output_path, calibration_clips, op_types, exclude_nodes=(),
+                          per_channel=True, method="minmax", max_seconds=10.0, preprocess=True):
+    """Calibrate on `calibration_clips` and write a QDQ INT8 model; returns excluded node names."""
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    # onnx refuses to overwrite an existing external data file
+    for stale in (output_path, output_path + ".data"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    methods = {
+        "minmax": CalibrationMethod.MinMax,
+        "entropy": CalibrationMethod.Entropy,
+        "percentile": CalibrationMethod.Percentile,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = model_path
+        if preprocess:
+            source = os.path.join(tmp, "preprocessed.onnx")
+            quant_pre_process(model_path, source, save_as_external_data=True,
+                              all_tensors_to_one_file=True, external_data_location="preprocessed.onnx.data")
+
+        excluded = matching_nodes(source, exclude_nodes)
+        quantize_static(
+            model_input=source,
+            model_output=output_path,
+            calibration_data_reader=SpeechCalibrationReader(calibration_clips, max_seconds),
+            quant_format=QuantFormat.QDQ,
+            op_types_to_quantize=list(op_types),
+            per_channel=per_channel,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            nodes_to_exclude=excluded,
+            use_external_data_format=True,
+            calibrate_method=methods[method],
+        )
+    return excluded
+
+
+def quantize_dynamic_model(model_path, output_path):
+    """The test_int8_quantization.py recipe: dynamic INT8 on MatMul/Gemm only."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        model_input=model_path,
+        model_output=output_path,
+        weight_type=QuantType.QInt8,
+        extra_options={"MatMulConstBOnly": True},
+        op_types_to_quantize=["MatMul", "Gemm"],
+    )
+
+
+def compare_models(reference_path, candidate_path, utterances, labels, cache=None):
+    """
+    Argmax agreement and word-boundary errors (ms) of candidate vs reference.
+
+    With an EmissionCache, emissions already computed for the same audio and
+    model file are reused instead of running the model again.
+    """
+    reference = create_session(reference_path)
+    candidate = create_session(candidate_path)
+
+    def emissions(session, model_path, audio):
+        if cache is None:
+            return run_emissions(session, audio)
+        return np.asarray(cache.emissions(session, model_path, audio), dtype=np.float32)
+
+    matches = total = 0
+    errors = []
+    for utterance in utterances:
+        ref = emissions(reference, reference_path, utterance.audio)
+        cand = emissions(candidate, candidate_path, utterance.audio)
+        matches += int(np.sum(ref.argmax(-1) == cand.argmax(-1)))
+        total += len(ref)
+
+        ref_words = word_times(align_words(log_softmax(ref), utterance.transcript, labels), FRAME_DURATION)
+        cand_words = word_times(align_words(log_softmax(cand), utterance.transcript, labels), FRAME_DURATION)
+        errors.append(boundary_errors_ms(ref_words, cand_words))
+
+    errors = np.concatenate(errors) if errors else np.zeros(0)
+    return {
+        "argmax_agreement": matches / total if total else 0.0,
+        "boundary_mean_ms": float(errors.mean()) if errors.size else 0.0,
+        "boundary_max_ms": float(errors.max()) if errors.size else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize mms-fa.onnx to INT8")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--model", default=FP32_MODEL, help="FP32 input model")
+    parser.add_argument("--output", help="quantized model path (default depends on mode)")
+    calibration = parser.add_mutually_exclusive_group()
+    calibration.add_argument("--calibration", help="WAV folder of representative speech (required for static mode)")
+    calibration.add_argument("--synthetic-calibration", action="store_true",
+                             help="calibrate on the synthetic tone corpus (pipeline check only, not shippable)")
+    parser.add_argument("--max-clips", type=int, default=64, help="calibration clips to use")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="crop calibration clips to this length")
+    parser.add_argument("--method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    parser.add_argument("--op-types", nargs="+", default=["Conv", "MatMul", "Gemm"],
+                        help="op types to quantize (static mode)")
+    parser.add_argument("--exclude-nodes", nargs="*", default=[],
+                        help="node name patterns to keep in FP32, e.g. '*feature_extractor*conv_layers.0*'")
+    parser.add_argument("--per-tensor", action="store_true", help="per-tensor instead of per-channel weights")
+    parser.add_argument("--no-preprocess", action="store_true", help="skip quant_pre_process")
+    parser.add_argument("--check-corpus", help="WAV+TXT folder for the accuracy check (default: synthetic)")
+    parser.add_argument("--no-cache", action="store_true", help="don't reuse cached emissions for the check")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="min frame argmax agreement")
+    parser.add_argument("--max-boundary-ms", type=float, default=40.0, help="max mean word-boundary drift")
+    args = parser.parse_args()
+    if args.mode == "static" and not (args.calibration or args.synthetic_calibration):
+        parser.error("static mode needs --calibration DIR of representative speech "
+                     "(or --synthetic-calibration for a pipeline check)")
+
+    pipeline_check = args.mode == "static" and args.synthetic_calibration
+    if args.mode == "dynamic":
+        output = args.output or DYNAMIC_MODEL
+    else:
+        output = args.output or (PIPELINE_CHECK_MODEL if pipeline_check else STATIC_MODEL)
+
+    print("=" * 60)
+    print(f"MMS_FA INT8 Quantization ({args.mode})")
+    print("=" * 60)
+    if pipeline_check:
+        print("\n   WARNING: calibrating on synthetic tones, not speech. Activation ranges will not")
+        print("   match real audio: this run only checks the pipeline. Do NOT ship the output.")
+
+    # 1. Quantize
+    print("\n1. Quantizing...")
+    try:
+        if args.mode == "static":
+            clips = synthetic_corpus() if pipeline_check else load_corpus(args.calibration)
+            clips = [u.audio for u in clips[:args.max_clips]]
+            print(f"   Calibration clips: {len(clips)} from {args.calibration or 'synthetic corpus'}")
+            print(f"   Method: {args.method}, op types: {args.op_types}")
+            excluded = quantize_static_model(
+                args.model, output, clips, args.op_types, args.exclude_nodes,
+                per_channel=not args.per_tensor, method=args.method,
+                max_seconds=args.max_seconds, preprocess=not args.no_preprocess,
+            )
+            print(f"   Excluded nodes: {len(excluded)}")
+            for name in excluded[:10]:
+                print(f"     - {name}")
+        else:
+            quantize_dynamic_model(args.model, output)
+    except Exception as e:
+        print(f"   ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+    fp32_size = mb(model_size_bytes(args.model))
+    int8_size = mb(model_size_bytes(output))
+    print(f"   FP32 model: {fp32_size:.1f} MB")
+    print(f"   INT8 model: {int8_size:.1f} MB ({fp32_size / int8_size:.1f}x smaller)")
+
+    # 2. Accuracy check against FP32
+    print("\n2. Checking word boundaries against FP32...")
+    utterances = load_corpus(args.check_corpus) if args.check_corpus else synthetic_corpus()
+    cache = None if args.no_cache else EmissionCache()
+    stats = compare_models(args.model, output, utterances, load_labels(), cache)
+    print(f"   Argmax agreement: {stats['argmax_agreement'] * 100:.1f}%")
+    print(f"   Word boundary drift: mean {stats['boundary_mean_ms']:.1f} ms, max {stats['boundary_max_ms']:.1f} ms")
+
+    print(f"\nQuantized model saved to: {output}")
+    if stats["argmax_agreement"] >= args.min_agreement and stats["boundary_mean_ms"] <= args.max_boundary_ms:
+        if pipeline_check:
+            print("\n[PASS] Pipeline check only: calibrated on synthetic tones, re-run with --calibration DIR")
+        else:
+            print("\n[PASS] Quantized model is within the alignment tolerances")
+        return 0
+    print("\n[FAIL] Quantized model drifts beyond the alignment tolerances")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
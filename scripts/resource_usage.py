@@ -0,0 +1,157 @@
+"""
+Process memory readings for the MMS_FA tooling.
+
+psutil is used when installed; otherwise current RSS comes from
+/proc/self/statm (Linux) and peak RSS from getrusage, whose ru_maxrss is in
+kilobytes on Linux and bytes on macOS.
+
+MemoryTracker records a timeline: a background thread samples RSS every few
+milliseconds, and named stages (export steps, session loads, each
+session.run) record their RSS before/after/peak plus, with tracemalloc on,
+the peak of Python-side allocations (NumPy arrays included; onnxruntime and
+torch native buffers only show up in RSS). ru_maxrss is a lifetime peak, so
+per-stage peaks come from the samples.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes():
+    """Current resident set size, or None when it cannot be read on this platform."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def mb(num_bytes):
+    """Bytes to MB for reports (None stays None)."""
+    return None if num_bytes is None else num_bytes / 1024 / 1024
+
+
+class MemoryTracker:
+    """
+    RSS timeline plus per-stage memory records for one process.
+
+    with MemoryTracker(budget_bytes=...) as tracker:
+        with tracker.stage("load", model="mms-fa.onnx"):
+            session = create_session(...)
+        emissions = tracker.run_session(session, None, feeds, audio_seconds=5.0)
+    tracker.over_budget()      # stages whose peak RSS exceeded the budget
+    tracker.write_timeline(path)
+    """
+
+    def __init__(self, budget_bytes=None, interval=0.005, trace_python=True):
+        self.budget_bytes = budget_bytes
+        self.interval = interval
+        self.trace_python = trace_python
+        self.samples = []  # (seconds since start, rss bytes)
+        self.stages = []
+        self._start = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self.trace_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._sample()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+        if self.trace_python and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is not None:
+            self.samples.append((time.perf_counter() - self._start, rss))
+        return rss
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    @contextmanager
+    def stage(self, name, **tags):
+        """Record RSS and Python-allocation peaks while the block runs; tags go into the record."""
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        python_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        rss_before = self._sample()
+        first_sample = len(self.samples) - 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = self._sample()
+            window = [rss for _, rss in self.samples[max(first_sample, 0):]]
+            record = {
+                "stage": name,
+                **tags,
+                "start_s": round(start - self._start, 4),
+                "seconds": round(seconds, 4),
+                "rss_before": rss_before,
+                "rss_after": rss_after,
+                "rss_peak": max(window) if window else None,
+                "process_peak_rss": peak_rss_bytes(),
+            }
+            if python_before is not None:
+                record["python_peak"] = tracemalloc.get_traced_memory()[1] - python_before
+            self.stages.append(record)
+
+    def run_session(self, session, output_names, feeds, **tags):
+        """session.run inside a "session.run" stage."""
+        with self.stage("session.run", **tags):
+            return session.run(output_names, feeds)
+
+    def over_budget(self):
+        """Stage records whose peak RSS exceeded budget_bytes (empty without a budget)."""
+        if self.budget_bytes is None:
+            return []
+        return [r for r in self.stages if r["rss_peak"] is not None and r["rss_peak"] > self.budget_bytes]
+
+    def timeline(self):
+        return {
+            "budget_bytes": self.budget_bytes,
+            "interval_s": self.interval,
+            "samples": [[round(t, 4), rss] for t, rss in self.samples],
+            "stages": self.stages,
+        }
+
+    def write_timeline(self, path):
+        with open(path, "w") as f:
+            json.dump(self.timeline(), f, indent=2)
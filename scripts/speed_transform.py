@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Derive per-speed word timings from one reference alignment.
+
+Piper (through sherpa-onnx) implements speed as length_scale / speed: every
+phoneme duration the duration predictor outputs is multiplied by
+1 / speed before the decoder, so a paragraph at speed s is, to within
+per-phoneme rounding (one 256-sample hop) and the duration noise, the 1.0x
+paragraph stretched by 1 / s. AlignmentCache nevertheless keys alignments
+by speed, so every speed a user tries costs another MMS_FA pass.
+
+derive_alignment() rescales a reference AlignmentResult instead:
+  - "nominal" scaling multiplies every time by reference_speed / speed
+  - "duration" scaling uses the new audio's real length
+    (total_duration / reference totalDuration), which also absorbs fixed
+    padding and rounding drift; the audio exists anyway once it is synthesized
+
+Subcommands:
+  derive    write <paragraph>_<speed>.json files next to existing
+            <paragraph>_1.0.json files in an AlignmentCache document folder
+  validate  align real audio at several speeds with MMS_FA, derive the same
+            speeds from the reference alignment and report word-boundary
+            error against --tolerance-ms
+
+Audio for validate comes from --audio-dir (<paragraph>_<speed>.wav, e.g.
+Piper output saved by the app), from --piper-model (synthesized with the
+sherpa-onnx Python package) or, by default, from the synthetic corpus
+time-scaled by resampling (a pipeline check, not a test of Piper).
+
+Usage:
+    python scripts/speed_transform.py derive WordAlignments/<DOCUMENT-UUID> --speeds 0.75,1.25,1.5 [--audio-dir wavs/]
+    python scripts/speed_transform.py validate --paragraphs doc.json --audio-dir wavs/ [--tolerance-ms 50]
+    python scripts/speed_transform.py validate --piper-model en_US-lessac-medium.onnx --speeds 0.75,1.25,1.5,2.0
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from audio_corpus import SYNTHETIC_SENTENCES, load_audio, read_wav, resample, synthetic_utterance
+from ctc_align import boundary_errors_ms
+from mms_fa_inference import FP32_MODEL, PROJECT_ROOT, SAMPLE_RATE, create_session, load_labels, run_emissions
+from precompute_alignments import (
+    LONG_AUDIO_SECONDS,
+    alignment_result,
+    cache_file_name,
+    encode_alignment,
+    find_audio,
+    load_paragraphs,
+)
+
+REFERENCE_SPEED = 1.0
+MODES = ("nominal", "duration")
+
+PIPER_DIR = os.path.join(PROJECT_ROOT, "Listen2", "Listen2", "Listen2", "Resources", "PiperModels")
+
+
+def nominal_scale(speed, reference_speed=REFERENCE_SPEED):
+    """Time scale between two speeds when durations go as 1 / speed."""
+    return reference_speed / speed
+
+
+def scale_alignment(reference, scale, total_duration=None):
+    """AlignmentResult dict with every start time and duration multiplied by `scale`."""
+    return {
+        "paragraphIndex": reference["paragraphIndex"],
+        "totalDuration": total_duration if total_duration is not None else reference["totalDuration"] * scale,
+        "wordTimings": [
+            {**timing, "startTime": timing["startTime"] * scale, "duration": timing["duration"] * scale}
+            for timing in reference["wordTimings"]
+        ],
+    }
+
+
+def derive_alignment(reference, speed, reference_speed=REFERENCE_SPEED, total_duration=None, mode="nominal"):
+    """
+    Predict the AlignmentResult at `speed` from the one at `reference_speed`.
+
+    mode "duration" needs `total_duration` (seconds of audio at `speed`).
+    """
+    if mode == "duration":
+        if total_duration is None:
+            raise ValueError("duration scaling needs the total duration of the new audio")
+        return scale_alignment(reference, total_duration / reference["totalDuration"], total_duration)
+    if mode != "nominal":
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {MODES}")
+    return scale_alignment(reference, nominal_scale(speed, reference_speed))
+
+
+def boundary_times(result):
+    """{wordIndex: (start, end)} for an AlignmentResult dict (for boundary_errors_ms)."""
+    return {
+        timing["wordIndex"]: (timing["startTime"], timing["startTime"] + timing["duration"])
+        for timing in result["wordTimings"]
+    }
+
+
+def _speed_files(document_dir, speed):
+    """{paragraph: path} of the cache files for one speed in a document folder."""
+    files = {}
+    suffix = cache_file_name(0, speed)[1:]
+    for path in glob.glob(os.path.join(document_dir, f"*{suffix}")):
+        match = re.fullmatch(r"(\d+)", os.path.basename(path)[:-len(suffix)])
+        if match:
+            files[int(match.group(1))] = path
+    return files
+
+
+def derive_cache(document_dir, speeds, audio_dir=None, reference_speed=REFERENCE_SPEED, overwrite=False):
+    """Write derived <paragraph>_<speed>.json files; returns the paths written."""
+    audio = {}
+    if audio_dir:
+        audio = {(p, round(s, 4)): path for p, s, path in find_audio(audio_dir, REFERENCE_SPEED)}
+
+    written = []
+    for paragraph, path in sorted(_speed_files(document_dir, reference_speed).items()):
+        with open(path, encoding="utf-8") as f:
+            reference = json.load(f)
+        for speed in speeds:
+            target = os.path.join(document_dir, cache_file_name(paragraph, speed))
+            if speed == reference_speed or (os.path.exists(target) and not overwrite):
+                continue
+            wav_path = audio.get((paragraph, round(speed, 4)))
+            if wav_path:
+                samples, rate = read_wav(wav_path)
+                result = derive_alignment(reference, speed, reference_speed, len(samples) / rate, "duration")
+            else:
+                result = derive_alignment(reference, speed, reference_speed)
+            with open(target + ".tmp", "w", encoding="utf-8") as f:
+                f.write(encode_alignment(result))
+            os.replace(target + ".tmp", target)
+            written.append(target)
+    return written
+
+
+def synthetic_speed_audio(speeds):
+    """{(paragraph, speed): audio} from the synthetic corpus, time-scaled by resampling."""
+    audio = {}
+    for paragraph, text in enumerate(SYNTHETIC_SENTENCES):
+        base = synthetic_utterance(text)
+        for speed in speeds:
+            audio[(paragraph, speed)] = resample(base, SAMPLE_RATE, int(round(SAMPLE_RATE / speed)))
+    return list(SYNTHETIC_SENTENCES), audio
+
+
+def piper_speed_audio(model_path, paragraphs, speeds, tokens=None, data_dir=None):
+    """{(paragraph, speed): 16 kHz audio} synthesized with sherpa-onnx (like PiperTTSProvider)."""
+    import sherpa_onnx
+
+    config = sherpa_onnx.OfflineTtsConfig(
+        model=sherpa_onnx.OfflineTtsModelConfig(
+            vits=sherpa_onnx.OfflineTtsVitsModelConfig(
+                model=model_path,
+                tokens=tokens or os.path.join(PIPER_DIR, "tokens.txt"),
+                data_dir=data_dir or os.path.join(PIPER_DIR, "espeak-ng-data"),
+            ),
+            num_threads=2,
+        ),
+    )
+    tts = sherpa_onnx.OfflineTts(config)
+    audio = {}
+    for paragraph, text in enumerate(paragraphs):
+        for speed in speeds:
+            generated = tts.generate(text, sid=0, speed=speed)
+            audio[(paragraph, speed)] = resample(np.asarray(generated.samples, dtype=np.float32),
+                                                 generated.sample_rate)
+    return audio
+
+
+def _align(session, labels, paragraph, transcript, audio):
+    if len(audio) / SAMPLE_RATE > LONG_AUDIO_SECONDS:
+        from stream_emissions import stitched_emissions
+        emissions = stitched_emissions(session, audio)
+    else:
+        emissions = run_emissions(session, audio)
+    return alignment_result(paragraph, transcript, emissions, len(audio), labels)
+
+
+def validate(paragraphs, audio, speeds, model_path=FP32_MODEL, reference_speed=REFERENCE_SPEED):
+    """
+    Boundary errors (ms) of derived vs aligned timings.
+
+    Returns ({(mode, speed): errors array}, {speed: fitted time scale}); the
+    fitted scale is the least-squares factor mapping reference word starts
+    onto the aligned ones, to compare against reference_speed / speed.
+    """
+    session = create_session(model_path)
+    labels = load_labels()
+    errors = {}
+    fitted = {}
+    for paragraph, transcript in enumerate(paragraphs):
+        if (paragraph, reference_speed) not in audio:
+            continue
+        reference = _align(session, labels, paragraph, transcript, audio[(paragraph, reference_speed)])
+        for speed in speeds:
+            if speed == reference_speed or (paragraph, speed) not in audio:
+                continue
+            samples = audio[(paragraph, speed)]
+            actual = _align(session, labels, paragraph, transcript, samples)
+            for mode in MODES:
+                derived = derive_alignment(reference, speed, reference_speed, len(samples) / SAMPLE_RATE, mode)
+                errors.setdefault((mode, speed), []).append(
+                    boundary_errors_ms(boundary_times(actual), boundary_times(derived))
+                )
+            fitted.setdefault(speed, []).append((boundary_times(reference), boundary_times(actual)))
+
+    scales = {}
+    for speed, pairs in fitted.items():
+        ref = np.concatenate([[r[i][0] for i in sorted(set(r) & set(a))] for r, a in pairs])
+        act = np.concatenate([[a[i][0] for i in sorted(set(r) & set(a))] for r, a in pairs])
+        scales[speed] = float(ref @ act / (ref @ ref)) if ref.size else None
+    return {key: np.concatenate(value) for key, value in errors.items()}, scales
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive and validate per-speed word timings")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    derive = sub.add_parser("derive", help="write derived per-speed AlignmentCache files")
+    derive.add_argument("document_dir", help="WordAlignments/<DOCUMENT-UUID> folder with <p>_1.0.json files")
+    derive.add_argument("--speeds", default="0.75,1.25,1.5,2.0", help="comma-separated target speeds")
+    derive.add_argument("--audio-dir", help="<paragraph>_<speed>.wav files for duration scaling")
+    derive.add_argument("--overwrite", action="store_true", help="replace existing files for those speeds")
+
+    check = sub.add_parser("validate", help="compare derived timings with real MMS_FA alignment")
+    check.add_argument("--paragraphs", help="JSON array or one-paragraph-per-line .txt")
+    check.add_argument("--audio-dir", help="<paragraph>_<speed>.wav files (needs --paragraphs)")
+    check.add_argument("--piper-model", help="Piper voice .onnx to synthesize with (needs sherpa-onnx)")
+    check.add_argument("--speeds", default="0.75,1.25,1.5,2.0", help="comma-separated speeds to check")
+    check.add_argument("--model", default=FP32_MODEL, help="MMS_FA ONNX model")
+    check.add_argument("--tolerance-ms", type=float, default=50.0, help="highlight tolerance (p95 error)")
+    args = parser.parse_args()
+
+    speeds = [float(s) for s in args.speeds.split(",")]
+
+    if args.command == "derive":
+        for path in derive_cache(args.document_dir, speeds, args.audio_dir, overwrite=args.overwrite):
+            print(f"   {path}")
+        return 0
+
+    speeds = sorted(set(speeds) | {REFERENCE_SPEED})
+    if args.audio_dir:
+        if not args.paragraphs:
+            parser.error("--audio-dir needs --paragraphs")
+        paragraphs = load_paragraphs(args.paragraphs)
+        audio = {(p, s): load_audio(path) for p, s, path in find_audio(args.audio_dir, REFERENCE_SPEED)}
+        source = args.audio_dir
+    elif args.piper_model:
+        paragraphs = load_paragraphs(args.paragraphs) if args.paragraphs else list(SYNTHETIC_SENTENCES)
+        audio = piper_speed_audio(args.piper_model, paragraphs, speeds)
+        source = os.path.basename(args.piper_model)
+    else:
+        paragraphs, audio = synthetic_speed_audio(speeds)
+        source = "synthetic (resampled)"
+
+    print("=" * 60)
+    print("Speed-Invariant Alignment Validation")
+    print("=" * 60)
+    print(f"\n   Audio: {source}, {len(paragraphs)} paragraphs")
+    print(f"   Speeds: {speeds} (reference {REFERENCE_SPEED})")
+
+    errors, scales = validate(paragraphs, audio, speeds, args.model)
+    if not errors:
+        print("\n   ERROR: no paragraph has audio at the reference speed and another speed")
+        return 1
+
+    print(f"\n   {'speed':>6}{'scale':>8}{'fitted':>8}{'mode':>10}{'mean ms':>9}{'p95 ms':>8}{'max ms':>8}")
+    failures = 0
+    for speed in [s for s in speeds if s != REFERENCE_SPEED]:
+        for mode in MODES:
+            if (mode, speed) not in errors:
+                continue
+            values = errors[(mode, speed)]
+            p95 = float(np.percentile(values, 95)) if values.size else 0.0
+            failures += mode == "duration" and p95 > args.tolerance_ms
+            fitted = scales.get(speed)
+            print(f"   {speed:>6g}{nominal_scale(speed):>8.3f}{fitted or 0:>8.3f}{mode:>10}"
+                  f"{values.mean() if values.size else 0:>9.1f}{p95:>8.1f}{values.max() if values.size else 0:>8.1f}")
+
+    if failures:
+        print(f"\n[FAIL] Derived timings exceed {args.tolerance_ms:.0f} ms (p95) at {failures} speed(s)")
+        return 1
+    print(f"\n[PASS] Derived timings are within {args.tolerance_ms:.0f} ms (p95) at every speed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
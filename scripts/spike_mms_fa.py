@@ -169,21 +169,28 @@ def main():
         return
 
     # 7. Test with variable length audio
+    # (emissions go through the on-disk cache; the PyTorch comparison above
+    # stays uncached because the cache stores float16)
     print("\n7. Testing variable length audio...")
     try:
+        from emission_cache import EmissionCache
+
+        cache = EmissionCache()
+        rng = np.random.default_rng(0)
         for duration_sec in [0.5, 1.0, 2.0, 5.0]:
             samples = int(16000 * duration_sec)
-            test_audio = np.random.randn(1, samples).astype(np.float32)
-            result = session.run(None, {"audio": test_audio})
-            print(f"   {duration_sec}s ({samples} samples) -> {result[0].shape[1]} frames")
+            test_audio = rng.standard_normal((1, samples)).astype(np.float32)
+            result = cache.emissions(session, onnx_path, test_audio)
+            print(f"   {duration_sec}s ({samples} samples) -> {result.shape[0]} frames")
+        print(f"   Emission cache: {cache.hits} hits, {cache.misses} misses")
     except Exception as e:
         print(f"   ERROR with variable length: {e}")
 
     # 8. Test CTC alignment
     print("\n8. Testing CTC forced alignment...")
     try:
-        # Use torchaudio's forced_align function
-        from torchaudio.functional import forced_align
+        # NumPy port of torchaudio's forced_align (scripts/ctc_align.py)
+        from ctc_align import forced_align, log_softmax
 
         # Tokenize "hello"
         if labels:
@@ -198,24 +205,13 @@ def main():
             print(f"   Transcript: '{transcript}'")
             print(f"   Tokens: {tokens}")
 
-            # Prepare for forced_align
-            emissions_log = torch.log_softmax(emissions, dim=-1)
-            targets = torch.tensor([tokens], dtype=torch.int32)
-            input_lengths = torch.tensor([emissions.shape[1]])
-            target_lengths = torch.tensor([len(tokens)])
-
-            # Get alignment
-            alignments, scores = forced_align(
-                emissions_log,
-                targets,
-                input_lengths,
-                target_lengths,
-                blank=0  # CTC blank is usually index 0
-            )
-
-            print(f"   Alignment shape: {alignments.shape}")
-            print(f"   Alignment: {alignments[0].tolist()[:20]}...")
-            print(f"   Score: {scores[0].item():.3f}")
+            # Get alignment (blank=0: CTC blank is usually index 0)
+            emissions_log = log_softmax(emissions[0].numpy())
+            alignment, scores = forced_align(emissions_log, tokens, blank=0)
+
+            print(f"   Alignment shape: {alignment.shape}")
+            print(f"   Alignment: {alignment.tolist()[:20]}...")
+            print(f"   Score: {scores.sum():.3f}")
 
     except Exception as e:
         print(f"   ERROR in CTC alignment: {e}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Long-audio MMS_FA emissions with overlapping windows.
+
+Running a whole chapter through the model in one session.run makes attention
+cost and peak memory grow with the audio length. iter_emissions() slides
+fixed-size overlapping windows across 16 kHz audio of any length, cuts
+neighbouring windows at the midpoint of their overlap, and yields the
+stitched frames block by block. Only one window of audio and emissions is
+alive at a time.
+
+Window starts are multiples of the 320-sample frame hop, so frame k of a
+window starting at sample s is global frame s / 320 + k. The last window runs
+to the end of the audio (up to 319 samples longer than the others when the
+length is not a multiple of the hop), so the stitched output has exactly
+num_frames(len(audio)) frames, the same as a single full pass.
+
+Usage:
+    python scripts/stream_emissions.py [--model PATH] [--seconds 120] [--window 20] [--overlap 2]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from ctc_align import log_softmax
+from mms_fa_inference import (
+    FP32_MODEL,
+    FRAME_STRIDE,
+    SAMPLE_RATE,
+    create_session,
+    num_frames,
+    run_emissions,
+)
+
+
+def window_starts(num_samples, window_samples, hop_samples):
+    """
+    Sample offsets of each window.
+
+    The last start is pulled back so its window reaches the audio end; that
+    window then runs to num_samples rather than start + window_samples.
+    """
+    if num_samples <= window_samples:
+        return [0]
+    starts = list(range(0, num_samples - window_samples, hop_samples))
+    last = (num_samples - window_samples) // FRAME_STRIDE * FRAME_STRIDE
+    if last > starts[-1]:
+        starts.append(last)
+    return starts
+
+
+def iter_emissions(session, audio, window_seconds=20.0, overlap_seconds=2.0):
+    """
+    Yield (first_frame, emissions) blocks covering `audio` in order.
+
+    Args:
+        session: onnxruntime session for an MMS_FA export
+        audio: 1-D 16 kHz float array (np.memmap works, only windows are read)
+        window_seconds: audio per session.run
+        overlap_seconds: audio shared by neighbouring windows (context on both sides of a cut)
+
+    The blocks concatenate to a [num_frames(len(audio)), vocab] matrix.
+    """
+    num_samples = len(audio)
+    window = int(window_seconds * SAMPLE_RATE) // FRAME_STRIDE * FRAME_STRIDE
+    overlap = int(overlap_seconds * SAMPLE_RATE) // FRAME_STRIDE * FRAME_STRIDE
+    if overlap >= window:
+        raise ValueError("overlap must be shorter than the window")
+
+    starts = window_starts(num_samples, window, window - overlap)
+    emitted = 0  # next global frame to yield
+
+    for i, start in enumerate(starts):
+        end = start + window if i + 1 < len(starts) else num_samples
+        chunk = np.asarray(audio[start:end], dtype=np.float32)
+        emissions = run_emissions(session, chunk)[:num_frames(len(chunk))]
+        offset = start // FRAME_STRIDE
+
+        if i + 1 < len(starts):
+            # Cut at the midpoint of the overlap with the next window
+            next_offset = starts[i + 1] // FRAME_STRIDE
+            cut = (next_offset + offset + len(emissions)) // 2
+        else:
+            cut = offset + len(emissions)
+
+        if cut > emitted:
+            yield emitted, emissions[emitted - offset:cut - offset]
+            emitted = cut
+
+    expected = num_frames(num_samples)
+    if emitted != expected:
+        raise RuntimeError(f"Stitched {emitted} frames, expected {expected}")
+
+
+def stitched_emissions(session, audio, window_seconds=20.0, overlap_seconds=2.0):
+    """Collect iter_emissions() into one [frames, vocab] array."""
+    blocks = [block for _, block in iter_emissions(session, audio, window_seconds, overlap_seconds)]
+    return np.concatenate(blocks)
+
+
+def compare_with_full_pass(session, audio, window_seconds=20.0, overlap_seconds=2.0):
+    """Stitched vs single full-length pass, compared as log-probabilities."""
+    full = log_softmax(run_emissions(session, audio))
+    stitched = log_softmax(stitched_emissions(session, audio, window_seconds, overlap_seconds))
+    if full.shape != stitched.shape:
+        raise RuntimeError(f"Shape mismatch: full {full.shape} vs stitched {stitched.shape}")
+
+    diff = np.abs(full - stitched)
+    return {
+        "frames": full.shape[0],
+        "max_diff": float(diff.max()),
+        "mean_diff": float(diff.mean()),
+        "argmax_match": float(np.mean(full.argmax(-1) == stitched.argmax(-1))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check windowed MMS_FA emissions against a full pass")
+    parser.add_argument("--model", default=FP32_MODEL, help="MMS_FA ONNX model")
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of synthetic test audio")
+    parser.add_argument("--window", type=float, default=20.0, help="window length in seconds")
+    parser.add_argument("--overlap", type=float, default=2.0, help="window overlap in seconds")
+    parser.add_argument("--atol", type=float, default=0.05, help="max mean |log-prob| difference")
+    parser.add_argument("--min-match", type=float, default=0.99, help="min argmax agreement")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MMS_FA Windowed Emissions Check")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(int(args.seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+    session = create_session(args.model)
+
+    print(f"\n   Audio: {args.seconds:.0f}s, window {args.window:.0f}s, overlap {args.overlap:.1f}s")
+    start = time.perf_counter()
+    blocks = 0
+    for _ in iter_emissions(session, audio, args.window, args.overlap):
+        blocks += 1
+    print(f"   Streamed {blocks} blocks in {time.perf_counter() - start:.2f}s")
+
+    # Lengths that are not a multiple of the 320-sample hop leave a partial frame at the end
+    print("\n   Odd lengths (3s window, 1s overlap):")
+    odd_audio = (rng.standard_normal(12 * SAMPLE_RATE) * 0.1).astype(np.float32)
+    odd_ok = True
+    for num_samples in [7 * SAMPLE_RATE + 84, 9 * SAMPLE_RATE + 319, 11 * SAMPLE_RATE + 1, 2 * SAMPLE_RATE + 401]:
+        frames = len(stitched_emissions(session, odd_audio[:num_samples], 3.0, 1.0))
+        ok = frames == num_frames(num_samples)
+        odd_ok &= ok
+        print(f"   {'[PASS]' if ok else '[FAIL]'} {num_samples} samples -> {frames} frames "
+              f"(expected {num_frames(num_samples)})")
+
+    stats = compare_with_full_pass(session, audio, args.window, args.overlap)
+    print(f"\n   Frames: {stats['frames']}")
+    print(f"   Max log-prob difference: {stats['max_diff']:.4f}")
+    print(f"   Mean log-prob difference: {stats['mean_diff']:.6f}")
+    print(f"   Argmax agreement: {stats['argmax_match'] * 100:.2f}%")
+
+    if odd_ok and stats["mean_diff"] <= args.atol and stats["argmax_match"] >= args.min_match:
+        print("\n[PASS] Stitched emissions match the full-length pass")
+        return 0
+    print("\n[FAIL] Stitched emissions differ from the full-length pass")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Accuracy-vs-speed sweep over layer-pruned MMS_FA exports.
+
+Forced alignment against a known transcript may not need every transformer
+layer. For each depth this exports mms-fa-drop<N>.onnx (top N layers
+removed, CTC head re-attached; see mms_fa_torch.drop_encoder_layers)
+and measures, in a fresh process per model (benchmark_mms_fa.run_variant):
+  - model size on disk
+  - p50 / p95 session.run latency and real-time factor
+  - argmax agreement and word-boundary drift (ms) against the full model
+
+The recommendation is the smallest model whose boundary drift stays under
+--max-drift-ms (p95 by default, --metric max for the worst case).
+
+Usage:
+    python scripts/sweep_layer_pruning.py --drop 0,2,4,6,8,12 [--corpus DIR] [--threads 2]
+    python scripts/sweep_layer_pruning.py --skip-export     # measure existing mms-fa-drop<N>.onnx files
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import json
+import multiprocessing
+import os
+import sys
+
+from audio_corpus import corpus_seconds, load_corpus, synthetic_corpus
+from benchmark_mms_fa import run_variant, summarize
+from mms_fa_inference import FP32_MODEL, MODEL_DIR, load_labels
+
+
+def pruned_path(count):
+    """mms-fa.onnx for 0 dropped layers, otherwise mms-fa-drop<N>.onnx."""
+    return FP32_MODEL if count == 0 else os.path.join(MODEL_DIR, f"mms-fa-drop{count}.onnx")
+
+
+def export_depths(counts):
+    """Export every pruned depth from one loaded MMS_FA model (needs torch/torchaudio)."""
+    import torch
+    from torchaudio.pipelines import MMS_FA as bundle
+
+    from mms_fa_torch import EmissionsOnlyWrapper, drop_encoder_layers, export_onnx
+
+    model = bundle.get_model()
+    model.eval()
+    dummy_audio = torch.randn(1, bundle.sample_rate)
+
+    for count in counts:
+        path = pruned_path(count)
+        if count == 0 and os.path.exists(path):
+            continue  # the shipping model is the reference, don't re-export it here
+        pruned = copy.deepcopy(model)
+        kept = drop_encoder_layers(pruned, count)
+        wrapper = EmissionsOnlyWrapper(pruned)
+        wrapper.eval()
+        export_onnx(wrapper, dummy_audio, path)
+        print(f"   Exported {os.path.basename(path)} ({kept} layers)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep layer-pruned MMS_FA exports")
+    parser.add_argument("--drop", default="0,2,4,6,8,12", help="comma-separated layer counts to drop (0 = reference)")
+    parser.add_argument("--skip-export", action="store_true", help="measure existing exports only")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--threads", type=int, default=2, help="intra-op threads (the app uses 2)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per utterance")
+    parser.add_argument("--max-drift-ms", type=float, default=20.0, help="boundary drift budget")
+    parser.add_argument("--metric", choices=["p95", "max", "mean"], default="p95", help="drift statistic to budget")
+    parser.add_argument("--output", default="mms-fa-layer-sweep.json", help="JSON results file")
+    args = parser.parse_args()
+
+    counts = sorted({0} | {int(c) for c in args.drop.split(",")})
+
+    print("=" * 60)
+    print("MMS_FA Layer Pruning Sweep")
+    print("=" * 60)
+
+    if not args.skip_export:
+        print("\n1. Exporting pruned models...")
+        export_depths(counts)
+
+    models = [(count, pruned_path(count)) for count in counts if os.path.exists(pruned_path(count))]
+    missing = [count for count in counts if not os.path.exists(pruned_path(count))]
+    if missing:
+        print(f"   WARNING: no export for drop={missing}, skipping")
+    if not models or models[0][0] != 0:
+        print("\n   ERROR: the full model (mms-fa.onnx) is needed as the reference")
+        return 1
+
+    utterances = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    labels = load_labels()
+    audio_seconds = corpus_seconds(utterances)
+
+    print(f"\n2. Measuring ({len(utterances)} utterances, {audio_seconds:.1f}s, {args.threads} thread(s))...")
+    context = multiprocessing.get_context("spawn")
+    records = []
+    reference = None
+    for count, path in models:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            run = pool.submit(run_variant, path, args.threads, utterances, labels, args.repeats).result()
+        reference = reference or run
+        record = summarize(path, args.threads, run, reference, audio_seconds)
+        record["dropped_layers"] = count
+        records.append(record)
+
+    drift_key = f"boundary_error_{args.metric}_ms"
+    print(f"\n   {'drop':>4}{'size MB':>9}{'p50 ms':>9}{'RTF':>8}{'agree':>8}{'mean ms':>9}{'p95 ms':>8}{'max ms':>8}")
+    for r in records:
+        print(f"   {r['dropped_layers']:>4}{r['model_size_mb']:>9.1f}{r['latency_p50_ms']:>9.1f}"
+              f"{r['real_time_factor']:>8.3f}{r['argmax_agreement'] * 100:>7.1f}%"
+              f"{r['boundary_error_mean_ms'] or 0:>9.1f}{r['boundary_error_p95_ms'] or 0:>8.1f}"
+              f"{r['boundary_error_max_ms'] or 0:>8.1f}")
+
+    # A depth that aligned no words has no drift (None) and never counts as within budget
+    within = [r for r in records if r[drift_key] is not None and r[drift_key] <= args.max_drift_ms]
+    best = min(within, key=lambda r: r["model_size_mb"]) if within else None
+    if best:
+        print(f"\n   Smallest model within {args.max_drift_ms:.0f} ms ({args.metric} drift): {best['model']} "
+              f"(drop {best['dropped_layers']}, {best['model_size_mb']:.1f} MB, "
+              f"{records[0]['latency_p50_ms'] / best['latency_p50_ms']:.2f}x faster)")
+    else:
+        print(f"\n   No depth aligned words within {args.max_drift_ms:.0f} ms ({args.metric} drift)")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "threads": args.threads,
+            "corpus": args.corpus or "synthetic",
+            "max_drift_ms": args.max_drift_ms,
+            "metric": args.metric,
+            "recommended": best["model"] if best else None,
+            "results": records,
+        }, f, indent=2)
+    print(f"\nResults written to: {args.output}")
+    return 0 if best else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Throughput sweep over onnxruntime session settings and process concurrency.
+
+The app runs one MMS_FA session with 2 intra-op threads; offline jobs could
+instead run several single-thread sessions side by side. For every model and
+combination of
+  - concurrent processes (one session each)
+  - intra-op / inter-op threads
+  - execution mode (sequential / parallel)
+  - CPU memory arena and memory pattern (on / off)
+this starts a fresh spawn process pool, loads one session per process, lines
+the processes up on a barrier and lets them share a fixed workload (the
+corpus x --repeats, dealt round-robin). Reported per configuration:
+  - throughput in audio-seconds per wall-second
+  - p50 session.run latency per clip
+  - summed peak RSS of the worker processes (what the whole job needs)
+
+The summary lists the best configuration per model, overall and within
+--cores (processes x intra-op threads), and everything goes to a JSON file.
+
+Usage:
+    python scripts/sweep_session_config.py                                   # mms-fa.onnx + int8 variants
+    python scripts/sweep_session_config.py --processes 1,2,4 --intra 1,2,4 --arena on,off --mem-pattern on,off
+    python scripts/sweep_session_config.py --models mms-fa-int8.onnx --execution-modes sequential,parallel --inter 1,2
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import corpus_seconds, load_corpus, synthetic_corpus
+from mms_fa_inference import FP32_MODEL, MODEL_DIR, SAMPLE_RATE, run_emissions
+from resource_usage import mb, peak_rss_bytes
+
+_barrier = None
+
+
+def default_models():
+    """mms-fa.onnx followed by every quantized (int8) export in Resources/mms-fa."""
+    models = [FP32_MODEL] + sorted(glob.glob(os.path.join(MODEL_DIR, "mms-fa-int8*.onnx")))
+    return [path for path in models if os.path.exists(path)]
+
+
+def session_options(intra_op_threads, inter_op_threads, execution_mode, arena, mem_pattern):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL if execution_mode == "parallel" else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    options.enable_cpu_mem_arena = arena
+    options.enable_mem_pattern = mem_pattern
+    return options
+
+
+def _init_worker(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def _run_share(model_path, config, clips):
+    """Worker: load a session, wait for the other workers, run `clips` and time them."""
+    import onnxruntime as ort
+
+    options = session_options(
+        config["intra"], config["inter"], config["execution_mode"], config["arena"], config["mem_pattern"]
+    )
+    session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    run_emissions(session, clips[0] if clips else np.zeros(SAMPLE_RATE, dtype=np.float32))  # warm-up
+
+    _barrier.wait()
+    start = time.time()
+    latencies = []
+    for audio in clips:
+        clip_start = time.perf_counter()
+        run_emissions(session, audio)
+        latencies.append((time.perf_counter() - clip_start) * 1000)
+    end = time.time()
+    return {"start": start, "end": end, "latencies_ms": latencies, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def run_config(model_path, config, utterances, repeats):
+    """Run one configuration in a fresh pool of config["processes"] workers."""
+    processes = config["processes"]
+    workload = [u.audio for u in utterances] * repeats
+    shares = [workload[i::processes] for i in range(processes)]
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes)
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_worker, initargs=(barrier,)) as pool:
+        futures = [pool.submit(_run_share, model_path, config, share) for share in shares]
+        results = [future.result() for future in futures]
+
+    wall = max(r["end"] for r in results) - min(r["start"] for r in results)
+    audio_seconds = corpus_seconds(utterances) * repeats
+    latencies = np.concatenate([r["latencies_ms"] for r in results])
+    return {
+        "model": os.path.basename(model_path),
+        **config,
+        "total_threads": processes * config["intra"],
+        "wall_seconds": round(wall, 3),
+        "throughput": round(audio_seconds / wall, 2),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "peak_rss_mb": round(mb(sum(r["peak_rss_bytes"] for r in results)), 1),
+    }
+
+
+def configurations(args):
+    """Every combination of the swept settings, as dicts."""
+    on_off = {"on": True, "off": False}
+    grid = itertools.product(
+        [int(p) for p in args.processes.split(",")],
+        [int(t) for t in args.intra.split(",")],
+        [int(t) for t in args.inter.split(",")],
+        args.execution_modes.split(","),
+        [on_off[value] for value in args.arena.split(",")],
+        [on_off[value] for value in args.mem_pattern.split(",")],
+    )
+    return [
+        {"processes": p, "intra": intra, "inter": inter, "execution_mode": mode, "arena": arena,
+         "mem_pattern": pattern}
+        for p, intra, inter, mode, arena, pattern in grid
+    ]
+
+
+def _describe(record):
+    return (f"{record['processes']}p x {record['intra']}t (inter {record['inter']}, "
+            f"{record['execution_mode']}, arena {'on' if record['arena'] else 'off'}, "
+            f"pattern {'on' if record['mem_pattern'] else 'off'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep onnxruntime session settings and concurrency")
+    parser.add_argument("--models", nargs="+", help="model files (default: mms-fa.onnx + mms-fa-int8*.onnx)")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--processes", default="1,2,4", help="comma-separated concurrent sessions")
+    parser.add_argument("--intra", default="1,2,4", help="comma-separated intra-op thread counts")
+    parser.add_argument("--inter", default="1", help="comma-separated inter-op thread counts")
+    parser.add_argument("--execution-modes", default="sequential", help="sequential,parallel")
+    parser.add_argument("--arena", default="on", help="CPU memory arena: on,off")
+    parser.add_argument("--mem-pattern", default="on", help="memory pattern: on,off")
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the corpus per configuration")
+    parser.add_argument("--cores", type=int, default=os.cpu_count(), help="core budget for the recommendation")
+    parser.add_argument("--output", default="mms-fa-session-sweep.json", help="JSON results file")
+    args = parser.parse_args()
+
+    models = [
+        path if os.path.exists(path) else os.path.join(MODEL_DIR, path)
+        for path in (args.models or default_models())
+    ]
+    utterances = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    configs = configurations(args)
+
+    print("=" * 60)
+    print("MMS_FA Session Configuration Sweep")
+    print("=" * 60)
+    print(f"\n   Models: {[os.path.basename(m) for m in models]}")
+    print(f"   Corpus: {args.corpus or 'synthetic'} ({len(utterances)} utterances, "
+          f"{corpus_seconds(utterances):.1f}s) x {args.repeats}")
+    print(f"   Configurations: {len(configs)} per model, {args.cores} cores")
+
+    if not models or not utterances:
+        print("\n   ERROR: no models or no utterances to sweep")
+        return 1
+
+    records = []
+    for model_path in models:
+        print(f"\n   {os.path.basename(model_path)}")
+        for config in configs:
+            record = run_config(model_path, config, utterances, args.repeats)
+            records.append(record)
+            print(f"     {_describe(record):<58} {record['throughput']:>7.1f} audio-s/s "
+                  f"p50 {record['latency_p50_ms']:>7.1f} ms  RSS {record['peak_rss_mb']:>6.0f} MB")
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    for model in dict.fromkeys(r["model"] for r in records):
+        rows = [r for r in records if r["model"] == model]
+        best = max(rows, key=lambda r: r["throughput"])
+        print(f"\n   {model}")
+        print(f"     Best overall:   {_describe(best)}: {best['throughput']:.1f} audio-s/s, "
+              f"{best['peak_rss_mb']:.0f} MB")
+        within = [r for r in rows if r["total_threads"] <= args.cores]
+        if within:
+            best = max(within, key=lambda r: r["throughput"])
+            print(f"     Within {args.cores} cores: {_describe(best)}: {best['throughput']:.1f} audio-s/s, "
+                  f"{best['peak_rss_mb']:.0f} MB")
+        single = [r for r in rows if r["processes"] == 1]
+        if single:
+            best = max(single, key=lambda r: r["throughput"])
+            print(f"     One session:    {_describe(best)}: {best['throughput']:.1f} audio-s/s, "
+                  f"{best['peak_rss_mb']:.0f} MB")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "corpus": args.corpus or "synthetic",
+            "repeats": args.repeats,
+            "cores": args.cores,
+            "results": records,
+        }, f, indent=2)
+    print(f"\nResults written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Test fixed-length bucket MMS_FA models against the dynamic-shape model (CPU EP)."""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from audio_corpus import synthetic_corpus
+from bucket_models import BUCKET_SECONDS, BucketDispatcher, bucket_model_path, compare_with_dynamic
+from ctc_align import align_words, boundary_errors_ms, log_softmax, word_times
+from mms_fa_inference import FP32_MODEL, FRAME_DURATION, SAMPLE_RATE, create_session, load_labels, run_emissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bucket model equivalence tests")
+    parser.add_argument("--model", default=FP32_MODEL, help="dynamic-shape reference model")
+    parser.add_argument("--buckets", nargs="+", help="bucket model files (default: mms-fa-bucket-*s.onnx)")
+    parser.add_argument("--atol", type=float, default=1e-3, help="max |emissions difference|")
+    parser.add_argument("--max-boundary-ms", type=float, default=0.0, help="max word boundary difference")
+    args = parser.parse_args()
+
+    paths = args.buckets or [bucket_model_path(s) for s in BUCKET_SECONDS]
+
+    print("=" * 60)
+    print("MMS_FA Bucket Model Test (CPUExecutionProvider)")
+    print("=" * 60)
+
+    # 1. Load bucket models
+    print("\n1. Loading bucket models...")
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f"   ERROR: missing {[os.path.basename(p) for p in missing]}")
+        print("   Run: python scripts/export_mms_fa_model.py --buckets 2,5,10,20")
+        return 1
+    dispatcher = BucketDispatcher(paths, fallback_model=args.model, providers=["CPUExecutionProvider"])
+    for samples, path in dispatcher.buckets:
+        print(f"   {os.path.basename(path)}: {samples / SAMPLE_RATE:g}s")
+
+    failures = 0
+
+    # 2. Emissions at the edges of every bucket
+    print("\n2. Comparing trimmed emissions with the dynamic model...")
+    stats = compare_with_dynamic(dispatcher, args.model)
+    ok = stats["max_diff"] <= args.atol
+    failures += not ok
+    print(f"   Lengths: {[round(s, 2) for s in stats['lengths']]} s")
+    print(f"   Max difference: {stats['max_diff']:.6f} (atol {args.atol})")
+    print(f"   Argmax agreement: {stats['argmax_match'] * 100:.2f}%")
+    print(f"   {'[PASS]' if ok else '[FAIL]'} Emissions match")
+
+    # 3. Clips longer than the largest bucket use the fallback model
+    print("\n3. Checking fallback for clips longer than the largest bucket...")
+    longest = dispatcher.buckets[-1][0]
+    audio = (np.random.default_rng(1).standard_normal(longest + SAMPLE_RATE) * 0.1).astype(np.float32)
+    same = np.array_equal(dispatcher.emissions(audio), run_emissions(create_session(args.model), audio))
+    failures += not same
+    print(f"   {(longest + SAMPLE_RATE) / SAMPLE_RATE:g}s clip: {'[PASS]' if same else '[FAIL]'} fallback used")
+
+    # 4. Word boundaries on the synthetic corpus
+    print("\n4. Comparing word boundaries...")
+    labels = load_labels()
+    session = create_session(args.model)
+    errors = []
+    for utterance in synthetic_corpus():
+        reference = word_times(
+            align_words(log_softmax(run_emissions(session, utterance.audio)), utterance.transcript, labels),
+            FRAME_DURATION,
+        )
+        bucketed = word_times(
+            align_words(log_softmax(dispatcher.emissions(utterance.audio)), utterance.transcript, labels),
+            FRAME_DURATION,
+        )
+        errors.append(boundary_errors_ms(reference, bucketed))
+    errors = np.concatenate(errors)
+    max_error = float(errors.max()) if errors.size else 0.0
+    ok = max_error <= args.max_boundary_ms
+    failures += not ok
+    print(f"   Max boundary difference: {max_error:.0f} ms (allowed {args.max_boundary_ms:.0f} ms)")
+    print(f"   {'[PASS]' if ok else '[FAIL]'} Word boundaries match")
+
+    # Summary
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    if failures:
+        print(f"\n[FAIL] {failures} check(s) failed")
+        return 1
+    print("\n[PASS] Bucket models match the dynamic model")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ import os
 import onnxruntime as ort
 from onnxruntime.quantization import quantize_dynamic, QuantType
 
+from emission_cache import EmissionCache
+
 # Paths
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
@@ -56,20 +58,30 @@ except Exception as e:
     print(f"   ERROR: {e}")
     exit(1)
 
+# Emissions are cached per (model, audio) on disk as float16 (see emission_cache.py),
+# and the test audio is seeded so re-runs only compute what changed
+cache = EmissionCache()
+rng = np.random.default_rng(0)
+
+
+def emissions(session, model_path, audio):
+    return np.asarray(cache.emissions(session, model_path, audio), dtype=np.float32)
+
+
 # 3. Test with multiple audio samples
 print("\n3. Comparing frame-level emissions...")
 
 test_cases = [
     ("1 second silence", np.zeros((1, 16000), dtype=np.float32)),
-    ("1 second noise", np.random.randn(1, 16000).astype(np.float32) * 0.1),
-    ("2 seconds noise", np.random.randn(1, 32000).astype(np.float32) * 0.1),
-    ("5 seconds noise", np.random.randn(1, 80000).astype(np.float32) * 0.1),
+    ("1 second noise", rng.standard_normal((1, 16000)).astype(np.float32) * 0.1),
+    ("2 seconds noise", rng.standard_normal((1, 32000)).astype(np.float32) * 0.1),
+    ("5 seconds noise", rng.standard_normal((1, 80000)).astype(np.float32) * 0.1),
 ]
 
 all_diffs = []
 for name, audio in test_cases:
-    fp32_out = sess_fp32.run(None, {"audio": audio})[0]
-    int8_out = sess_int8.run(None, {"audio": audio})[0]
+    fp32_out = emissions(sess_fp32, fp32_model, audio)
+    int8_out = emissions(sess_int8, int8_model, audio)
 
     # Compute differences
     abs_diff = np.abs(fp32_out - int8_out)
@@ -100,31 +112,24 @@ for name, audio in test_cases:
 # 4. Test forced alignment accuracy
 print("\n4. Testing forced alignment consistency...")
 try:
-    import torch
-    from torchaudio.functional import forced_align
+    from ctc_align import forced_align, log_softmax
 
     # Get emissions for alignment test
-    test_audio = np.random.randn(1, 32000).astype(np.float32) * 0.1
-    fp32_emissions = sess_fp32.run(None, {"audio": test_audio})[0]
-    int8_emissions = sess_int8.run(None, {"audio": test_audio})[0]
+    test_audio = rng.standard_normal((1, 32000)).astype(np.float32) * 0.1
+    fp32_emissions = emissions(sess_fp32, fp32_model, test_audio)
+    int8_emissions = emissions(sess_int8, int8_model, test_audio)
 
     # Convert to log softmax for CTC
-    fp32_log = torch.log_softmax(torch.from_numpy(fp32_emissions), dim=-1)
-    int8_log = torch.log_softmax(torch.from_numpy(int8_emissions), dim=-1)
+    fp32_log = log_softmax(fp32_emissions)
+    int8_log = log_softmax(int8_emissions)
 
     # Test transcript: "hello world"
     # Labels: ['-', 'a', 'i', 'e', 'n', 'o', 'u', 't', 's', 'r', 'm', 'k', 'l', 'd', 'g', 'h', 'y', 'b', 'p', 'w', 'c', 'v', 'j', 'z', 'f', "'", 'q', 'x', '*']
     # h=15, e=3, l=12, o=5, *=28, w=19, r=9, d=13
-    tokens = torch.tensor([[15, 3, 12, 12, 5, 28, 19, 5, 9, 12, 13]], dtype=torch.int32)
-    input_lengths = torch.tensor([fp32_emissions.shape[1]])
-    target_lengths = torch.tensor([11])
-
-    fp32_align, fp32_scores = forced_align(fp32_log, tokens, input_lengths, target_lengths, blank=0)
-    int8_align, int8_scores = forced_align(int8_log, tokens, input_lengths, target_lengths, blank=0)
+    tokens = np.array([15, 3, 12, 12, 5, 28, 19, 5, 9, 12, 13], dtype=np.int32)
 
-    # Compare alignments
-    fp32_path = fp32_align[0].numpy()
-    int8_path = int8_align[0].numpy()
+    fp32_path, fp32_scores = forced_align(fp32_log, tokens, blank=0)
+    int8_path, int8_scores = forced_align(int8_log, tokens, blank=0)
 
     # Find word boundaries (token transitions)
     def get_word_boundaries(path, tokens_flat):
@@ -137,7 +142,7 @@ try:
                 current_token = token_idx
         return boundaries
 
-    tokens_flat = tokens[0].numpy()
+    tokens_flat = tokens
     fp32_boundaries = get_word_boundaries(fp32_path, tokens_flat)
     int8_boundaries = get_word_boundaries(int8_path, tokens_flat)
 
@@ -165,6 +170,7 @@ max_logit_diff = max(d["max_diff"] for d in all_diffs)
 print(f"Average argmax match rate: {avg_match:.1f}%")
 print(f"Maximum logit difference: {max_logit_diff:.4f}")
 print(f"INT8 model size: {int8_size + int8_data_size:.1f} MB")
+print(f"Emission cache: {cache.hits} hits, {cache.misses} misses")
 
 if avg_match >= 95:
     print("\n[PASS] INT8 quantization looks SAFE for forced alignment")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Energy-based silence trimming ahead of MMS_FA inference.
+
+Piper output has leading/trailing silence and long pauses between
+sentences, and every 20 ms of it costs a full MMS_FA frame. trim_silence()
+finds silent spans from per-frame RMS energy (320-sample hops, the model's
+frame grid), shortens every silence longer than `min_silence_ms` to
+`keep_ms` on each side of the speech around it, and concatenates what is
+left. All cuts are on the 320-sample grid, so trimmed frame k maps back to
+exactly one original frame and word timings are exact in frame units.
+
+TrimMap converts frame indices and WordSpans from the trimmed emissions back
+to the original audio; align_trimmed() does the whole pipeline.
+
+Usage:
+    python scripts/vad_trim.py [--model PATH] [--corpus DIR] [--threshold-db -45] [--min-silence-ms 300]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from audio_corpus import Utterance, load_corpus, synthetic_corpus
+from ctc_align import align_words, boundary_errors_ms, log_softmax, word_times
+from mms_fa_inference import (
+    FP32_MODEL,
+    FRAME_DURATION,
+    FRAME_STRIDE,
+    SAMPLE_RATE,
+    create_session,
+    load_labels,
+    num_frames,
+    run_emissions,
+)
+
+
+def frame_energy_db(audio):
+    """RMS energy (dB relative to the loudest frame) of each 320-sample hop."""
+    hops = len(audio) // FRAME_STRIDE
+    frames = np.asarray(audio[:hops * FRAME_STRIDE], dtype=np.float32).reshape(hops, FRAME_STRIDE)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1)) + 1e-10
+    return 20 * np.log10(rms / rms.max()) if hops else np.zeros(0)
+
+
+def speech_segments(audio, threshold_db=-45.0, min_silence_ms=300, keep_ms=100):
+    """
+    Sample ranges [(start, end)] to keep, on the 320-sample grid.
+
+    Hops quieter than `threshold_db` below the loudest hop are silence. Silent
+    runs shorter than `min_silence_ms` are kept whole; longer runs keep only
+    `keep_ms` next to the speech on either side (leading/trailing silence
+    keeps `keep_ms` next to the speech).
+    """
+    energy = frame_energy_db(audio)
+    hops = len(energy)
+    if hops == 0:
+        return [(0, len(audio))]
+    keep = energy > threshold_db
+    if not keep.any():
+        return [(0, len(audio))]  # nothing loud enough; leave the clip alone
+
+    min_silence = int(round(min_silence_ms / 1000 / FRAME_DURATION))
+    margin = int(round(keep_ms / 1000 / FRAME_DURATION))
+
+    # Silent runs as [start, end) hop ranges
+    edges = np.flatnonzero(np.diff(np.concatenate([[1], keep.astype(np.int8), [1]])))
+    runs = edges.reshape(-1, 2)
+    for start, end in runs:
+        leading, trailing = start == 0, end == hops
+        if end - start < min_silence and not (leading or trailing):
+            keep[start:end] = True
+            continue
+        if not leading:
+            keep[start:min(end, start + margin)] = True
+        if not trailing:
+            keep[max(start, end - margin):end] = True
+
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], keep.astype(np.int8), [0]])))
+    segments = [(int(s) * FRAME_STRIDE, int(e) * FRAME_STRIDE) for s, e in edges.reshape(-1, 2)]
+    if segments[-1][1] == hops * FRAME_STRIDE:
+        segments[-1] = (segments[-1][0], len(audio))  # keep the partial last hop
+    return segments
+
+
+class TrimMap:
+    """Maps positions in the trimmed audio back to the original audio."""
+
+    def __init__(self, segments):
+        self.segments = segments
+        lengths = np.array([end - start for start, end in segments], dtype=np.int64)
+        self.trimmed_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        self.original_starts = np.array([start for start, _ in segments], dtype=np.int64)
+
+    def to_original_samples(self, samples):
+        samples = np.asarray(samples, dtype=np.int64)
+        index = np.searchsorted(self.trimmed_starts, samples, side="right") - 1
+        return self.original_starts[index] + samples - self.trimmed_starts[index]
+
+    def to_original_frames(self, frames):
+        """Original frame index of each trimmed frame index (exact: cuts are on the frame grid)."""
+        return self.to_original_samples(np.asarray(frames, dtype=np.int64) * FRAME_STRIDE) // FRAME_STRIDE
+
+    def map_words(self, word_spans):
+        """WordSpans with start/end in original frames (end stays exclusive)."""
+        if not word_spans:
+            return []
+        starts = self.to_original_frames([w.start for w in word_spans])
+        ends = self.to_original_frames([w.end - 1 for w in word_spans]) + 1
+        return [w._replace(start=int(s), end=int(e)) for w, s, e in zip(word_spans, starts, ends)]
+
+
+def trim_silence(audio, threshold_db=-45.0, min_silence_ms=300, keep_ms=100):
+    """(trimmed_audio, TrimMap) for a 16 kHz clip."""
+    audio = np.asarray(audio, dtype=np.float32)
+    segments = speech_segments(audio, threshold_db, min_silence_ms, keep_ms)
+    trimmed = np.concatenate([audio[start:end] for start, end in segments])
+    return trimmed, TrimMap(segments)
+
+
+def align_trimmed(session, audio, transcript, labels, **trim_options):
+    """Trim silence, run the model and return WordSpans in original-audio frames."""
+    trimmed, trim_map = trim_silence(audio, **trim_options)
+    words = align_words(log_softmax(run_emissions(session, trimmed)), transcript, labels)
+    return trim_map.map_words(words), trimmed
+
+
+def paragraph_utterance(utterances, pause_seconds=0.8):
+    """Join utterances with long pauses, like a paragraph of synthesized sentences."""
+    pause = np.zeros(int(pause_seconds * SAMPLE_RATE), dtype=np.float32)
+    pieces = []
+    for utterance in utterances:
+        pieces += [utterance.audio, pause]
+    return Utterance("paragraph", np.concatenate(pieces[:-1]), " ".join(u.transcript for u in utterances))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure frames saved by silence trimming")
+    parser.add_argument("--model", default=FP32_MODEL, help="MMS_FA ONNX model")
+    parser.add_argument("--corpus", help="directory of <name>.wav + <name>.txt pairs (default: synthetic)")
+    parser.add_argument("--threshold-db", type=float, default=-45.0, help="silence threshold below the peak")
+    parser.add_argument("--min-silence-ms", type=float, default=300, help="shortest silence to compress")
+    parser.add_argument("--keep-ms", type=float, default=100, help="silence kept next to speech")
+    parser.add_argument("--max-boundary-ms", type=float, default=40.0, help="max word boundary shift")
+    args = parser.parse_args()
+
+    options = {"threshold_db": args.threshold_db, "min_silence_ms": args.min_silence_ms, "keep_ms": args.keep_ms}
+    utterances = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not args.corpus:
+        utterances.append(paragraph_utterance(utterances))
+    labels = load_labels()
+    session = create_session(args.model)
+
+    print("=" * 60)
+    print("Silence Trimming Before MMS_FA")
+    print("=" * 60)
+    print(f"\n   Threshold {args.threshold_db:g} dB, compress silences >= {args.min_silence_ms:g} ms "
+          f"to {args.keep_ms:g} ms per side")
+
+    print(f"\n   {'utterance':<14}{'frames':>8}{'trimmed':>9}{'saved':>8}{'full ms':>9}{'trim ms':>9}{'bnd ms':>8}")
+    total = kept = 0
+    full_time = trim_time = 0.0
+    worst = 0.0
+    for utterance in utterances:
+        start = time.perf_counter()
+        full_words = align_words(log_softmax(run_emissions(session, utterance.audio)), utterance.transcript, labels)
+        full_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        words, trimmed = align_trimmed(session, utterance.audio, utterance.transcript, labels, **options)
+        trim_ms = (time.perf_counter() - start) * 1000
+
+        errors = boundary_errors_ms(word_times(full_words, FRAME_DURATION), word_times(words, FRAME_DURATION))
+        error = float(errors.max()) if errors.size else 0.0
+        frames, trimmed_frames = num_frames(len(utterance.audio)), num_frames(len(trimmed))
+        total += frames
+        kept += trimmed_frames
+        full_time += full_ms
+        trim_time += trim_ms
+        worst = max(worst, error)
+        print(f"   {utterance.name:<14}{frames:>8}{trimmed_frames:>9}{(1 - trimmed_frames / frames) * 100:>7.1f}%"
+              f"{full_ms:>9.1f}{trim_ms:>9.1f}{error:>8.0f}")
+
+    print(f"\n   Frames saved: {total - kept} of {total} ({(1 - kept / total) * 100:.1f}%)")
+    print(f"   Inference + alignment: {full_time:.1f} ms -> {trim_time:.1f} ms")
+    print(f"   Max word boundary shift vs untrimmed: {worst:.0f} ms")
+
+    if worst <= args.max_boundary_ms:
+        print("\n[PASS] Trimmed alignment maps back within the boundary budget")
+        return 0
+    print("\n[FAIL] Trimmed alignment moved word boundaries too far")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())